@@ -0,0 +1,85 @@
+"""
+Benchmark per-solve overhead with and without the Gurobi environment pool
+"""
+
+import argparse
+import time
+import gurobipy as gp
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config.model_config import ENV_POOL_PARAMS
+from src.wfe_nexus_model import WFENexusModel
+from src.env_pool import EnvPool
+
+def time_fresh_env(data_dir, repeats):
+    """Create, parameterize and dispose a new environment for every solve"""
+    timings = []
+    for _ in range(repeats):
+        start = time.time()
+        env = gp.Env(empty=True)
+        for param, value in ENV_POOL_PARAMS.items():
+            env.setParam(param, value)
+        env.start()
+        setup_time = time.time() - start
+        
+        model = WFENexusModel(data_dir=data_dir, co2_policy='medium_tax', env=env)
+        build_time = time.time() - start - setup_time
+        model.resolve()
+        total_time = time.time() - start
+        
+        model.dispose()
+        env.dispose()
+        timings.append((setup_time, build_time, total_time))
+    return timings
+
+def time_pooled_env(data_dir, repeats):
+    """Reuse one pooled environment for every solve"""
+    timings = []
+    with EnvPool() as pool:
+        pool.get()  # started once per worker, outside the timed loop
+        for _ in range(repeats):
+            start = time.time()
+            env = pool.get()
+            setup_time = time.time() - start
+            
+            model = WFENexusModel(data_dir=data_dir, co2_policy='medium_tax', env=env)
+            build_time = time.time() - start - setup_time
+            model.resolve()
+            total_time = time.time() - start
+            
+            model.dispose()
+            timings.append((setup_time, build_time, total_time))
+    return timings
+
+def print_summary(label, timings):
+    """Print average timings of one benchmark mode"""
+    n = len(timings)
+    setup = sum(t[0] for t in timings) / n
+    build = sum(t[1] for t in timings) / n
+    total = sum(t[2] for t in timings) / n
+    print(f"{label:<20} {setup*1000:>12.2f} {build*1000:>12.2f} {total*1000:>12.2f}")
+    return setup, total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--data-dir', default='data')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+    
+    print(f"Benchmarking {args.repeats} solves per mode on {args.data_dir}")
+    fresh = time_fresh_env(args.data_dir, args.repeats)
+    pooled = time_pooled_env(args.data_dir, args.repeats)
+    
+    print("\n" + "-"*60)
+    print(f"{'Mode':<20} {'Env (ms)':>12} {'Build (ms)':>12} {'Total (ms)':>12}")
+    print("-"*60)
+    fresh_setup, fresh_total = print_summary('Fresh environment', fresh)
+    pooled_setup, pooled_total = print_summary('Pooled environment', pooled)
+    print("-"*60)
+    print(f"Per-solve overhead removed: {(fresh_setup - pooled_setup)*1000:.2f} ms "
+          f"({(fresh_total - pooled_total) / fresh_total * 100:.1f}% of total solve time)")
+
+if __name__ == "__main__":
+    main()
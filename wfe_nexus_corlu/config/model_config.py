@@ -125,6 +125,10 @@ EMISSION_FACTORS = {
     'biogas': 0  # Considered carbon neutral
 }
 
+# Dispatchable Units (unit commitment with on/off binaries)
+DISPATCHABLE = ['chp', 'fuel_cell']
+MIN_LOAD = 0.3  # minimum stable generation while on (fraction of capacity)
+
 # Ramp Rates (% of capacity per hour)
 RAMP_RATES = {
     'chp': {'up': 0.30, 'down': 0.30},
@@ -163,6 +167,7 @@ STORAGE_PARAMS = {
         'max_level': 0.95
     }
 }
+STORAGE_EFFICIENCY = 0.95  # charge and discharge efficiency of storage other than the battery
 
 # Demand Profiles (simplified - will be expanded with actual data)
 BASE_DEMANDS = {
@@ -215,6 +220,9 @@ PRODUCT_PRICES = {
     'fertilizer_p': 800  # $/ton P
 }
 
+# Penalty for unmet heat, hydrogen and nitrogen demand (slack variables)
+PENALTY_RATE = 1000  # $/unit
+
 # Capacity Limits
 CAPACITY_LIMITS = {
     'pv': {'min': 0, 'max': 100},  # MW
@@ -226,4 +234,211 @@ CAPACITY_LIMITS = {
     'haber_bosch': {'min': 0, 'max': 20},  # tons NH3/day
     'carbon_capture': {'min': 0, 'max': 100},  # tons CO2/day
     'p2g_methanation': {'min': 0, 'max': 20}  # MW SNG
-}
\ No newline at end of file
+}
+
+# Fallback Bounds on operational variables (WFENexusModel.add_fallback_bounds)
+MAX_GRID = 1000  # MW, grid trades, generation and consumption
+MAX_PRODUCTION = 10000  # tons/hour or m3/hour
+
+# Inverse Carbon-Price Search
+CARBON_PRICE_SEARCH = {
+    'max_tax': 500,  # $/ton CO2 - upper end of the search bracket
+    'tolerance': 1.0,  # $/ton CO2 - bracket width at which bisection stops
+    'max_iterations': 30
+}
+
+# Experiment Grid (values are expanded as a Cartesian product)
+EXPERIMENT_GRID = {
+    'co2_policy': ['no_tax', 'low_tax', 'medium_tax', 'high_tax'],
+    'objective': ['minimize_cost', 'minimize_emissions'],
+    'economic_scenario': [None]  # None keeps DISCOUNT_RATE; see ECONOMIC_SCENARIOS in model_config_updated.py
+}
+
+# Parallel Experiment Runner
+EXPERIMENT_RUNNER = {
+    'max_workers': 4,  # worker processes
+    'total_threads': 8  # Gurobi Threads budget shared by all workers
+}
+
+# Gurobi Environment Pool (parameters preset on pooled environments)
+ENV_POOL_PARAMS = {
+    'Threads': 1,
+    'OutputFlag': 0,
+    'Method': -1  # -1 = automatic
+}
+
+# Day-Ahead Operational Scheduling
+DAY_AHEAD_SCHEDULING = {
+    'horizon': 24,  # hours (24-48)
+    'target_latency': 1.0,  # seconds per daily re-solve
+    'relax_commitment': True,  # continuous on/off variables keep the dispatch an LP
+    'initial_soc': 0.5  # default initial storage level (fraction of capacity)
+}
+
+# Sample Average Approximation
+SAA = {
+    'replications': 10,  # M independent SAA problems
+    'samples': 20,  # N scenarios per SAA problem
+    'selection_samples': 200,  # out-of-sample scenarios on which the best candidate is chosen
+    'evaluation_samples': 1000,  # fresh scenarios for the upper bound of the chosen candidate
+    'confidence': 0.95,
+    'seed': 2024,  # replication m uses seed + m, the selection/evaluation samples seed + *_SEED_OFFSET
+    'max_workers': 4
+}
+
+# Monte Carlo Design Evaluation
+MONTE_CARLO = {
+    'samples': 10000,  # sampled years
+    'batch_size': 50,  # samples per dispatch task
+    'pending_batches_per_worker': 2,  # bounds the results held in memory
+    'seed': 4242,
+    'quantiles': [0.5, 0.9, 0.95],
+    'cvar_alpha': 0.9,  # CVaR of the worst 10%
+    'max_workers': 4
+}
+
+# Bayesian-Optimization Design Search
+BAYES_OPT = {
+    'initial_designs': 8,  # Latin hypercube designs before the first surrogate fit
+    'rounds': 10,
+    'batch_size': 4,  # designs evaluated concurrently per round
+    'candidates': 2000,  # random points scored by the acquisition function
+    'seed': 7,
+    'max_workers': 4
+}
+
+# Relax-and-Fix Heuristic (season windows of the commitment binaries)
+RELAX_AND_FIX = {
+    'window_time_limit': 60,  # seconds per window subproblem
+    'window_mip_gap': 0.01,
+    'polish_rounds': 1  # fix-and-optimize passes over all windows
+}
+
+# Near-Optimal Portfolio Harvesting and Out-of-Sample Ranking
+PORTFOLIO_RANKING = {
+    'portfolios': 5,  # k best distinct investment portfolios
+    'method': 'no_good',  # 'no_good' cuts on v_build or the MIP solution 'pool'
+    'pool_solutions': 50,  # pool size searched for distinct portfolios
+    'min_capacity': 0.1,  # smallest capacity that counts as built while harvesting
+    'harvest_time_limit': 300,  # seconds per harvesting solve
+    'evaluation_samples': 1000,
+    'seed': 5150,
+    'cvar_alpha': 0.9,
+    'max_workers': 4
+}
+
+# Portfolio Racing of Solver Configurations
+SOLVER_RACING = {
+    'configurations': {  # name: Gurobi parameters of one racer
+        'default': {},
+        'barrier_root': {'Method': 2},
+        'feasibility': {'MIPFocus': 1, 'Heuristics': 0.2},
+        'bound': {'MIPFocus': 3, 'Cuts': 2},
+        'seed_1': {'Seed': 1},
+        'seed_2': {'Seed': 2}
+    },
+    'mip_gap': 1e-4,  # the race ends when any racer proves this gap
+    'time_limit': 3600,
+    'poll_interval': 0.5,  # seconds between checks for shared incumbents
+    'log_path': 'results/racing_log.csv'
+}
+
+# Offline Parameter Tuning (settings stored per instance class)
+PARAM_TUNING = {
+    'settings_path': 'config/tuned_settings.json',  # relative to the package root
+    'benchmark': [  # WFENexusModel options of the benchmark instances
+        {'co2_policy': 'no_tax'},
+        {'co2_policy': 'medium_tax'},
+        {'co2_policy': 'high_tax'},
+        {'co2_policy': 'medium_tax', 'objective': 'minimize_emissions'}
+    ],
+    'tune_time_limit': 600,  # seconds of Gurobi tuning per instance
+    'tune_trials': 2,  # runs per parameter set (seed variability)
+    'evaluation_time_limit': 300  # seconds per confirmation solve
+}
+
+# Solve Telemetry (callback timelines of MIP solves)
+TELEMETRY = {
+    'cadence': 1.0,  # seconds between periodic samples (new incumbents are always recorded)
+    'record_experiments': True  # store a timeline next to each ExperimentRunner result
+}
+
+# asyncio Solve API
+ASYNC_SOLVER = {
+    'max_concurrency': 4,  # solves running at the same time (one worker thread each)
+    'threads_per_solve': 2  # Gurobi Threads of every solve
+}
+
+# Local Optimization Job Service (HTTP on localhost, SQLite queue)
+JOB_SERVICE = {
+    'host': '127.0.0.1',
+    'port': 8765,
+    'store_dir': 'results/job_service',  # jobs.sqlite plus one result directory per job (relative to the package)
+    'max_workers': 2,  # solves running at the same time
+    'default_threads': 2,  # Gurobi Threads of a job that does not ask for a limit
+    'max_threads_per_job': 8,
+    'poll_interval': 1.0,  # seconds between queue checks of the dispatcher
+    'plots': True  # render WFEVisualizer plots for solved jobs
+}
+
+# Run Registry (SQLite database of solved runs)
+RUN_REGISTRY = {
+    'db_path': 'results/runs.sqlite',
+    'record_experiments': True  # add every experiment runner job to the registry
+}
+
+# Checkpoint/Resume of long sweeps and solves
+CHECKPOINT = {
+    'interval': 60,  # seconds between incumbent/bound snapshots of a running solve (plus one at the end)
+    'cutoff_tolerance': 1e-6,  # relative slack on the resumed incumbent's Cutoff so the MIP start is kept
+    'sweep_solves': True  # checkpoint each experiment runner solve next to its result file
+}
+
+# Wall-Clock Budgeted Sweep Scheduler
+BUDGET_SCHEDULER = {
+    'budget': 7200,  # seconds of wall clock for the whole grid
+    'target_gap': 1e-4,  # MIPGap of jobs with enough time to be proven optimal
+    'relaxed_gap': 0.01,  # MIPGap of jobs whose predicted time exceeds their share
+    'safety_factor': 2.0,  # TimeLimit = predicted solve time x safety_factor (capped by the share)
+    'min_time_limit': 10,  # seconds
+    'reserve_fraction': 0.2,  # part of the budget held back for unfinished jobs
+    'max_rounds': 3,  # first pass plus rounds that continue unfinished jobs from their checkpoints
+    'default_estimate': 300  # seconds predicted for a job without any past runs
+}
+
+# Instance Size and Solve-Time Planner
+INSTANCE_PLANNER = {
+    'bytes_per_element': 600,  # build memory per variable/constraint (measured with calibrate_memory)
+    'base_memory': 200e6,  # bytes of the Python process, data and Gurobi environment
+    'solve_memory_factor': 3.0,  # peak solve memory (presolve, B&B tree) relative to the built model
+    'max_memory_fraction': 0.8,  # share of the available RAM an instance may use
+    'time_budget': 3600,  # seconds; larger predicted solve times fall back to fewer representative days
+    'safety_factor': 2.0,  # TimeLimit = predicted solve time x safety_factor (capped by the budget)
+    'min_time_limit': 60,
+    # (max predicted solve time in s, Gurobi parameters), first match wins; None matches any
+    'strategies': [
+        (60, {}),
+        (900, {'MIPFocus': 1}),
+        (None, {'MIPFocus': 1, 'Presolve': 2, 'Heuristics': 0.2})
+    ]
+}
+
+# Multi-Fidelity Continuation (coarse-to-fine representative days)
+CONTINUATION = {
+    'levels': [1, 2, 4],  # representative days per level; the last level is the full time series
+    'tolerance': 0.05,  # capacities are stable when no capacity moves by more than 5% between levels
+    'capacity_floor': 0.01,  # share of the capacity limit below which changes count as absolute
+    'upper_margin': 0.5,  # next level's v_cap upper bound: coarse capacity x (1 + upper_margin)
+    'lower_margin': 0.5,  # next level's v_cap lower bound: coarse capacity x (1 - lower_margin)
+    'window': 0.1,  # v_cap upper bound at least this share of the capacity limit (lets new techs in)
+    'tighten_final': False,  # keep the full-resolution level exact (MIP start only)
+    'evaluate_stable': True,  # operate a design that stabilized early at full resolution
+    'level_mip_gap': 0.01  # MIPGap of the coarse levels
+}
+
+# Independent Solution Checker
+SOLUTION_CHECK = {
+    'tolerance': 1e-5,  # absolute residual above which a balance or limit counts as violated
+    'objective_tolerance': 1e-6,  # relative difference between recomputed and reported objective
+    'check_on_solve': False  # check every WFENexusModel solution after optimize()/resolve()
+}
@@ -9,6 +9,8 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 from src.data_generator import DataGenerator
 from src.wfe_nexus_model import WFENexusModel
 from src.visualizer import WFEVisualizer
+from src.carbon_price_solver import CarbonPriceSolver
+from src.run_registry import RunRegistry
 
 def run_single_scenario(co2_policy='medium_tax', objective='minimize_cost', visualize=True):
     """Run optimization for a single scenario"""
@@ -16,15 +18,19 @@ def run_single_scenario(co2_policy='medium_tax', objective='minimize_cost', visu
     print(f"Running WFE Nexus Model - CO2 Policy: {co2_policy}, Objective: {objective}")
     print(f"{'='*80}\n")
     
-    # Create and optimize model
+    # Create and optimize model (built models are reused from the cache on later runs)
     model = WFENexusModel(
         data_dir='data',
         co2_policy=co2_policy,
-        objective=objective
+        objective=objective,
+        cache_dir='model_cache'
     )
     
     model.optimize()
     
+    # Keep the run queryable next to all earlier ones (see src/run_registry.py)
+    RunRegistry().record(model, label=f'{co2_policy}_{objective}')
+    
     # Save detailed results
     results_dir = f'results/{co2_policy}_{objective}'
     os.makedirs(results_dir, exist_ok=True)
@@ -125,7 +131,7 @@ def run_multi_objective_analysis():
                 total_emissions_emission += prob * emission_model.v_emissions[(t, scenario)].X
         
         # Scale to annual
-        scale_factor = 365 / 4  # 4 representative days to full year
+        scale_factor = cost_model.days_per_season  # representative days to full year
         total_emissions_cost *= scale_factor
         total_emissions_emission *= scale_factor
         
@@ -139,10 +145,16 @@ def run_multi_objective_analysis():
         
         # Calculate implied carbon price
         if total_emissions_cost > total_emissions_emission:
-            # Estimate cost of emission-optimal by running with same capacities
-            # This is a simplification - actual cost would need re-optimization
-            implied_carbon_price = 100  # Placeholder
-            print(f"  - Implied Carbon Price: ~${implied_carbon_price}/ton CO2")
+            # Minimal CO2 tax at which cost minimization reaches the emission-optimal level
+            # (searched on its own model, so cost_model keeps its solution at the policy tax)
+            search_model = WFENexusModel(data_dir='data', co2_policy=co2_policy, objective='minimize_cost',
+                                         cache_dir='model_cache')
+            search = CarbonPriceSolver(search_model).solve(total_emissions_emission)
+            search_model.dispose()
+            if search['achievable']:
+                print(f"  - Implied Carbon Price: ~${search['co2_tax']:,.0f}/ton CO2")
+            else:
+                print(f"  - Implied Carbon Price: >${search['co2_tax']:,.0f}/ton CO2")
 
 def main():
     """Main execution function"""
@@ -0,0 +1,167 @@
+"""
+Anytime Solutions for the WFE Nexus Model
+Streams every improved incumbent of a running WFENexusModel.optimize() to
+the caller (capacities and objective components read from the first-stage
+variables only) and stops the solve early on user-defined criteria
+"""
+
+from gurobipy import GRB
+import threading
+import asyncio
+import queue
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+
+_DONE = object()  # end-of-solve marker in the incumbent queue
+
+# Stop criteria: functions of the solve state
+# {'time', 'objective', 'bound', 'gap', 'incumbents', 'last_improvement'}
+def gap_below(gap):
+    """Stop once the MIP gap is at most gap"""
+    return lambda state: state['gap'] <= gap
+
+def stall_time(seconds):
+    """Stop when the incumbent has not improved for seconds"""
+    return lambda state: state['incumbents'] > 0 and state['time'] - state['last_improvement'] >= seconds
+
+def time_limit(seconds):
+    """Stop after seconds of solving"""
+    return lambda state: state['time'] >= seconds
+
+def any_of(*criteria):
+    """Stop when any of the criteria holds"""
+    return lambda state: any(criterion(state) for criterion in criteria)
+
+class AnytimeSolve:
+    """Iterator over the improved incumbents of a WFENexusModel solve running in a background thread"""
+    def __init__(self, nexus_model, stop=None, min_improvement=0.0):
+        self.nexus_model = nexus_model
+        self.stop = stop
+        self.min_improvement = min_improvement
+        self.techs = list(nexus_model.all_techs)
+        self.cap_vars = [nexus_model.v_cap[tech] for tech in self.techs]
+        
+        # Cost coefficients of the first stage (see WFENexusModel.set_objective)
+        self.investment_coef = [nexus_model.calculate_crf(tech) * TECHNOLOGY_CAPEX[tech] for tech in self.techs]
+        self.fixed_om_coef = [FIXED_OPEX_PERCENTAGE * TECHNOLOGY_CAPEX[tech] * nexus_model.days_per_season
+                              for tech in self.techs]
+        
+        self.incumbents = queue.Queue()
+        self.state = {'time': 0.0, 'objective': GRB.INFINITY, 'bound': -GRB.INFINITY, 'gap': float('inf'),
+                      'incumbents': 0, 'last_improvement': 0.0}
+        self.stopped_early = False
+        self.thread = None
+        self.error = None
+    
+    def incumbent(self, model):
+        """Capacities and objective components of a new incumbent"""
+        capacities = dict(zip(self.techs, model.cbGetSolution(self.cap_vars)))
+        objective = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+        bound = model.cbGet(GRB.Callback.MIPSOL_OBJBND)
+        
+        result = {
+            'number': self.state['incumbents'],
+            'time': model.cbGet(GRB.Callback.RUNTIME),
+            'objective': objective,
+            'bound': bound,
+            'gap': abs(objective - bound) / abs(objective) if objective != 0 else 0.0,
+            'capacities': capacities
+        }
+        if self.nexus_model.objective_type != 'minimize_emissions':
+            investment = sum(c * capacities[tech] for c, tech in zip(self.investment_coef, self.techs))
+            fixed_om = sum(c * capacities[tech] for c, tech in zip(self.fixed_om_coef, self.techs))
+            result['components'] = {
+                'investment': investment,
+                'fixed_om': fixed_om,
+                'operations': objective - investment - fixed_om  # energy, CO2 and penalties net of revenues
+            }
+        return result
+    
+    def callback(self, model, where):
+        if where == GRB.Callback.MIPSOL:
+            objective = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+            best = self.state['objective']
+            if best < GRB.INFINITY and objective > best - self.min_improvement * abs(best):
+                return
+            self.state['objective'] = objective
+            self.state['last_improvement'] = model.cbGet(GRB.Callback.RUNTIME)
+            self.incumbents.put(self.incumbent(model))
+            self.state['incumbents'] += 1
+        elif where == GRB.Callback.MIP:
+            state = self.state
+            state['time'] = model.cbGet(GRB.Callback.RUNTIME)
+            state['bound'] = model.cbGet(GRB.Callback.MIP_OBJBND)
+            if state['objective'] < GRB.INFINITY:
+                state['gap'] = abs(state['objective'] - state['bound']) / max(abs(state['objective']), 1e-10)
+            if self.stop is not None and self.stop(state):
+                self.stopped_early = True
+                model.terminate()
+    
+    def solve(self):
+        """Thread target: run WFENexusModel.optimize with the streaming callback"""
+        try:
+            self.nexus_model.optimize(callback=self.callback)
+        except Exception as error:
+            self.error = error
+        finally:
+            self.incumbents.put(_DONE)
+    
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.solve, daemon=True)
+            self.thread.start()
+        return self
+    
+    def terminate(self):
+        """Ask the running solve to stop (safe from any thread)"""
+        self.stopped_early = True
+        self.nexus_model.model.terminate()
+    
+    def __iter__(self):
+        self.start()
+        try:
+            while True:
+                item = self.incumbents.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            # A caller that stops iterating also stops the solve
+            if self.thread.is_alive():
+                self.terminate()
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+    
+    async def __aiter__(self):
+        """Async iteration: waits for incumbents without blocking the event loop"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                item = await loop.run_in_executor(None, self.incumbents.get)
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            if self.thread.is_alive():
+                self.terminate()
+            await loop.run_in_executor(None, self.thread.join)
+        if self.error is not None:
+            raise self.error
+
+def iter_incumbents(nexus_model, stop=None, min_improvement=0.0):
+    """Improved incumbents of nexus_model.optimize() as they are found"""
+    return iter(AnytimeSolve(nexus_model, stop, min_improvement))
+
+if __name__ == "__main__":
+    model = WFENexusModel(data_dir='../data', co2_policy='medium_tax')
+    start_time = time.time()
+    for incumbent in iter_incumbents(model, stop=any_of(gap_below(0.01), stall_time(120))):
+        built = {tech: cap for tech, cap in incumbent['capacities'].items() if cap > 0.01}
+        print(f"{time.time() - start_time:>8.1f} s  ${incumbent['objective']:>16,.0f}  "
+              f"gap {incumbent['gap']*100:>6.2f}%  {built}")
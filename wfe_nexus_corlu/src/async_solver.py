@@ -0,0 +1,142 @@
+"""
+asyncio Solve API for the WFE Nexus Model
+Builds and solves WFENexusModel instances in a managed worker-thread
+executor so several analyses can be awaited concurrently in one process,
+with bounded concurrency, timeouts and cancellation mapped to terminate()
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import asyncio
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.env_pool import EnvPool
+
+class SolveCancelled(Exception):
+    """Raised in the worker when a job is cancelled before its solve starts"""
+
+class SolveJob:
+    """One build-and-solve running in a worker thread, cancellable from the event loop"""
+    def __init__(self, model_kwargs, method, callback):
+        self.model_kwargs = model_kwargs
+        self.method = method
+        self.callback = callback
+        self.nexus_model = None
+        self.cancelled = False
+        self.lock = threading.Lock()
+    
+    def check(self, model, where):
+        # Cancellation may arrive between the build and the start of the solve
+        if self.cancelled:
+            model.terminate()
+        elif self.callback is not None:
+            self.callback(model, where)
+    
+    def run(self, env):
+        if self.cancelled:
+            raise SolveCancelled()
+        nexus_model = WFENexusModel(env=env, **self.model_kwargs)
+        with self.lock:
+            if self.cancelled:
+                nexus_model.dispose()
+                raise SolveCancelled()
+            self.nexus_model = nexus_model
+        
+        getattr(nexus_model, self.method)(callback=self.check)
+        return nexus_model
+    
+    def cancel(self):
+        """Stop the job: skip the solve if it has not started, terminate it otherwise"""
+        with self.lock:
+            self.cancelled = True
+            if self.nexus_model is not None:
+                self.nexus_model.model.terminate()
+
+class AsyncSolver:
+    def __init__(self, max_concurrency=None, threads_per_solve=None):
+        self.max_concurrency = ASYNC_SOLVER['max_concurrency'] if max_concurrency is None else max_concurrency
+        self.threads_per_solve = (ASYNC_SOLVER['threads_per_solve']
+                                  if threads_per_solve is None else threads_per_solve)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='wfe_solve')
+        
+        # Gurobi environments must not be shared between threads: one pool per worker thread
+        self.local = threading.local()
+        self.pools = []
+        self.pools_lock = threading.Lock()
+    
+    def thread_env(self):
+        pool = getattr(self.local, 'pool', None)
+        if pool is None:
+            pool = self.local.pool = EnvPool()
+            with self.pools_lock:
+                self.pools.append(pool)
+        return pool.get(Threads=self.threads_per_solve)
+    
+    def _run(self, job):
+        return job.run(self.thread_env())
+    
+    async def solve(self, timeout=None, method='optimize', callback=None, **model_kwargs):
+        """Build and solve a WFENexusModel; returns the solved model like the synchronous path
+        
+        model_kwargs are passed to WFENexusModel (data_dir, co2_policy, ...). method is
+        'optimize' (prints results) or 'resolve' (quiet). On timeout or cancellation the
+        Gurobi solve is terminated before asyncio.TimeoutError/CancelledError is raised.
+        """
+        job = SolveJob(model_kwargs, method, callback)
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self._run, job)
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            job.cancel()
+            # Let the worker finish the terminated solve, then free its model; a failure
+            # there must not replace the TimeoutError/CancelledError being raised
+            try:
+                (await future).dispose()
+            except SolveCancelled:
+                pass
+            except Exception as error:
+                print(f"Cleanup after cancelled solve failed: {error!r}")
+            raise
+    
+    async def solve_many(self, jobs, timeout=None, method='optimize'):
+        """Solve several model specifications concurrently; failures are returned as exceptions"""
+        tasks = [self.solve(timeout=timeout, method=method, **job) for job in jobs]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+    
+    def dispose(self):
+        """Shut down the workers and free their environments (dispose returned models first)"""
+        self.executor.shutdown(wait=True)
+        for pool in self.pools:
+            pool.dispose()
+        self.pools.clear()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await asyncio.get_running_loop().run_in_executor(None, self.dispose)
+        return False
+
+async def main():
+    async with AsyncSolver() as solver:
+        start_time = time.time()
+        jobs = [{'data_dir': '../data', 'co2_policy': policy} for policy in CO2_TAX_SCENARIOS]
+        models = await solver.solve_many(jobs, timeout=1800, method='resolve')
+        for job, model in zip(jobs, models):
+            if isinstance(model, Exception):
+                print(f"{job['co2_policy']:<12} failed: {model!r}")
+            elif model.model.SolCount > 0:
+                print(f"{job['co2_policy']:<12} status {model.model.status}, objective ${model.model.ObjVal:,.0f}")
+        print(f"{len(jobs)} solves in {time.time() - start_time:.2f} s")
+        
+        # Models before their environments, which the solver frees on exit
+        for model in models:
+            if not isinstance(model, Exception):
+                model.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,254 @@
+"""
+Bayesian-Optimization Design Search for the WFE Nexus Model
+Searches the technology capacities within CAPACITY_LIMITS with a Gaussian
+process surrogate, scoring batches of designs concurrently by fixing v_cap
+and solving the operational problem, and seeds the exact model with the
+best design as MIP start
+
+Only the technologies in CAPACITY_LIMITS are searched; the others (CHP, fuel
+cell, digester, recovery units, ...) are left free in every evaluation, so
+each score is the best cost given the searched capacities, and they get no
+MIP start in the exact model
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.stochastic_metrics import ScenarioSetModel, load_scenario_data
+from src.env_pool import get_env
+
+LENGTH_SCALES = [0.05, 0.1, 0.2, 0.5, 1.0]  # candidates for the marginal-likelihood fit (unit cube)
+MAX_JITTER = 0.1  # largest diagonal jitter added when a kernel matrix is numerically singular
+
+def fix_design(nexus_model, capacities):
+    """Fix the searched capacities of a design; technologies outside it stay free"""
+    nexus_model.free_first_stage()
+    for tech, cap in capacities.items():
+        nexus_model.v_cap[tech].LB = cap
+        nexus_model.v_cap[tech].UB = cap
+        built = 1 if cap > 1e-6 else 0
+        nexus_model.v_build[tech].LB = built
+        nexus_model.v_build[tech].UB = built
+
+def set_mip_start(nexus_model, capacities):
+    """Use a design as MIP start for the searched investment variables of a WFENexusModel"""
+    for tech, cap in capacities.items():
+        nexus_model.v_cap[tech].Start = cap
+        nexus_model.v_build[tech].Start = 1 if cap > 1e-6 else 0
+
+class GaussianProcess:
+    """Gaussian process regression with an RBF kernel on the unit cube"""
+    def __init__(self, noise=1e-6):
+        self.noise = noise
+        self.length_scale = None
+    
+    def kernel(self, a, b, length_scale):
+        sq_dist = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-0.5 * sq_dist / length_scale ** 2)
+    
+    def cholesky(self, k):
+        """Cholesky factor of k, retried with diagonal jitter growing tenfold up to MAX_JITTER"""
+        jitter = 0.0
+        while jitter <= MAX_JITTER:
+            try:
+                return np.linalg.cholesky(k + jitter * np.eye(len(k)))
+            except np.linalg.LinAlgError:
+                jitter = 10 * jitter if jitter > 0 else 1e-8
+        return None
+    
+    def fit(self, x, y):
+        """Standardize the targets and pick the length scale with the best marginal likelihood"""
+        self.x = x
+        self.y_mean = y.mean()
+        self.y_std = y.std() if y.std() > 0 else 1.0
+        z = (y - self.y_mean) / self.y_std
+        
+        best = None
+        for length_scale in LENGTH_SCALES:
+            chol = self.cholesky(self.kernel(x, x, length_scale) + self.noise * np.eye(len(x)))
+            if chol is None:
+                continue
+            alpha = np.linalg.solve(chol.T, np.linalg.solve(chol, z))
+            log_likelihood = -0.5 * z @ alpha - np.log(np.diag(chol)).sum()
+            if best is None or log_likelihood > best[0]:
+                best = (log_likelihood, length_scale, chol, alpha)
+        
+        if best is None:
+            raise np.linalg.LinAlgError(f"GP kernel matrix of {len(x)} points is not positive definite for any "
+                                        f"length scale, even with jitter {MAX_JITTER:g} (duplicate designs?)")
+        _, self.length_scale, self.chol, self.alpha = best
+        return self
+    
+    def predict(self, x):
+        """Posterior mean and standard deviation in the original units"""
+        k_star = self.kernel(x, self.x, self.length_scale)
+        mean = k_star @ self.alpha
+        v = np.linalg.solve(self.chol, k_star.T)
+        variance = np.clip(1.0 - (v ** 2).sum(axis=0), 1e-12, None)
+        return self.y_mean + self.y_std * mean, self.y_std * np.sqrt(variance)
+
+def expected_improvement(mean, std, best):
+    """Expected improvement below the best observed cost"""
+    normal = NormalDist()
+    z = (best - mean) / std
+    cdf = np.array([normal.cdf(value) for value in z])
+    pdf = np.exp(-0.5 * z ** 2) / np.sqrt(2 * np.pi)
+    return (best - mean) * cdf + std * pdf
+
+# Per-process state: one resident model over all scenarios
+_worker_model = None
+
+def _init_worker(data_dir, co2_policy, objective, threads):
+    """Build the worker's fixed-design evaluation model once"""
+    global _worker_model
+    _worker_model = ScenarioSetModel(load_scenario_data(data_dir), dict(zip(SCENARIOS, SCENARIO_PROBABILITIES)),
+                                     data_dir=data_dir, co2_policy=co2_policy, objective=objective,
+                                     env=get_env(Threads=threads))
+
+def _evaluate_design(capacities):
+    """Expected total cost of a fixed design (NaN if the operational problem fails)"""
+    model = _worker_model
+    fix_design(model, capacities)
+    if not model.resolve():
+        return float('nan')
+    return model.model.ObjVal
+
+class BayesianDesignSearch:
+    def __init__(self, data_dir='data', co2_policy='medium_tax', objective='minimize_cost',
+                 initial_designs=None, rounds=None, batch_size=None, candidates=None, seed=None,
+                 max_workers=None, total_threads=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.initial_designs = BAYES_OPT['initial_designs'] if initial_designs is None else initial_designs
+        self.rounds = BAYES_OPT['rounds'] if rounds is None else rounds
+        self.batch_size = BAYES_OPT['batch_size'] if batch_size is None else batch_size
+        self.candidates = BAYES_OPT['candidates'] if candidates is None else candidates
+        self.rng = np.random.RandomState(BAYES_OPT['seed'] if seed is None else seed)
+        self.max_workers = BAYES_OPT['max_workers'] if max_workers is None else max_workers
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_worker = max(1, self.total_threads // self.max_workers)
+        
+        # Search space: technologies with explicit capacity limits (the others stay free)
+        self.techs = list(CAPACITY_LIMITS)
+        self.lower = np.array([CAPACITY_LIMITS[tech].get('min', 0) for tech in self.techs], dtype=float)
+        self.upper = np.array([CAPACITY_LIMITS[tech]['max'] for tech in self.techs], dtype=float)
+        
+        self.x = np.empty((0, len(self.techs)))
+        self.y = np.empty(0)
+        self.history = []
+    
+    def to_design(self, point):
+        """Capacities of a point of the unit cube"""
+        return dict(zip(self.techs, self.lower + point * (self.upper - self.lower)))
+    
+    def latin_hypercube(self, n):
+        """Space-filling initial points"""
+        points = np.empty((n, len(self.techs)))
+        for j in range(len(self.techs)):
+            points[:, j] = (self.rng.permutation(n) + self.rng.rand(n)) / n
+        return points
+    
+    def propose(self, gp):
+        """Batch of points by expected improvement with the kriging-believer heuristic"""
+        candidates = self.rng.rand(self.candidates, len(self.techs))
+        # Include perturbations of the incumbent to refine locally
+        best = self.x[np.argmin(self.y)]
+        local = np.clip(best + 0.05 * self.rng.randn(self.candidates // 4, len(self.techs)), 0, 1)
+        candidates = np.vstack([candidates, local])
+        
+        x, y = self.x.copy(), self.y.copy()
+        batch = []
+        for _ in range(self.batch_size):
+            mean, std = gp.predict(candidates)
+            ei = expected_improvement(mean, std, y.min())
+            i = int(np.argmax(ei))
+            batch.append(candidates[i])
+            
+            # Pretend the prediction was observed so the next pick moves elsewhere
+            x = np.vstack([x, candidates[i]])
+            y = np.append(y, mean[i])
+            gp = GaussianProcess().fit(x, y)
+            candidates = np.delete(candidates, i, axis=0)
+        
+        return np.array(batch)
+    
+    def evaluate(self, executor, points, label):
+        """Score a batch of points concurrently and add them to the observations"""
+        start_time = time.time()
+        costs = np.array(list(executor.map(_evaluate_design, [self.to_design(p) for p in points])), dtype=float)
+        failed = np.isnan(costs)
+        if failed.any():
+            # Failed designs count as the worst observation
+            observed = np.append(self.y, costs[~failed])
+            costs[failed] = observed.max() if len(observed) else 0.0
+        
+        self.x = np.vstack([self.x, points])
+        self.y = np.append(self.y, costs)
+        self.history.append({'round': label, 'batch_best': costs.min(), 'best': self.y.min(),
+                             'evaluations': len(self.y), 'time': time.time() - start_time})
+        print(f"{label:<8} {costs.min():>18,.0f} {self.y.min():>18,.0f} {len(self.y):>6} "
+              f"{time.time() - start_time:>9.2f}")
+    
+    def run(self, solve_exact=False):
+        """Search the design space; optionally solve the exact model from the best design"""
+        start_time = time.time()
+        args = (self.data_dir, self.co2_policy, self.objective, self.threads_per_worker)
+        
+        print("\n" + "-"*60)
+        print("BAYESIAN-OPTIMIZATION DESIGN SEARCH")
+        print("-"*60)
+        print(f"{'Round':<8} {'Batch best':>18} {'Best so far':>18} {'Evals':>6} {'Time (s)':>9}")
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=args) as executor:
+            self.evaluate(executor, self.latin_hypercube(self.initial_designs), 'init')
+            for round_number in range(1, self.rounds + 1):
+                gp = GaussianProcess().fit(self.x, self.y)
+                self.evaluate(executor, self.propose(gp), str(round_number))
+        
+        best = int(np.argmin(self.y))
+        result = {
+            'best_cost': self.y[best],
+            'best_capacities': self.to_design(self.x[best]),
+            'evaluations': len(self.y),
+            'history': self.history,
+            'search_time': time.time() - start_time
+        }
+        
+        print("-"*60)
+        print(f"Best expected total cost: ${result['best_cost']:,.0f} "
+              f"after {result['evaluations']} evaluations ({result['search_time']:.2f} s)")
+        for tech, cap in result['best_capacities'].items():
+            if cap > 0.01:
+                print(f"  {tech:<20} {cap:>10.2f}")
+        
+        if solve_exact:
+            result.update(self.solve_exact(result['best_capacities']))
+        return result
+    
+    def solve_exact(self, capacities):
+        """Solve the full stochastic model with the design as MIP start"""
+        model = WFENexusModel(data_dir=self.data_dir, co2_policy=self.co2_policy, objective=self.objective)
+        model.add_fallback_bounds()  # same operational bounds as the design evaluations
+        set_mip_start(model, capacities)
+        start_time = time.time()
+        model.resolve()
+        exact = {
+            'exact_status': model.model.status,
+            'exact_cost': model.model.ObjVal if model.model.SolCount > 0 else None,
+            'exact_time': time.time() - start_time
+        }
+        print(f"Exact model from MIP start: status {exact['exact_status']}, "
+              f"objective {exact['exact_cost']}, {exact['exact_time']:.2f} s")
+        model.dispose()
+        return exact
+
+if __name__ == "__main__":
+    BayesianDesignSearch(data_dir='../data').run(solve_exact=True)
@@ -0,0 +1,201 @@
+"""
+Wall-Clock Budgeted Sweep Scheduler for the WFE Nexus Model
+Runs an experiment grid within a global time budget: predicts each job's
+solve time from model size and past runs (run registry), assigns adaptive
+TimeLimit/MIPGap settings, gives leftover time to unfinished jobs (resumed
+from their checkpoints) and reports proven optimal vs gap-limited results
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from gurobipy import GRB
+import pandas as pd
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.experiment_runner import expand_grid, run_job, checkpoint_path
+from src.env_pool import init_worker
+from src.run_registry import RunRegistry
+
+def instance_size(data_dir):
+    """Size of the model built from data_dir (one build; the grid shares the structure)"""
+    nexus_model = WFENexusModel(data_dir=data_dir, solver_params={'OutputFlag': 0})
+    nexus_model.model.update()
+    size = {'num_vars': nexus_model.model.NumVars, 'num_int_vars': nexus_model.model.NumIntVars,
+            'num_constrs': nexus_model.model.NumConstrs + nexus_model.model.NumQConstrs}
+    nexus_model.dispose()
+    return size
+
+def predict_solve_time(job, data_dir, size, history):
+    """Predicted seconds to optimality from the closest past runs
+    
+    Same data, policy and objective first, then same data and objective, then the
+    median solve time per variable of all solved runs scaled to this model's size.
+    """
+    if len(history) > 0:
+        same_data = history[history['data_dir'] == os.path.abspath(data_dir)]
+        same_objective = same_data[same_data['objective'] == job.get('objective', 'minimize_cost')]
+        same_job = same_objective[same_objective['co2_policy'] == job.get('co2_policy', 'no_tax')]
+        for runs in [same_job, same_objective]:
+            if len(runs) > 0:
+                return float(runs['solve_time'].median())
+        return float((history['solve_time'] / history['num_vars']).median() * size['num_vars'])
+    return float(BUDGET_SCHEDULER['default_estimate'])
+
+class BudgetScheduler:
+    def __init__(self, grid=None, budget=None, data_dir='data', results_dir='results/budget_sweep',
+                 max_workers=None, total_threads=None, registry=None):
+        self.grid = EXPERIMENT_GRID if grid is None else grid
+        self.budget = BUDGET_SCHEDULER['budget'] if budget is None else budget
+        self.data_dir = data_dir
+        self.results_dir = results_dir
+        self.max_workers = EXPERIMENT_RUNNER['max_workers'] if max_workers is None else max_workers
+        total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_job = max(1, total_threads // self.max_workers)
+        self.registry = RunRegistry() if registry is None else registry
+        
+        self.jobs = {job['job_id']: job for job in expand_grid(self.grid)}
+        self.states = {job_id: {'predicted': None, 'rounds': 0, 'time_limit': 0.0, 'solve_time': 0.0,
+                                'result': None} for job_id in self.jobs}
+    
+    def predict(self):
+        """Predicted solve time of every job"""
+        size = instance_size(self.data_dir)
+        history = self.registry.runs(where='status = ? AND solve_time > 0', params=[GRB.OPTIMAL],
+                                     capacities=False)
+        for job_id, job in self.jobs.items():
+            self.states[job_id]['predicted'] = max(predict_solve_time(job, self.data_dir, size, history), 1.0)
+        
+        print(f"Model size: {size['num_vars']:,} variables ({size['num_int_vars']:,} integer), "
+              f"{size['num_constrs']:,} constraints; {len(history)} past runs")
+        return size
+    
+    def allocate(self, job_ids, remaining, first_round):
+        """TimeLimit/MIPGap per job from its share of the remaining worker time"""
+        capacity = remaining * self.max_workers
+        if first_round:
+            capacity *= 1 - BUDGET_SCHEDULER['reserve_fraction']
+        predicted = {job_id: self.states[job_id]['predicted'] for job_id in job_ids}
+        total = sum(predicted.values())
+        
+        params = {}
+        for job_id in job_ids:
+            share = capacity * predicted[job_id] / total
+            if first_round:
+                # Easy jobs get a few multiples of their prediction, hard jobs their share at a looser gap
+                limit = min(predicted[job_id] * BUDGET_SCHEDULER['safety_factor'], share)
+                gap = BUDGET_SCHEDULER['target_gap'] if share >= predicted[job_id] else BUDGET_SCHEDULER['relaxed_gap']
+            else:
+                limit = share
+                gap = BUDGET_SCHEDULER['target_gap']
+            limit = min(limit, remaining)  # a single job never outlasts the budget
+            params[job_id] = {'TimeLimit': max(limit, BUDGET_SCHEDULER['min_time_limit']), 'MIPGap': gap}
+        return params
+    
+    def unfinished(self):
+        """Jobs stopped by their TimeLimit or solved only to the relaxed gap"""
+        job_ids = []
+        for job_id, state in self.states.items():
+            result = state['result']
+            if result is None or result['status'] == 'error':
+                continue
+            if result['status'] == GRB.TIME_LIMIT or (
+                    result['status'] == GRB.OPTIMAL and result.get('mip_gap', 0) > BUDGET_SCHEDULER['target_gap']):
+                job_ids.append(job_id)
+        return job_ids
+    
+    def run_round(self, params):
+        # Longest limits first so the round packs onto the workers
+        order = sorted(params, key=lambda job_id: -params[job_id]['TimeLimit'])
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker,
+                                 initargs=(self.threads_per_job,)) as executor:
+            futures = {
+                executor.submit(run_job, self.jobs[job_id], self.data_dir, self.results_dir,
+                                self.threads_per_job, params[job_id], keep_checkpoint=True): job_id
+                for job_id in order
+            }
+            for future in as_completed(futures):
+                job_id = futures[future]
+                state = self.states[job_id]
+                state['result'] = future.result()
+                state['rounds'] += 1
+                state['time_limit'] += params[job_id]['TimeLimit']
+                state['solve_time'] += state['result'].get('solve_time', 0.0)
+                
+                # Checkpoints stay until a job reaches the target gap: later rounds continue from them
+                path = checkpoint_path(self.jobs[job_id], self.results_dir)
+                if self.outcome(state['result']) == 'proven_optimal' and os.path.exists(path):
+                    os.remove(path)
+    
+    def run(self):
+        """Run the grid within the budget and return the report DataFrame"""
+        os.makedirs(self.results_dir, exist_ok=True)
+        start_time = time.time()
+        self.predict()
+        
+        job_ids = list(self.jobs)
+        for round_number in range(1, BUDGET_SCHEDULER['max_rounds'] + 1):
+            remaining = self.budget - (time.time() - start_time)
+            if not job_ids or remaining < BUDGET_SCHEDULER['min_time_limit']:
+                break
+            
+            params = self.allocate(job_ids, remaining, first_round=round_number == 1)
+            print(f"\nRound {round_number}: {len(job_ids)} jobs, {remaining:.0f} s of budget left")
+            for job_id in job_ids:
+                print(f"  {job_id:<45} predicted {self.states[job_id]['predicted']:>8.1f} s  "
+                      f"TimeLimit {params[job_id]['TimeLimit']:>8.1f} s  MIPGap {params[job_id]['MIPGap']:g}")
+            self.run_round(params)
+            job_ids = self.unfinished()
+        
+        self.elapsed = time.time() - start_time
+        return self.report()
+    
+    def outcome(self, result):
+        if result is None:
+            return 'not_run'
+        if result['status'] == 'error':
+            return 'error'
+        if 'objective_value' not in result:
+            return 'no_solution'
+        if result['status'] == GRB.OPTIMAL and result.get('mip_gap', 0) <= BUDGET_SCHEDULER['target_gap']:
+            return 'proven_optimal'
+        return 'gap_limited'
+    
+    def report(self):
+        """Print and save proven optimal vs gap-limited results"""
+        rows = []
+        for job_id, state in self.states.items():
+            result = state['result'] or {}
+            rows.append({
+                'job_id': job_id,
+                'outcome': self.outcome(state['result']),
+                'status': result.get('status'),
+                'objective_value': result.get('objective_value', np.nan),
+                'mip_gap': result.get('mip_gap', np.nan),
+                'predicted_time': state['predicted'],
+                'time_limit': state['time_limit'],
+                'solve_time': state['solve_time'],
+                'rounds': state['rounds']
+            })
+        report = pd.DataFrame(rows)
+        
+        print("\n" + "-"*60)
+        print(f"BUDGETED SWEEP: {self.elapsed:.0f} s of {self.budget:.0f} s used")
+        print("-"*60)
+        print(f"{'Job':<45} {'Outcome':<15} {'Objective':>15} {'Gap (%)':>8} {'Time (s)':>9}")
+        for row in rows:
+            print(f"{row['job_id']:<45} {row['outcome']:<15} {row['objective_value']:>15,.0f} "
+                  f"{row['mip_gap']*100:>8.3f} {row['solve_time']:>9.1f}")
+        for outcome, count in report['outcome'].value_counts().items():
+            print(f"{outcome}: {count}")
+        
+        report.to_csv(os.path.join(self.results_dir, 'schedule.csv'), index=False)
+        print(f"\nSchedule report saved to: {os.path.join(self.results_dir, 'schedule.csv')}")
+        return report
+
+if __name__ == "__main__":
+    scheduler = BudgetScheduler(budget=2 * 3600, data_dir='../data', results_dir='../results/budget_sweep')
+    scheduler.run()
@@ -0,0 +1,191 @@
+"""
+Inverse Carbon-Price Solver for the WFE Nexus Model
+Finds the minimal CO2 tax that brings expected annual emissions down to a target
+
+Bisection on one warm-started model. Objective ranging needs an LP, so it is
+read from the fixed model (integers at the incumbent, bilinear terms linear):
+when the tax up to which that LP solution stays optimal lies beyond the
+midpoint, it is probed instead, jumping over the interval where the design
+does not change.
+Monotonicity of emissions in the tax keeps the search exact either way
+"""
+
+from gurobipy import GRB
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+
+def linear_fixed_model(model):
+    """Fixed model of a solved MIP with every bilinear term made linear by its fixed factor
+    
+    Returns None if a quadratic term has no fixed factor.
+    """
+    fixed = model.fixed()
+    fixed.update()
+    for qconstr in fixed.getQConstrs():
+        row = fixed.getQCRow(qconstr)
+        linear = row.getLinExpr()
+        for i in range(row.size()):
+            var1, var2 = row.getVar1(i), row.getVar2(i)
+            if var1.LB == var1.UB:
+                linear.add(var2, row.getCoeff(i) * var1.LB)
+            elif var2.LB == var2.UB:
+                linear.add(var1, row.getCoeff(i) * var2.LB)
+            else:
+                fixed.dispose()
+                return None
+        fixed.addLConstr(linear, qconstr.QCSense, qconstr.QCRHS, name=qconstr.QCName)
+        fixed.remove(qconstr)
+    return fixed
+
+class CarbonPriceSolver:
+    def __init__(self, model, max_tax=None, tolerance=None, max_iterations=None):
+        if model.objective_type == 'minimize_emissions':
+            raise ValueError("Carbon-price search needs a cost objective, got 'minimize_emissions'")
+        
+        self.model = model
+        self.max_tax = CARBON_PRICE_SEARCH['max_tax'] if max_tax is None else max_tax
+        self.tolerance = CARBON_PRICE_SEARCH['tolerance'] if tolerance is None else tolerance
+        self.max_iterations = (CARBON_PRICE_SEARCH['max_iterations']
+                               if max_iterations is None else max_iterations)
+        
+        # One entry per evaluated tax level
+        self.history = []
+    
+    def evaluate(self, co2_tax):
+        """Re-solve the model at a given CO2 tax and return expected annual emissions"""
+        self.model.set_co2_tax(co2_tax)
+        
+        start_time = time.time()
+        if not self.model.resolve():
+            raise RuntimeError(f"Solve at CO2 tax ${co2_tax:.2f}/ton failed with status {self.model.model.status}")
+        solve_time = time.time() - start_time
+        
+        emissions = self.model.calculate_annual_emissions()
+        
+        # Keep the incumbent investment plan as MIP start for the next tax level
+        if self.model.model.IsMIP:
+            for tech in self.model.all_techs:
+                self.model.v_cap[tech].Start = self.model.v_cap[tech].X
+                self.model.v_build[tech].Start = self.model.v_build[tech].X
+        
+        self.history.append({
+            'co2_tax': co2_tax,
+            'emissions': emissions,
+            'objective': self.model.model.ObjVal,
+            'solve_time': solve_time
+        })
+        
+        return emissions
+    
+    def stable_tax_limit(self):
+        """Highest tax up to which the current solution stays optimal for its fixed LP
+        
+        All emission cost coefficients move together with the tax, so the single-
+        coefficient ranges (SAObjUp) are combined with the 100% rule. For a MIP the
+        ranges come from the fixed model, so they hold for the incumbent's binaries
+        only; returns None if no fixed LP can be formed or solved.
+        """
+        model = self.model.model
+        lp = linear_fixed_model(model) if model.IsMIP or model.IsQCP else model
+        if lp is None:
+            return None
+        try:
+            if lp is not model:
+                lp.Params.OutputFlag = 0
+                lp.optimize()
+                if lp.status != GRB.OPTIMAL:
+                    return None
+            lp_vars = lp.getVars()
+            
+            ratio = 0
+            for (t, scenario), var in self.model.v_emissions.items():
+                prob = self.model.probabilities[scenario]
+                slope = prob * self.model.days_per_season
+                lp_var = lp_vars[var.index]
+                allowable_increase = lp_var.SAObjUp - lp_var.Obj
+                
+                if allowable_increase >= GRB.INFINITY:
+                    continue
+                if allowable_increase <= 0:
+                    return self.model.co2_tax
+                ratio += slope / allowable_increase
+        finally:
+            if lp is not model:
+                lp.dispose()
+        
+        if ratio == 0:
+            return float('inf')
+        return self.model.co2_tax + 1 / ratio
+    
+    def solve(self, emission_target):
+        """Find the minimal CO2 tax whose cost-optimal design emits at most emission_target"""
+        target = emission_target + 1e-6 * max(1.0, abs(emission_target))
+        ranged = 0
+        
+        # Bracket: emissions are non-increasing in the tax
+        low = 0.0
+        low_emissions = self.evaluate(low)
+        if low_emissions <= target:
+            return self._summarize(emission_target, low, low_emissions, True, ranged)
+        
+        # Tax up to which the solution at the lower bracket is known to stay optimal
+        low_limit = self.stable_tax_limit()
+        
+        high = float(self.max_tax)
+        high_emissions = self.evaluate(high)
+        if high_emissions > target:
+            return self._summarize(emission_target, high, high_emissions, False, ranged)
+        
+        for _ in range(self.max_iterations):
+            if high - low <= self.tolerance:
+                break
+            
+            # Bisect, or probe just past the tax where the lower bracket's design stops being optimal
+            # if that lies beyond the midpoint
+            probe = (low + high) / 2
+            if low_limit is not None and probe < low_limit < high - self.tolerance:
+                probe = low_limit + self.tolerance / 2
+                ranged += 1
+            probe_emissions = self.evaluate(probe)
+            
+            if probe_emissions <= target:
+                high, high_emissions = probe, probe_emissions
+                low_limit = None
+            else:
+                low = probe
+                low_limit = self.stable_tax_limit()
+        
+        # Leave the model solved at the reported tax
+        if self.model.co2_tax != high:
+            high_emissions = self.evaluate(high)
+        
+        return self._summarize(emission_target, high, high_emissions, True, ranged)
+    
+    def _summarize(self, emission_target, co2_tax, emissions, achievable, ranged):
+        """Collect and print the search result"""
+        result = {
+            'emission_target': emission_target,
+            'co2_tax': co2_tax,
+            'emissions': emissions,
+            'achievable': achievable,
+            'solves': len(self.history),
+            'ranging_probes': ranged,
+            'solve_time': sum(h['solve_time'] for h in self.history),
+            'history': list(self.history)
+        }
+        
+        print("\n" + "-"*60)
+        print("INVERSE CARBON-PRICE SEARCH")
+        print("-"*60)
+        print(f"Emission target: {emission_target:,.0f} tons CO2/year")
+        if achievable:
+            print(f"Minimal CO2 tax: ${co2_tax:,.2f}/ton (emissions {emissions:,.0f} tons/year)")
+        else:
+            print(f"Target not reached up to ${co2_tax:,.2f}/ton (emissions {emissions:,.0f} tons/year)")
+        print(f"Solves: {result['solves']}, ranging probes: {ranged}, "
+              f"solve time: {result['solve_time']:.2f} s")
+        
+        return result
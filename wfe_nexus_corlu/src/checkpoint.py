@@ -0,0 +1,140 @@
+"""
+Solve Checkpoints for the WFE Nexus Model
+Periodically persists the best incumbent and bound of a running MIP solve
+so a solve killed by a crash or reboot restarts from its incumbent (MIP
+start plus Cutoff) instead of from scratch
+"""
+
+from gurobipy import GRB
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.model_cache import model_fingerprint
+
+def chain_callbacks(*callbacks):
+    """One Gurobi callback calling several (None entries are skipped)"""
+    callbacks = [callback for callback in callbacks if callback is not None]
+    if len(callbacks) <= 1:
+        return callbacks[0] if callbacks else None
+    
+    def chained(model, where):
+        for callback in callbacks:
+            callback(model, where)
+    return chained
+
+def save_atomic(path, **arrays):
+    """np.savez to a side file, then rename, so a crash never leaves a partial checkpoint"""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+class SolveCheckpoint:
+    """Gurobi callback saving the incumbent and bound every interval seconds"""
+    def __init__(self, nexus_model, path, interval=None):
+        self.nexus_model = nexus_model
+        self.path = path
+        self.interval = CHECKPOINT['interval'] if interval is None else interval
+        nexus_model.model.update()  # variables of a freshly built model are pending until update()
+        self.vars = nexus_model.model.getVars()
+        self.fingerprint = model_fingerprint(nexus_model)
+        
+        self.objective = GRB.INFINITY
+        self.bound = -GRB.INFINITY
+        self.solution = None
+        self.previous_runtime = 0.0  # solve time spent before the last restart
+        self.dirty = False
+        self.last_save = 0.0
+        self.resumed = False
+    
+    def resume(self):
+        """Load a matching checkpoint and set it as MIP start and Cutoff; False if there is none"""
+        if not os.path.exists(self.path):
+            return False
+        with np.load(self.path) as checkpoint:
+            if str(checkpoint['fingerprint']) != self.fingerprint or int(checkpoint['num_vars']) != len(self.vars):
+                print(f"Ignoring checkpoint {self.path}: model or data changed")
+                return False
+            self.objective = float(checkpoint['objective'])
+            self.bound = float(checkpoint['bound'])
+            self.previous_runtime = float(checkpoint['runtime'])
+            self.solution = checkpoint['solution'] if checkpoint['solution'].size else None
+        
+        if self.solution is not None:
+            model = self.nexus_model.model
+            model.setAttr('Start', self.vars, self.solution.tolist())
+            # All WFE objectives minimize: only nodes that can beat the incumbent are explored
+            tolerance = CHECKPOINT['cutoff_tolerance'] * max(abs(self.objective), 1.0)
+            model.setParam('Cutoff', self.objective + tolerance)
+        self.resumed = True
+        print(f"Resumed from {self.path}: incumbent {self.objective:,.2f}, bound {self.bound:,.2f}, "
+              f"{self.previous_runtime:.1f} s solved before")
+        return True
+    
+    def save(self, runtime, complete=False):
+        save_atomic(self.path, fingerprint=np.array(self.fingerprint), num_vars=np.array(len(self.vars)),
+                    objective=np.array(self.objective), bound=np.array(self.bound),
+                    runtime=np.array(self.previous_runtime + runtime),
+                    solution=self.solution if self.solution is not None else np.empty(0),
+                    complete=np.array(complete))
+        self.dirty = False
+        self.last_save = runtime
+    
+    def __call__(self, model, where):
+        if where == GRB.Callback.MIPSOL:
+            objective = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+            if objective < self.objective:
+                self.objective = objective
+                self.solution = np.array(model.cbGetSolution(self.vars))
+                self.dirty = True
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+        elif where == GRB.Callback.MIP:
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            if bound > self.bound:
+                self.bound = bound
+                self.dirty = True
+            runtime = model.cbGet(GRB.Callback.RUNTIME)
+        else:
+            return
+        
+        # RUNTIME restarts at zero when the model is optimized again (e.g. after add_fallback_bounds)
+        if runtime < self.last_save:
+            self.last_save = 0.0
+        if self.dirty and runtime - self.last_save >= self.interval:
+            self.save(runtime)
+    
+    def finish(self):
+        """Save the final state of the solve"""
+        model = self.nexus_model.model
+        if model.SolCount > 0 and model.ObjVal < self.objective:
+            self.objective = model.ObjVal
+            self.solution = np.array(model.getAttr('X', self.vars))
+        if model.IsMIP and model.SolCount > 0:
+            self.bound = max(self.bound, model.ObjBound)
+        self.save(model.Runtime, complete=model.status == GRB.OPTIMAL)
+    
+    def gap(self):
+        """Gap of the best incumbent against the best bound over all restarts"""
+        if self.objective >= GRB.INFINITY:
+            return float('inf')
+        return abs(self.objective - self.bound) / max(abs(self.objective), 1e-10)
+
+def optimize_with_checkpoint(nexus_model, path, interval=None, method='resolve', callback=None):
+    """Solve a WFENexusModel, resuming from and checkpointing to path"""
+    checkpoint = SolveCheckpoint(nexus_model, path, interval)
+    checkpoint.resume()
+    getattr(nexus_model, method)(callback=chain_callbacks(checkpoint, callback))
+    checkpoint.finish()
+    return checkpoint
+
+if __name__ == "__main__":
+    model = WFENexusModel(data_dir='../data', co2_policy='medium_tax', solver_params={'TimeLimit': 4 * 3600})
+    checkpoint = optimize_with_checkpoint(model, '../results/checkpoints/medium_tax.npz', method='optimize')
+    
+    print("-"*60)
+    print(f"Incumbent: ${checkpoint.objective:,.0f}")
+    print(f"Bound:     ${checkpoint.bound:,.0f} (gap {checkpoint.gap()*100:.2f}%)")
+    print(f"Total solve time: {checkpoint.previous_runtime + model.model.Runtime:.1f} s")
@@ -0,0 +1,167 @@
+"""
+Multi-Fidelity Continuation for the WFE Nexus Model
+Solves with few representative days first and refines the temporal
+resolution level by level, passing each coarse design on as MIP start and
+as a bound window on v_cap, until the capacities stabilize
+"""
+
+import pandas as pd
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.instance_planner import ReducedDayModel, load_sets, day_of, select_days
+
+def capacity_change(previous, current):
+    """Largest capacity change between two designs, relative to the larger capacity
+    (absolute below capacity_floor of the capacity limit)"""
+    change = 0.0
+    for tech in current:
+        limit = CAPACITY_LIMITS.get(tech, {}).get('max', 1000)
+        scale = max(previous.get(tech, 0), current[tech], CONTINUATION['capacity_floor'] * limit)
+        change = max(change, abs(current[tech] - previous.get(tech, 0)) / scale)
+    return change
+
+class ContinuationSolver:
+    def __init__(self, data_dir='data', co2_policy='no_tax', objective='minimize_cost', levels=None,
+                 tolerance=None, solver_params=None, exclude_techs=None, env=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.tolerance = CONTINUATION['tolerance'] if tolerance is None else tolerance
+        self.solver_params = dict(solver_params or {})
+        self.exclude_techs = exclude_techs
+        self.env = env
+        
+        sets = load_sets(data_dir, exclude_techs)
+        self.days = list(dict.fromkeys(day_of(t) for t in sets.time_periods))
+        levels = CONTINUATION['levels'] if levels is None else levels
+        self.levels = sorted({min(count, len(self.days)) for count in levels})
+        
+        self.history = []
+        self.model = None
+    
+    def tighten(self, nexus_model, capacities):
+        """Bound window on v_cap around a coarse design"""
+        for tech in nexus_model.all_techs:
+            cap = capacities.get(tech, 0)
+            limit = CAPACITY_LIMITS.get(tech, {}).get('max', 1000)
+            upper = max(cap * (1 + CONTINUATION['upper_margin']), CONTINUATION['window'] * limit)
+            nexus_model.v_cap[tech].UB = min(limit, upper)
+            if cap > 1e-6:
+                nexus_model.v_cap[tech].LB = cap * (1 - CONTINUATION['lower_margin'])
+                nexus_model.v_build[tech].LB = 1
+    
+    def warm_start(self, nexus_model, capacities):
+        """Coarse design as MIP start of the first-stage variables"""
+        for tech in nexus_model.all_techs:
+            cap = capacities.get(tech, 0)
+            nexus_model.v_cap[tech].Start = cap
+            nexus_model.v_build[tech].Start = 1 if cap > 1e-6 else 0
+    
+    def solve_level(self, count, capacities, final, fixed=None):
+        days = select_days(self.days, count)
+        params = dict(self.solver_params)
+        if not final:
+            params.setdefault('MIPGap', CONTINUATION['level_mip_gap'])
+        
+        start_time = time.time()
+        nexus_model = ReducedDayModel(days, data_dir=self.data_dir, co2_policy=self.co2_policy,
+                                      objective=self.objective, solver_params=params, env=self.env,
+                                      exclude_techs=self.exclude_techs)
+        build_time = time.time() - start_time
+        
+        if fixed is not None:
+            nexus_model.fix_first_stage(fixed)
+        elif capacities is not None:
+            self.warm_start(nexus_model, capacities)
+            if not final or CONTINUATION['tighten_final']:
+                self.tighten(nexus_model, capacities)
+        
+        nexus_model.resolve()
+        model = nexus_model.model
+        level = {
+            'days': count,
+            'hours': len(nexus_model.time_periods),
+            'num_vars': model.NumVars,
+            'build_time': build_time,
+            'solve_time': model.Runtime,
+            'status': model.status,
+            'objective': model.ObjVal if model.SolCount > 0 else None,
+            'mip_gap': model.MIPGap if model.SolCount > 0 else None,
+            'fixed_design': fixed is not None,
+            'capacities': None,
+            'change': None
+        }
+        if model.SolCount > 0:
+            level['capacities'] = {tech: nexus_model.v_cap[tech].X for tech in nexus_model.all_techs}
+            if capacities is not None:
+                level['change'] = capacity_change(capacities, level['capacities'])
+        return nexus_model, level
+    
+    def run(self):
+        """Solve level by level; returns the model of the last level solved"""
+        capacities = None
+        for i, count in enumerate(self.levels):
+            final = i == len(self.levels) - 1
+            if self.model is not None:
+                self.model.dispose()
+            self.model, level = self.solve_level(count, capacities, final)
+            self.history.append(level)
+            change = '' if level['change'] is None else f", capacity change {level['change']*100:.1f}%"
+            print(f"Level {i + 1}: {count} days ({level['hours']} hours), status {level['status']}, "
+                  f"objective {level['objective'] if level['objective'] is not None else float('nan'):,.0f}, "
+                  f"{level['solve_time']:.1f} s{change}")
+            
+            if level['capacities'] is None:
+                print("No solution at this level; continuing without a coarse design")
+                continue
+            if level['change'] is not None and level['change'] <= self.tolerance and not final:
+                print(f"Capacities stable within {self.tolerance*100:.0f}%: stopping before full resolution")
+                if CONTINUATION['evaluate_stable']:
+                    self.evaluate(level['capacities'])
+                break
+            capacities = level['capacities']
+        return self.model
+    
+    def evaluate(self, capacities):
+        """Operate a stable design at full resolution (first stage fixed) for its true objective"""
+        self.model.dispose()
+        self.model, level = self.solve_level(len(self.days), None, final=True, fixed=capacities)
+        self.history.append(level)
+        print(f"Full resolution with the stable design: status {level['status']}, "
+              f"objective {level['objective'] if level['objective'] is not None else float('nan'):,.0f}, "
+              f"{level['solve_time']:.1f} s")
+    
+    def summary(self):
+        """One row per level with its capacities"""
+        rows = []
+        for level in self.history:
+            row = {key: value for key, value in level.items() if key != 'capacities'}
+            for tech, cap in (level['capacities'] or {}).items():
+                row[f'cap_{tech}'] = cap
+            rows.append(row)
+        return pd.DataFrame(rows)
+    
+    def print_summary(self):
+        print("-"*60)
+        print("MULTI-FIDELITY CONTINUATION")
+        print("-"*60)
+        print(f"{'Days':>5} {'Hours':>6} {'Variables':>10} {'Objective':>16} {'Change (%)':>11} {'Time (s)':>9}")
+        for level in self.history:
+            objective = f"{level['objective']:,.0f}" if level['objective'] is not None else '-'
+            change = f"{level['change']*100:.1f}" if level['change'] is not None else '-'
+            print(f"{level['days']:>5} {level['hours']:>6} {level['num_vars']:>10,} {objective:>16} "
+                  f"{change:>11} {level['solve_time']:>9.1f}")
+        
+        final = self.history[-1]['capacities'] or {}
+        built = {tech: cap for tech, cap in final.items() if cap > 1e-3}
+        print(f"\nFinal design: {', '.join(f'{tech} {cap:.2f}' for tech, cap in built.items())}")
+        print(f"Total solve time: {sum(level['solve_time'] for level in self.history):.1f} s")
+
+if __name__ == "__main__":
+    solver = ContinuationSolver(data_dir='../data', co2_policy='medium_tax')
+    solver.run()
+    solver.print_summary()
+    solver.summary().to_csv('../results/continuation_levels.csv', index=False)
@@ -15,7 +15,7 @@ class DataGenerator:
         self.seasons = ['winter', 'spring', 'summer', 'autumn']
         self.hours_per_season = HOURS_PER_DAY
         self.scenarios = SCENARIOS
-        
+    
     def generate_time_index(self):
         """Generate time index for representative days"""
         time_index = []
@@ -26,167 +26,199 @@ class DataGenerator:
     
     def generate_renewable_profiles(self):
         """Generate renewable availability profiles for PV and Wind"""
-        time_index = self.generate_time_index()
         renewable_data = {}
         
         for scenario in self.scenarios:
-            scenario_data = pd.DataFrame(index=time_index)
-            
-            # PV profiles (daily pattern with seasonal variation)
-            pv_profile = []
-            for season in self.seasons:
-                base_factor = RENEWABLE_AVAILABILITY['pv'][season][scenario.split('_')[0]]
-                for hour in range(24):
-                    if 6 <= hour <= 18:  # Daylight hours
-                        # Bell curve shape for solar
-                        hour_factor = np.sin((hour - 6) * np.pi / 12)
-                        pv_profile.append(base_factor * hour_factor * 4)  # Peak at noon
-                    else:
-                        pv_profile.append(0)
-            
-            # Wind profiles (more random with seasonal patterns)
-            wind_profile = []
-            for season in self.seasons:
-                base_factor = RENEWABLE_AVAILABILITY['wind'][season][scenario.split('_')[0]]
-                for hour in range(24):
-                    # Wind with some randomness and daily pattern
-                    hour_factor = 1 + 0.3 * np.sin(hour * np.pi / 12)
-                    noise = np.random.normal(0, 0.1)
-                    wind_profile.append(max(0, base_factor * hour_factor + noise))
-            
-            scenario_data['pv_availability'] = pv_profile
-            scenario_data['wind_availability'] = wind_profile
-            renewable_data[scenario] = scenario_data
-            
+            renewable_data[scenario] = self.generate_renewable_profile(scenario)
+        
         return renewable_data
     
+    def generate_renewable_profile(self, scenario, rng=np.random):
+        """Generate PV and Wind availability for one scenario"""
+        time_index = self.generate_time_index()
+        scenario_data = pd.DataFrame(index=time_index)
+        
+        # PV profiles (daily pattern with seasonal variation)
+        pv_profile = []
+        for season in self.seasons:
+            base_factor = RENEWABLE_AVAILABILITY['pv'][season][scenario.split('_')[0]]
+            for hour in range(24):
+                if 6 <= hour <= 18:  # Daylight hours
+                    # Bell curve shape for solar
+                    hour_factor = np.sin((hour - 6) * np.pi / 12)
+                    pv_profile.append(base_factor * hour_factor * 4)  # Peak at noon
+                else:
+                    pv_profile.append(0)
+        
+        # Wind profiles (more random with seasonal patterns)
+        wind_profile = []
+        for season in self.seasons:
+            base_factor = RENEWABLE_AVAILABILITY['wind'][season][scenario.split('_')[0]]
+            for hour in range(24):
+                # Wind with some randomness and daily pattern
+                hour_factor = 1 + 0.3 * np.sin(hour * np.pi / 12)
+                noise = rng.normal(0, 0.1)
+                wind_profile.append(max(0, base_factor * hour_factor + noise))
+        
+        scenario_data['pv_availability'] = pv_profile
+        scenario_data['wind_availability'] = wind_profile
+        return scenario_data
+    
     def generate_demand_profiles(self):
         """Generate demand profiles for electricity, heat, water, etc."""
-        time_index = self.generate_time_index()
         demand_data = {}
         
         for scenario in self.scenarios:
-            scenario_data = pd.DataFrame(index=time_index)
-            
-            # Electricity demand (daily and seasonal patterns)
-            elec_demand = []
-            for season in self.seasons:
-                season_factor = {'winter': 1.2, 'spring': 1.0, 'summer': 1.1, 'autumn': 1.0}[season]
-                for hour in range(24):
-                    # Typical daily load curve
-                    if 7 <= hour <= 9 or 18 <= hour <= 21:  # Peak hours
-                        hour_factor = 1.3
-                    elif 0 <= hour <= 6 or 22 <= hour <= 23:  # Off-peak
-                        hour_factor = 0.7
-                    else:  # Normal hours
-                        hour_factor = 1.0
-                    
-                    base_demand = BASE_DEMANDS['electricity']
-                    elec_demand.append(base_demand * season_factor * hour_factor)
-            
-            # Heat demand (stronger seasonal variation)
-            heat_demand = []
-            for season in self.seasons:
-                season_factor = {'winter': 2.0, 'spring': 1.0, 'summer': 0.3, 'autumn': 1.2}[season]
-                for hour in range(24):
-                    # Heat demand peaks in morning and evening
-                    if 6 <= hour <= 9 or 17 <= hour <= 22:
-                        hour_factor = 1.3
-                    else:
-                        hour_factor = 0.8
-                    
-                    base_demand = BASE_DEMANDS['heat']
-                    heat_demand.append(base_demand * season_factor * hour_factor)
-            
-            # Water demand (relatively constant with some daily variation)
-            water_demand = []
-            for season in self.seasons:
-                season_factor = {'winter': 0.9, 'spring': 1.0, 'summer': 1.2, 'autumn': 1.0}[season]
-                for hour in range(24):
-                    # Water demand varies throughout the day
-                    if 6 <= hour <= 22:
-                        hour_factor = 1.1
-                    else:
-                        hour_factor = 0.8
-                    
-                    base_demand = BASE_DEMANDS['water'] / 24  # Convert daily to hourly
-                    water_demand.append(base_demand * season_factor * hour_factor)
-            
-            # Fertilizer demand (seasonal for agriculture)
-            fertilizer_demand = []
-            for season in self.seasons:
-                # Higher demand in spring and summer
-                season_factor = {'winter': 0.2, 'spring': 2.0, 'summer': 1.5, 'autumn': 0.3}[season]
-                daily_demand = BASE_DEMANDS['fertilizer_n'] * season_factor / 24
-                fertilizer_demand.extend([daily_demand] * 24)
-            
-            # Hydrogen demand (industrial, relatively constant)
-            h2_demand = [BASE_DEMANDS['hydrogen'] / 24] * len(time_index)
-            
-            scenario_data['electricity_demand'] = elec_demand
-            scenario_data['heat_demand'] = heat_demand
-            scenario_data['water_demand'] = water_demand
-            scenario_data['fertilizer_n_demand'] = fertilizer_demand
-            scenario_data['hydrogen_demand'] = h2_demand
-            
-            demand_data[scenario] = scenario_data
-            
+            demand_data[scenario] = self.generate_demand_profile(scenario)
+        
         return demand_data
     
+    def generate_demand_profile(self, scenario):
+        """Generate demand profiles for one scenario"""
+        time_index = self.generate_time_index()
+        scenario_data = pd.DataFrame(index=time_index)
+        
+        # Electricity demand (daily and seasonal patterns)
+        elec_demand = []
+        for season in self.seasons:
+            season_factor = {'winter': 1.2, 'spring': 1.0, 'summer': 1.1, 'autumn': 1.0}[season]
+            for hour in range(24):
+                # Typical daily load curve
+                if 7 <= hour <= 9 or 18 <= hour <= 21:  # Peak hours
+                    hour_factor = 1.3
+                elif 0 <= hour <= 6 or 22 <= hour <= 23:  # Off-peak
+                    hour_factor = 0.7
+                else:  # Normal hours
+                    hour_factor = 1.0
+                
+                base_demand = BASE_DEMANDS['electricity']
+                elec_demand.append(base_demand * season_factor * hour_factor)
+        
+        # Heat demand (stronger seasonal variation)
+        heat_demand = []
+        for season in self.seasons:
+            season_factor = {'winter': 2.0, 'spring': 1.0, 'summer': 0.3, 'autumn': 1.2}[season]
+            for hour in range(24):
+                # Heat demand peaks in morning and evening
+                if 6 <= hour <= 9 or 17 <= hour <= 22:
+                    hour_factor = 1.3
+                else:
+                    hour_factor = 0.8
+                
+                base_demand = BASE_DEMANDS['heat']
+                heat_demand.append(base_demand * season_factor * hour_factor)
+        
+        # Water demand (relatively constant with some daily variation)
+        water_demand = []
+        for season in self.seasons:
+            season_factor = {'winter': 0.9, 'spring': 1.0, 'summer': 1.2, 'autumn': 1.0}[season]
+            for hour in range(24):
+                # Water demand varies throughout the day
+                if 6 <= hour <= 22:
+                    hour_factor = 1.1
+                else:
+                    hour_factor = 0.8
+                
+                base_demand = BASE_DEMANDS['water'] / 24  # Convert daily to hourly
+                water_demand.append(base_demand * season_factor * hour_factor)
+        
+        # Fertilizer demand (seasonal for agriculture)
+        fertilizer_demand = []
+        for season in self.seasons:
+            # Higher demand in spring and summer
+            season_factor = {'winter': 0.2, 'spring': 2.0, 'summer': 1.5, 'autumn': 0.3}[season]
+            daily_demand = BASE_DEMANDS['fertilizer_n'] * season_factor / 24
+            fertilizer_demand.extend([daily_demand] * 24)
+        
+        # Hydrogen demand (industrial, relatively constant)
+        h2_demand = [BASE_DEMANDS['hydrogen'] / 24] * len(time_index)
+        
+        scenario_data['electricity_demand'] = elec_demand
+        scenario_data['heat_demand'] = heat_demand
+        scenario_data['water_demand'] = water_demand
+        scenario_data['fertilizer_n_demand'] = fertilizer_demand
+        scenario_data['hydrogen_demand'] = h2_demand
+        
+        return scenario_data
+    
     def generate_price_profiles(self):
         """Generate price profiles for electricity and other commodities"""
-        time_index = self.generate_time_index()
         price_data = {}
         
         for scenario in self.scenarios:
-            scenario_data = pd.DataFrame(index=time_index)
-            
-            # Electricity prices (time-of-use)
-            elec_buy_price = []
-            elec_sell_price = []
-            
-            for season in self.seasons:
-                for hour in range(24):
-                    base_buy = ENERGY_PRICES['electricity_buy']['base']
-                    base_sell = ENERGY_PRICES['electricity_sell']['base']
-                    
-                    # Peak pricing
-                    if 7 <= hour <= 9 or 18 <= hour <= 21:
-                        buy_multiplier = ENERGY_PRICES['electricity_buy']['peak_multiplier']
-                        sell_multiplier = 1.2
-                    elif 0 <= hour <= 6 or 22 <= hour <= 23:
-                        buy_multiplier = ENERGY_PRICES['electricity_buy']['off_peak_multiplier']
-                        sell_multiplier = 0.8
-                    else:
-                        buy_multiplier = 1.0
-                        sell_multiplier = 1.0
-                    
-                    # Add some market volatility
-                    volatility = np.random.normal(1.0, 0.05)
-                    
-                    elec_buy_price.append(base_buy * buy_multiplier * volatility)
-                    elec_sell_price.append(base_sell * sell_multiplier * volatility)
-            
-            # Natural gas price (seasonal variation)
-            gas_price = []
-            for season in self.seasons:
-                season_factor = {'winter': 1.2, 'spring': 0.9, 'summer': 0.8, 'autumn': 1.0}[season]
-                base_gas = ENERGY_PRICES['natural_gas']['base']
-                season_price = base_gas * season_factor
-                gas_price.extend([season_price] * 24)
-            
-            scenario_data['electricity_buy_price'] = elec_buy_price
-            scenario_data['electricity_sell_price'] = elec_sell_price
-            scenario_data['natural_gas_price'] = gas_price
-            
-            # Constant product prices
-            for product, price in PRODUCT_PRICES.items():
-                scenario_data[f'{product}_price'] = price
-            
-            price_data[scenario] = scenario_data
-            
+            price_data[scenario] = self.generate_price_profile(scenario)
+        
         return price_data
     
+    def generate_price_profile(self, scenario, rng=np.random):
+        """Generate price profiles for one scenario"""
+        time_index = self.generate_time_index()
+        scenario_data = pd.DataFrame(index=time_index)
+        
+        # Electricity prices (time-of-use)
+        elec_buy_price = []
+        elec_sell_price = []
+        
+        for season in self.seasons:
+            for hour in range(24):
+                base_buy = ENERGY_PRICES['electricity_buy']['base']
+                base_sell = ENERGY_PRICES['electricity_sell']['base']
+                
+                # Peak pricing
+                if 7 <= hour <= 9 or 18 <= hour <= 21:
+                    buy_multiplier = ENERGY_PRICES['electricity_buy']['peak_multiplier']
+                    sell_multiplier = 1.2
+                elif 0 <= hour <= 6 or 22 <= hour <= 23:
+                    buy_multiplier = ENERGY_PRICES['electricity_buy']['off_peak_multiplier']
+                    sell_multiplier = 0.8
+                else:
+                    buy_multiplier = 1.0
+                    sell_multiplier = 1.0
+                
+                # Add some market volatility
+                volatility = rng.normal(1.0, 0.05)
+                
+                elec_buy_price.append(base_buy * buy_multiplier * volatility)
+                elec_sell_price.append(base_sell * sell_multiplier * volatility)
+        
+        # Natural gas price (seasonal variation)
+        gas_price = []
+        for season in self.seasons:
+            season_factor = {'winter': 1.2, 'spring': 0.9, 'summer': 0.8, 'autumn': 1.0}[season]
+            base_gas = ENERGY_PRICES['natural_gas']['base']
+            season_price = base_gas * season_factor
+            gas_price.extend([season_price] * 24)
+        
+        scenario_data['electricity_buy_price'] = elec_buy_price
+        scenario_data['electricity_sell_price'] = elec_sell_price
+        scenario_data['natural_gas_price'] = gas_price
+        
+        # Constant product prices
+        for product, price in PRODUCT_PRICES.items():
+            scenario_data[f'{product}_price'] = price
+        
+        return scenario_data
+    
+    def sample_scenarios(self, n_samples, seed, start=0):
+        """Draw scenarios with renewable levels weighted by SCENARIO_PROBABILITIES
+        
+        Sample i is generated from the seed sequence (seed, i), so every sample
+        (and any subset of a stream) is reproducible on its own.
+        """
+        samples = {}
+        
+        for i in range(start, start + n_samples):
+            rng = np.random.RandomState([seed, i])
+            scenario = self.scenarios[rng.choice(len(self.scenarios), p=SCENARIO_PROBABILITIES)]
+            
+            samples[f"sample_{i:05d}"] = (
+                self.generate_renewable_profile(scenario, rng),
+                self.generate_demand_profile(scenario),
+                self.generate_price_profile(scenario, rng)
+            )
+        
+        return samples
+    
     def generate_wwtp_data(self):
         """Generate wastewater treatment plant data"""
         wwtp_data = {
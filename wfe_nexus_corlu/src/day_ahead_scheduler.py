@@ -0,0 +1,198 @@
+"""
+Day-Ahead Operational Scheduler for the WFE Nexus
+Dispatches battery, electrolyzer, CHP and grid trades for the installed
+capacities, keeping one single-scenario model resident across days
+"""
+
+from gurobipy import GRB
+import pandas as pd
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+
+FORECAST_SCENARIO = 'forecast'
+
+def capacities_from_model(nexus_model):
+    """Installed capacities of a solved WFENexusModel"""
+    return {tech: nexus_model.v_cap[tech].X for tech in nexus_model.all_techs}
+
+def forecast_from_data(data_dir, scenario='average_renewable', start=0, horizon=None):
+    """Slice a forecast (renewable, demand, price) out of the scenario CSV files"""
+    horizon = DAY_AHEAD_SCHEDULING['horizon'] if horizon is None else horizon
+    frames = []
+    for kind in ['renewable', 'demand', 'price']:
+        data = pd.read_csv(os.path.join(data_dir, f'{kind}_{scenario}.csv'), index_col=0)
+        # Wrap around so 48 h horizons work on the 4 representative days
+        rows = [(start + i) % len(data) for i in range(horizon)]
+        frames.append(data.iloc[rows])
+    return tuple(frames)
+
+class DayAheadScheduler(WFENexusModel):
+    def __init__(self, capacities, forecast, data_dir='data', co2_tax=0, relax_commitment=None,
+                 initial_soc=None, solver_params=None, env=None):
+        self.data_dir = data_dir
+        self.co2_policy = 'custom'
+        self.co2_tax = co2_tax
+        self.discount_rate = DISCOUNT_RATE
+        self.objective_type = 'minimize_cost'
+        self.capacities = dict(capacities)
+        self.relax_commitment = (DAY_AHEAD_SCHEDULING['relax_commitment']
+                                 if relax_commitment is None else relax_commitment)
+        
+        # Load WWTP data and the first forecast
+        self.load_data()
+        self.set_forecast_data(*forecast)
+        
+        # Define sets
+        self.define_sets()
+        
+        # Build the dispatch model once
+        self.build(env)
+        if self.relax_commitment:
+            for var in list(self.v_is_on.values()) + list(self.v_startup.values()) + list(self.v_shutdown.values()):
+                var.VType = GRB.CONTINUOUS
+                var.UB = 1
+        self.add_fallback_bounds()
+        
+        for param, value in (solver_params or {'OutputFlag': 0}).items():
+            self.model.setParam(param, value)
+        
+        self.model.update()
+        self.collect_constraints()
+        self.set_initial_soc(initial_soc)
+    
+    def load_data(self):
+        """Load WWTP data (forecasts are passed in)"""
+        self.wwtp_data = pd.read_csv(os.path.join(self.data_dir, 'wwtp_data.csv')).iloc[0]
+    
+    def set_forecast_data(self, renewable, demand, price):
+        """Store the first forecast under positional hour labels"""
+        labels = [f"h{i:02d}" for i in range(len(renewable))]
+        if not (len(renewable) == len(demand) == len(price)):
+            raise ValueError("Renewable, demand and price forecasts must cover the same hours")
+        
+        self.renewable_data = {FORECAST_SCENARIO: renewable.set_axis(labels)}
+        self.demand_data = {FORECAST_SCENARIO: demand.set_axis(labels)}
+        self.price_data = {FORECAST_SCENARIO: price.set_axis(labels)}
+    
+    def scenario_probabilities(self):
+        """The forecast is the only scenario"""
+        return {FORECAST_SCENARIO: 1.0}
+    
+    def create_variables(self):
+        """Capacities are fixed numbers; only operational variables are created"""
+        self.v_cap = {tech: float(self.capacities.get(tech, 0)) for tech in self.all_techs}
+        self.v_build = {tech: 1.0 if self.v_cap[tech] > 0 else 0.0 for tech in self.all_techs}
+        self.create_operational_variables()
+    
+    def set_objective(self):
+        """Minimize the operating cost of the scheduled horizon"""
+        scenario = FORECAST_SCENARIO
+        cost = 0
+        
+        for t in self.time_periods:
+            price = self.price_data[scenario].loc[t]
+            
+            # Variable O&M costs
+            for tech in self.tech_generation:
+                if tech in VARIABLE_OPEX:
+                    cost += VARIABLE_OPEX[tech] * self.v_gen[(tech, t, scenario)] / 1000
+            
+            # Energy purchases and sales
+            cost += price['electricity_buy_price'] * self.v_grid_buy[('electricity', t, scenario)] / 1000
+            cost += price['natural_gas_price'] * self.v_grid_buy[('gas', t, scenario)] / 1000
+            cost -= price['electricity_sell_price'] * self.v_grid_sell[('electricity', t, scenario)] / 1000
+            
+            # Product revenues
+            cost -= PRODUCT_PRICES['reclaimed_water'] * self.v_production[('water_reclamation', t, scenario)]
+            cost -= PRODUCT_PRICES['fertilizer_n'] * self.v_production[('n_recovery', t, scenario)] / 1000
+            cost -= PRODUCT_PRICES['ammonia'] * self.v_production[('haber_bosch', t, scenario)] / 1000
+            
+            # CO2 costs and unmet demand penalties
+            cost += self.co2_tax * self.v_emissions[(t, scenario)]
+            for slack in [self.v_heat_slack, self.v_h2_slack, self.v_n_slack]:
+                if (t, scenario) in slack:
+                    cost += PENALTY_RATE * slack[(t, scenario)]
+        
+        # Costs are per scheduled horizon, not annualized
+        self.days_per_season = 1
+        self.model.setObjective(cost, GRB.MINIMIZE)
+    
+    def collect_constraints(self):
+        """Look up the initial storage level constraints once"""
+        t0 = self.time_periods[0]
+        self.c_soc_init = {storage: self.model.getConstrByName(f"soc_init_{storage}_{t0}_{FORECAST_SCENARIO}")
+                           for storage in self.tech_storage}
+    
+    def set_initial_soc(self, initial_soc=None):
+        """Set initial storage levels (absolute units per storage; default share of capacity)"""
+        initial_soc = initial_soc or {}
+        for storage in self.tech_storage:
+            level = initial_soc.get(storage, DAY_AHEAD_SCHEDULING['initial_soc'] * self.v_cap[storage])
+            self.c_soc_init[storage].RHS = level
+    
+    def update_forecast(self, renewable, demand, price, initial_soc=None):
+        """Update availability, demands, prices and initial SOC in place"""
+        self.update_scenario_data(FORECAST_SCENARIO, renewable, demand, price)
+        
+        if initial_soc is not None:
+            self.set_initial_soc(initial_soc)
+    
+    def schedule(self):
+        """Re-solve from the previous basis and return the schedule as arrays"""
+        start_time = time.time()
+        self.model.optimize()
+        solve_time = time.time() - start_time
+        
+        if self.model.status != GRB.OPTIMAL:
+            raise RuntimeError(f"Day-ahead dispatch failed with status {self.model.status}")
+        
+        scenario = FORECAST_SCENARIO
+        
+        def series(variables, key):
+            return np.array([variables[key(t)].X for t in self.time_periods])
+        
+        result = {
+            'hours': list(self.time_periods),
+            'pv': series(self.v_gen, lambda t: ('pv', t, scenario)),
+            'wind': series(self.v_gen, lambda t: ('wind', t, scenario)),
+            'chp': series(self.v_gen, lambda t: ('chp', t, scenario)),
+            'chp_on': series(self.v_is_on, lambda t: ('chp', t, scenario)),
+            'fuel_cell': series(self.v_gen, lambda t: ('fuel_cell', t, scenario)),
+            'battery_charge': series(self.v_charge, lambda t: ('battery', t, scenario)),
+            'battery_discharge': series(self.v_discharge, lambda t: ('battery', t, scenario)),
+            'battery_soc': series(self.v_soc, lambda t: ('battery', t, scenario)),
+            'electrolyzer_power': series(self.v_consumption, lambda t: ('electrolyzer', t, scenario)),
+            'h2_production': series(self.v_production, lambda t: ('electrolyzer', t, scenario)),
+            'grid_buy': series(self.v_grid_buy, lambda t: ('electricity', t, scenario)),
+            'grid_sell': series(self.v_grid_sell, lambda t: ('electricity', t, scenario)),
+            'gas_buy': series(self.v_grid_buy, lambda t: ('gas', t, scenario)),
+            'emissions': series(self.v_emissions, lambda t: (t, scenario)),
+            'final_soc': {storage: self.v_soc[(storage, self.time_periods[-1], scenario)].X
+                          for storage in self.tech_storage},
+            'cost': self.model.ObjVal,
+            'solve_time': solve_time,
+            'iterations': self.model.IterCount,
+            'within_target_latency': solve_time <= DAY_AHEAD_SCHEDULING['target_latency']
+        }
+        return result
+    
+    def run_day(self, renewable, demand, price, initial_soc=None):
+        """Update tomorrow's forecast and return its schedule"""
+        self.update_forecast(renewable, demand, price, initial_soc)
+        return self.schedule()
+
+if __name__ == "__main__":
+    capacities = {'pv': 50, 'wind': 40, 'battery': 100, 'electrolyzer': 10, 'chp': 5, 'h2_storage': 500}
+    scheduler = DayAheadScheduler(capacities, forecast_from_data('../data'), data_dir='../data')
+    first_day = scheduler.schedule()
+    print(f"Day 1 cost: ${first_day['cost']:,.0f} ({first_day['solve_time']*1000:.0f} ms)")
+    
+    next_day = scheduler.run_day(*forecast_from_data('../data', 'low_renewable', start=24),
+                                 initial_soc=first_day['final_soc'])
+    print(f"Day 2 cost: ${next_day['cost']:,.0f} ({next_day['solve_time']*1000:.0f} ms, "
+          f"{next_day['iterations']:.0f} simplex iterations)")
@@ -0,0 +1,83 @@
+"""
+Per-process Gurobi Environment Pool
+Creates gp.Env objects once per worker with preset parameters and
+reuses them across WFE Nexus models
+"""
+
+import gurobipy as gp
+import multiprocessing.util
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+
+class EnvPool:
+    def __init__(self, base_params=None):
+        self.base_params = dict(ENV_POOL_PARAMS if base_params is None else base_params)
+        self.envs = {}
+    
+    def _key(self, params):
+        return tuple(sorted(params.items()))
+    
+    def get(self, **overrides):
+        """Started environment for base parameters plus overrides (created on first use)"""
+        params = dict(self.base_params)
+        params.update(overrides)
+        key = self._key(params)
+        
+        env = self.envs.get(key)
+        if env is None:
+            env = gp.Env(empty=True)
+            for param, value in params.items():
+                env.setParam(param, value)
+            env.start()
+            self.envs[key] = env
+        
+        return env
+    
+    def dispose(self):
+        """Dispose all pooled environments (models built on them must be disposed first)"""
+        for env in self.envs.values():
+            env.dispose()
+        self.envs.clear()
+    
+    def __len__(self):
+        return len(self.envs)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.dispose()
+        return False
+
+# Process-wide pool, disposed when the process exits
+_process_pool = None
+
+def get_pool():
+    """Pool of the current process"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = EnvPool()
+        # Pool workers leave through os._exit, which skips atexit handlers; multiprocessing
+        # runs its exit finalizers first (and registers them with atexit in the main process)
+        multiprocessing.util.Finalize(None, dispose_pool, exitpriority=10)
+    return _process_pool
+
+def get_env(**overrides):
+    """Pooled environment of the current process"""
+    return get_pool().get(**overrides)
+
+def dispose_pool():
+    """Dispose the pool of the current process"""
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.dispose()
+        _process_pool = None
+
+def init_worker(threads=None):
+    """ProcessPoolExecutor initializer: start the worker's environment before the first job"""
+    if threads is None:
+        get_env()
+    else:
+        get_env(Threads=threads)
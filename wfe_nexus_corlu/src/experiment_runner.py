@@ -0,0 +1,245 @@
+"""
+Parallel Experiment Runner for the WFE Nexus Model
+Expands a declarative policy/objective/economic-scenario grid into jobs
+and solves them in a process pool
+"""
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from gurobipy import GRB
+import itertools
+import json
+import time
+import pandas as pd
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from config.model_config_updated import ECONOMIC_SCENARIOS, CO2_POLICY_SCENARIOS
+from src.wfe_nexus_model import WFENexusModel
+from src.env_pool import get_env, init_worker
+from src.solve_telemetry import SolveTelemetry
+from src.run_registry import RunRegistry
+from src.checkpoint import SolveCheckpoint, chain_callbacks
+
+def expand_grid(grid):
+    """Expand a {parameter: [values]} grid into a list of job specifications"""
+    keys = list(grid.keys())
+    jobs = []
+    
+    for values in itertools.product(*(grid[key] for key in keys)):
+        job = dict(zip(keys, values))
+        job['job_id'] = '_'.join(str(value) for value in values if value is not None)
+        jobs.append(job)
+    
+    return jobs
+
+def resolve_co2_tax(co2_policy):
+    """CO2 tax ($/ton) for a policy from either configuration file"""
+    if co2_policy in CO2_TAX_SCENARIOS:
+        return CO2_TAX_SCENARIOS[co2_policy]
+    if co2_policy in CO2_POLICY_SCENARIOS:
+        return CO2_POLICY_SCENARIOS[co2_policy]['price']
+    raise ValueError(f"Unknown CO2 policy: {co2_policy}")
+
+def resolve_discount_rate(economic_scenario):
+    """Discount rate for an economic scenario (None keeps DISCOUNT_RATE)"""
+    if economic_scenario is None:
+        return DISCOUNT_RATE
+    if economic_scenario in ECONOMIC_SCENARIOS:
+        return ECONOMIC_SCENARIOS[economic_scenario]['discount_rate']
+    raise ValueError(f"Unknown economic scenario: {economic_scenario}")
+
+def extract_summary(model):
+    """Collect key results of a solved model as plain Python values"""
+    summary = {
+        'objective_value': model.model.ObjVal,
+        'annual_emissions': model.calculate_annual_emissions(),
+        'capacities': {tech: model.v_cap[tech].X for tech in model.all_techs},
+        'num_vars': model.model.NumVars,
+        'num_constrs': model.model.NumConstrs + model.model.NumQConstrs,
+        'mip_gap': model.model.MIPGap if model.model.IsMIP else 0.0
+    }
+    return summary
+
+def checkpoint_path(job, results_dir):
+    return os.path.join(results_dir, f"{job['job_id']}_checkpoint.npz")
+
+def run_job(job, data_dir, results_dir, threads, solver_params=None, keep_checkpoint=False):
+    """Build and solve one grid point, then write its result file (runs in a worker)
+    
+    keep_checkpoint leaves the solve checkpoint in place for a caller that may continue
+    the job (e.g. to a tighter MIPGap); it is always kept after errors and TimeLimit.
+    """
+    result = dict(job)
+    result['threads'] = threads
+    if solver_params:
+        result['solver_params'] = solver_params
+    start_time = time.time()
+    
+    try:
+        model = WFENexusModel(
+            data_dir=data_dir,
+            co2_policy=job.get('co2_policy', 'no_tax'),
+            objective=job.get('objective', 'minimize_cost'),
+            co2_tax=resolve_co2_tax(job.get('co2_policy', 'no_tax')),
+            discount_rate=resolve_discount_rate(job.get('economic_scenario')),
+            solver_params=solver_params,
+            env=get_env(Threads=threads)
+        )
+        result['build_time'] = time.time() - start_time
+        
+        solve_start = time.time()
+        telemetry = SolveTelemetry(label=job['job_id']) if TELEMETRY['record_experiments'] else None
+        
+        # A job killed mid-solve restarts from its last incumbent
+        checkpoint = None
+        if CHECKPOINT['sweep_solves']:
+            checkpoint = SolveCheckpoint(model, checkpoint_path(job, results_dir))
+            result['resumed'] = checkpoint.resume()
+        
+        try:
+            model.resolve(callback=chain_callbacks(checkpoint, telemetry))
+        finally:
+            # The callback saves only every CHECKPOINT['interval'] seconds: always keep the final state
+            if checkpoint is not None:
+                checkpoint.finish()
+        result['solve_time'] = time.time() - solve_start
+        result['status'] = model.model.status
+        
+        # Gap/bound timeline next to the result file
+        if telemetry is not None:
+            telemetry.finish(model.model)
+            result['telemetry'] = telemetry.save(os.path.join(results_dir, f"{job['job_id']}_telemetry.npz"))
+        
+        # Incumbents of solves stopped by TimeLimit are results too (with their gap)
+        if model.model.SolCount > 0:
+            result.update(extract_summary(model))
+        if RUN_REGISTRY['record_experiments']:
+            result['run_id'] = RunRegistry().record(model, label=job['job_id'], build_time=result['build_time'],
+                                                    solve_time=result['solve_time'],
+                                                    wall_time=time.time() - start_time)
+        model.dispose()
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    
+    result['wall_time'] = time.time() - start_time
+    
+    # Stream the result to disk as soon as the job finishes (renamed into place so a
+    # crash never leaves a partial file that would count as completed on resume)
+    result_path = os.path.join(results_dir, f"{job['job_id']}.json")
+    with open(f"{result_path}.tmp", 'w') as f:
+        json.dump(result, f, indent=2)
+    os.replace(f"{result_path}.tmp", result_path)
+    
+    # The result file supersedes the solve checkpoint (kept after a TimeLimit so a rerun continues)
+    path = checkpoint_path(job, results_dir)
+    if not keep_checkpoint and result['status'] not in ('error', GRB.TIME_LIMIT) and os.path.exists(path):
+        os.remove(path)
+    
+    return result
+
+def load_completed(job, results_dir):
+    """Result of a job finished by an earlier run of the sweep (None if it must run)"""
+    result_path = os.path.join(results_dir, f"{job['job_id']}.json")
+    if not os.path.exists(result_path):
+        return None
+    try:
+        with open(result_path) as f:
+            result = json.load(f)
+    except json.JSONDecodeError:
+        return None
+    
+    # Failed jobs, jobs stopped by their TimeLimit (continued from their checkpoint) and
+    # results of a different job specification are rerun
+    if result.get('status') in ('error', GRB.TIME_LIMIT) or any(result.get(key) != value for key, value in job.items()):
+        return None
+    return result
+
+class ExperimentRunner:
+    def __init__(self, grid=None, data_dir='data', results_dir='results/experiments',
+                 max_workers=None, total_threads=None, resume=True):
+        self.grid = EXPERIMENT_GRID if grid is None else grid
+        self.data_dir = data_dir
+        self.results_dir = results_dir
+        self.max_workers = EXPERIMENT_RUNNER['max_workers'] if max_workers is None else max_workers
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.resume = resume  # skip jobs finished by an earlier run, continue time-limited ones
+        
+        # Split the global Threads budget evenly across workers
+        self.threads_per_job = max(1, self.total_threads // self.max_workers)
+        
+        self.jobs = expand_grid(self.grid)
+        self.results = {}
+    
+    def print_progress(self, futures, start_time):
+        """Print a progress table of all jobs"""
+        done = len(self.results)
+        print("\n" + "-"*80)
+        print(f"EXPERIMENT PROGRESS: {done}/{len(self.jobs)} jobs done "
+              f"({time.time() - start_time:.1f} s elapsed)")
+        print("-"*80)
+        print(f"{'Job':<45} {'State':<10} {'Objective':>15} {'Time (s)':>8}")
+        
+        for future, job in futures.items():
+            res = self.results.get(job['job_id'])
+            if res is None:
+                state = 'running' if future.running() else 'queued'
+                print(f"{job['job_id']:<45} {state:<10} {'':>15} {'':>8}")
+            elif 'objective_value' in res:
+                print(f"{job['job_id']:<45} {'done':<10} {res['objective_value']:>15,.0f} "
+                      f"{res['wall_time']:>8.1f}")
+            else:
+                print(f"{job['job_id']:<45} {'failed':<10} {str(res['status']):>15} "
+                      f"{res['wall_time']:>8.1f}")
+    
+    def run(self):
+        """Run all jobs in a process pool and return the results as a DataFrame"""
+        os.makedirs(self.results_dir, exist_ok=True)
+        
+        pending = []
+        for job in self.jobs:
+            result = load_completed(job, self.results_dir) if self.resume else None
+            if result is not None:
+                self.results[job['job_id']] = result
+            else:
+                pending.append(job)
+        if self.results:
+            print(f"Resuming sweep: {len(self.results)} jobs already completed")
+        
+        print(f"Running {len(pending)} jobs on {self.max_workers} workers "
+              f"({self.threads_per_job} threads each)")
+        
+        start_time = time.time()
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker,
+                                 initargs=(self.threads_per_job,)) as executor:
+            futures = {
+                executor.submit(run_job, job, self.data_dir, self.results_dir, self.threads_per_job): job
+                for job in pending
+            }
+            
+            for future in as_completed(futures):
+                job = futures[future]
+                self.results[job['job_id']] = future.result()
+                self.print_progress(futures, start_time)
+        
+        return self.save_summary()
+    
+    def save_summary(self):
+        """Write a summary table with one row per job"""
+        rows = []
+        for job in self.jobs:
+            res = dict(self.results.get(job['job_id'], job))
+            for tech, cap in res.pop('capacities', {}).items():
+                res[f'cap_{tech}'] = cap
+            rows.append(res)
+        
+        summary = pd.DataFrame(rows)
+        summary.to_csv(os.path.join(self.results_dir, 'summary.csv'), index=False)
+        print(f"\nExperiment summary saved to: {os.path.join(self.results_dir, 'summary.csv')}")
+        
+        return summary
+
+if __name__ == "__main__":
+    runner = ExperimentRunner(data_dir='../data', results_dir='../results/experiments')
+    runner.run()
@@ -0,0 +1,282 @@
+"""
+Merit-Order Heuristic Dispatch for WFE Nexus Design Screening
+Estimates the annual cost of many capacity vectors at once with a NumPy
+dispatch vectorized across designs and scenarios, and calibrates the
+estimate against the optimal dispatch of WFENexusModel
+"""
+
+import pandas as pd
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel, technology_sets, capital_recovery_factor
+from src.stochastic_metrics import ScenarioSetModel, load_scenario_data
+
+def model_techs(exclude_techs=None):
+    """Technologies in the order of WFENexusModel.all_techs"""
+    return [tech for techs in technology_sets(exclude_techs).values() for tech in techs]
+
+def random_designs(n_designs, seed=None, build_probability=0.5, exclude_techs=None):
+    """Random capacity vectors within CAPACITY_LIMITS (each tech built with build_probability)"""
+    rng = np.random.RandomState(seed)
+    designs = []
+    for _ in range(n_designs):
+        design = {}
+        for tech in model_techs(exclude_techs):
+            if rng.rand() < build_probability:
+                design[tech] = rng.uniform(0, CAPACITY_LIMITS.get(tech, {}).get('max', 1000))
+        designs.append(design)
+    return designs
+
+class MeritOrderDispatcher:
+    """Dispatch in merit order: renewables, battery, electrolyzer/H2 storage, CHP (heat-led), grid
+    
+    Approximations: the fuel cell and Haber-Bosch units stay idle, the battery
+    does no price arbitrage, and CHP follows the heat demand (at least its
+    free biogas share) instead of solving the unit commitment problem.
+    """
+    def __init__(self, scenario_data=None, probabilities=None, data_dir='data', co2_policy='medium_tax',
+                 co2_tax=None, discount_rate=None, exclude_techs=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.co2_tax = CO2_TAX_SCENARIOS[co2_policy] if co2_tax is None else co2_tax
+        self.discount_rate = DISCOUNT_RATE if discount_rate is None else discount_rate
+        self.exclude_techs = tuple(sorted(exclude_techs or ()))
+        self.days_per_season = 365 / WFENexusModel.representative_days
+        
+        if scenario_data is None:
+            scenario_data = load_scenario_data(data_dir)
+            probabilities = dict(zip(SCENARIOS, SCENARIO_PROBABILITIES))
+        self.scenario_data = scenario_data
+        self.scenarios = list(scenario_data.keys())
+        if probabilities is None:
+            probabilities = {scenario: 1.0 / len(self.scenarios) for scenario in self.scenarios}
+        self.probabilities = dict(probabilities)
+        self.prob = np.array([self.probabilities[scenario] for scenario in self.scenarios])
+        
+        self.wwtp_data = pd.read_csv(os.path.join(data_dir, 'wwtp_data.csv')).iloc[0]
+        self.techs = model_techs(self.exclude_techs)
+        self.load_arrays()
+        
+        # Annualized investment plus fixed O&M per unit of capacity (the model
+        # scales fixed O&M with the operating costs by days_per_season)
+        self.fixed_cost = np.array([
+            (capital_recovery_factor(tech, self.discount_rate) + FIXED_OPEX_PERCENTAGE * self.days_per_season)
+            * TECHNOLOGY_CAPEX[tech]
+            for tech in self.techs
+        ])
+    
+    def load_arrays(self):
+        """Stack the scenario time series into (scenario, hour) arrays"""
+        def stack(index, column):
+            return np.array([self.scenario_data[scenario][index][column].values for scenario in self.scenarios],
+                            dtype=float)
+        
+        self.pv = stack(0, 'pv_availability')
+        self.wind = stack(0, 'wind_availability')
+        self.elec_demand = stack(1, 'electricity_demand')
+        self.heat_demand = stack(1, 'heat_demand')
+        self.water_demand = stack(1, 'water_demand')
+        self.h2_demand = stack(1, 'hydrogen_demand')
+        self.n_demand = stack(1, 'fertilizer_n_demand')
+        self.buy_price = stack(2, 'electricity_buy_price')
+        self.sell_price = stack(2, 'electricity_sell_price')
+        self.gas_price = stack(2, 'natural_gas_price')
+    
+    def design_matrix(self, designs):
+        """(design, tech) capacity matrix from a dict, a list of dicts or an array"""
+        if isinstance(designs, dict):
+            designs = [designs]
+        if isinstance(designs, np.ndarray):
+            return np.atleast_2d(designs).astype(float)
+        return np.array([[design.get(tech, 0) for tech in self.techs] for design in designs], dtype=float)
+    
+    def dispatch(self, designs):
+        """Annual cost, emissions, grid purchases and unmet demand of every design"""
+        caps = self.design_matrix(designs)
+        n_scenarios, n_hours = self.pv.shape
+        # Excluded technologies dispatch as zero capacity
+        cap = {tech: np.zeros((caps.shape[0], 1)) for tech in model_techs()}
+        cap.update({tech: caps[:, i][:, None] for i, tech in enumerate(self.techs)})
+        shape = (caps.shape[0], n_scenarios)
+        
+        battery = STORAGE_PARAMS['battery']
+        h2_store = STORAGE_PARAMS['h2_storage']
+        charge_eff = TECHNOLOGY_EFFICIENCIES['battery_charge']
+        discharge_eff = TECHNOLOGY_EFFICIENCIES['battery_discharge']
+        h2_eff = STORAGE_EFFICIENCY
+        
+        wwtp_load = self.wwtp_data['energy_consumption'] * self.wwtp_data['influent_flow'] / 24 / 1000
+        biogas_ch4 = self.wwtp_data['potential_biogas'] / 24 * WWTP_PARAMS['ch4_content']
+        chp_per_gas = ENERGY_CONVERSIONS['ch4_lhv'] / 1000 * TECHNOLOGY_EFFICIENCIES['chp_electric']
+        heat_ratio = TECHNOLOGY_EFFICIENCIES['chp_thermal'] / TECHNOLOGY_EFFICIENCIES['chp_electric']
+        elec_to_h2 = ENERGY_CONVERSIONS['electricity_to_h2']
+        ramp = RAMP_RATES['chp']['up']
+        
+        # Gas purchases are bounded, which limits CHP output
+        chp_max = (MAX_GRID + biogas_ch4) * chp_per_gas
+        elz_max = np.minimum(cap['electrolyzer'], MAX_GRID)
+        
+        # Design-independent recovery revenues at the model's production bounds
+        recovery_revenue = (PRODUCT_PRICES['reclaimed_water'] * np.minimum(self.water_demand, MAX_PRODUCTION)
+                            + PRODUCT_PRICES['fertilizer_n'] * MAX_PRODUCTION / 1000)
+        
+        soc_b = 0.5 * cap['battery'] * np.ones(shape)
+        soc_h = 0.5 * cap['h2_storage'] * np.ones(shape)
+        chp_prev = None
+        cost = np.zeros(shape)
+        emissions = np.zeros(shape)
+        grid_buy = np.zeros(shape)
+        unmet = np.zeros(shape)
+        
+        for t in range(n_hours):
+            gas_value = self.gas_price[:, t] / 1000 + self.co2_tax * EMISSION_FACTORS['natural_gas'] / 1000
+            
+            # CHP follows the heat demand when gas is cheaper than the unmet heat penalty
+            heat_led = np.where(gas_value / chp_per_gas / heat_ratio < PENALTY_RATE,
+                                self.heat_demand[:, t] / heat_ratio, 0)
+            target = np.minimum(np.maximum(heat_led, biogas_ch4 * chp_per_gas), np.minimum(cap['chp'], chp_max))
+            if chp_prev is not None:
+                target = np.clip(target, chp_prev - ramp * cap['chp'], chp_prev + ramp * cap['chp'])
+            chp = np.where(target > 1e-9, np.maximum(target, MIN_LOAD * cap['chp']), 0)
+            chp = np.where(chp <= chp_max, chp, 0)
+            chp_prev = chp
+            gas_buy = np.maximum(chp / chp_per_gas - biogas_ch4, 0)
+            heat_slack = np.maximum(self.heat_demand[:, t] - chp * heat_ratio, 0)
+            
+            # Hydrogen demand from the electrolyzer, then from H2 storage
+            h2_level = soc_h if t == 0 else soc_h * (1 - h2_store['self_discharge'])
+            elz = np.minimum(self.h2_demand[:, t] * elec_to_h2, elz_max)
+            h2_short = self.h2_demand[:, t] - elz / elec_to_h2
+            h2_discharge = np.clip(np.minimum(np.minimum(h2_short, h2_store['max_discharge_rate'] * cap['h2_storage']),
+                                              (h2_level - h2_store['min_level'] * cap['h2_storage']) * h2_eff), 0, None)
+            h2_slack = h2_short - h2_discharge
+            
+            # Net electricity requirement after must-take generation
+            renewables = cap['pv'] * self.pv[:, t] + cap['wind'] * self.wind[:, t]
+            net = self.elec_demand[:, t] + wwtp_load + elz - renewables - chp
+            surplus = np.maximum(-net, 0)
+            deficit = np.maximum(net, 0)
+            
+            # Surplus: charge the battery, then store H2, then sell
+            level = soc_b if t == 0 else soc_b * (1 - battery['self_discharge'])
+            charge = np.clip(np.minimum(np.minimum(surplus, battery['max_charge_rate'] * cap['battery']),
+                                        (battery['max_soc'] * cap['battery'] - level) / charge_eff), 0, None)
+            surplus = surplus - charge
+            h2_room = np.clip(np.minimum(h2_store['max_charge_rate'] * cap['h2_storage'],
+                                         (h2_store['max_level'] * cap['h2_storage'] - h2_level) / h2_eff), 0, None)
+            elz_extra = np.minimum(np.minimum(surplus, elz_max - elz), h2_room * elec_to_h2)
+            elz_extra = np.where(h2_discharge > 0, 0, elz_extra)
+            sell = surplus - elz_extra
+            
+            # Deficit: discharge the battery, then buy
+            discharge = np.clip(np.minimum(np.minimum(deficit, battery['max_discharge_rate'] * cap['battery']),
+                                           (level - battery['min_soc'] * cap['battery']) * discharge_eff), 0, None)
+            buy = deficit - discharge
+            
+            soc_b = level + charge * charge_eff - discharge / discharge_eff
+            soc_h = h2_level + elz_extra / elec_to_h2 * h2_eff - h2_discharge / h2_eff
+            
+            # Hourly cost with the objective coefficients of the model
+            hour_emissions = buy * EMISSION_FACTORS['grid_electricity'] + gas_buy * EMISSION_FACTORS['natural_gas'] / 1000
+            cost += (
+                (VARIABLE_OPEX['pv'] * cap['pv'] * self.pv[:, t] + VARIABLE_OPEX['wind'] * cap['wind'] * self.wind[:, t]
+                 + VARIABLE_OPEX['chp'] * chp) / 1000
+                + self.buy_price[:, t] * buy / 1000
+                + self.gas_price[:, t] * gas_buy / 1000
+                - self.sell_price[:, t] * sell / 1000
+                + self.co2_tax * hour_emissions
+                - recovery_revenue[:, t]
+                + PENALTY_RATE * (heat_slack + h2_slack)
+            )
+            emissions += hour_emissions
+            grid_buy += buy
+            unmet += heat_slack + h2_slack
+        
+        return {
+            'cost': caps @ self.fixed_cost + self.days_per_season * cost @ self.prob,
+            'emissions': self.days_per_season * emissions @ self.prob,
+            'grid_electricity': self.days_per_season * grid_buy @ self.prob,
+            'unmet_demand': self.days_per_season * unmet @ self.prob
+        }
+    
+    def score(self, designs):
+        """Estimated annual cost of every design"""
+        return self.dispatch(designs)['cost']
+    
+    def calibrate(self, designs, solver_params=None, env=None):
+        """Compare heuristic costs with the optimal dispatch of WFENexusModel for fixed designs"""
+        caps = self.design_matrix(designs)
+        designs = [dict(zip(self.techs, row)) for row in caps]
+        
+        start_time = time.time()
+        heuristic = self.dispatch(caps)['cost']
+        heuristic_time = time.time() - start_time
+        
+        # One model structure, re-solved for every fixed design
+        model = ScenarioSetModel(self.scenario_data, self.probabilities, data_dir=self.data_dir,
+                                 co2_policy=self.co2_policy, co2_tax=self.co2_tax,
+                                 discount_rate=self.discount_rate, exclude_techs=self.exclude_techs,
+                                 solver_params=solver_params or {'OutputFlag': 0}, env=env)
+        start_time = time.time()
+        optimal = []
+        for i, design in enumerate(designs):
+            model.fix_first_stage(design)
+            if not model.resolve():
+                raise RuntimeError(f"Optimal dispatch of design {i} failed with status {model.model.status}")
+            optimal.append(model.model.ObjVal)
+        milp_time = time.time() - start_time
+        model.dispose()
+        
+        return self.calibration_report(np.array(optimal), heuristic, heuristic_time, milp_time)
+    
+    def calibration_report(self, optimal, heuristic, heuristic_time, milp_time):
+        """Print the approximation error of the heuristic"""
+        error = heuristic - optimal
+        relative = error / np.maximum(np.abs(optimal), 1e-9)
+        if len(optimal) > 1:
+            ranks = [np.argsort(np.argsort(values)) for values in (optimal, heuristic)]
+            rank_correlation = np.corrcoef(ranks[0], ranks[1])[0, 1]
+        else:
+            rank_correlation = float('nan')
+        
+        report = {
+            'optimal': optimal,
+            'heuristic': heuristic,
+            'mean_error': error.mean(),
+            'mean_abs_error': np.abs(error).mean(),
+            'mean_abs_relative_error': np.abs(relative).mean(),
+            'max_abs_relative_error': np.abs(relative).max(),
+            'rank_correlation': rank_correlation,
+            'heuristic_designs_per_second': len(optimal) / max(heuristic_time, 1e-9),
+            'milp_designs_per_second': len(optimal) / max(milp_time, 1e-9)
+        }
+        
+        print("\n" + "-"*60)
+        print("MERIT-ORDER HEURISTIC CALIBRATION")
+        print("-"*60)
+        print(f"{'Design':<8} {'Optimal dispatch':>18} {'Heuristic':>18} {'Error':>9}")
+        for i, (opt, heur, rel) in enumerate(zip(optimal, heuristic, relative)):
+            print(f"{i:<8} {opt:>18,.0f} {heur:>18,.0f} {rel*100:>8.2f}%")
+        print("-"*60)
+        print(f"Mean error (bias):           ${report['mean_error']:,.0f}")
+        print(f"Mean absolute error:         ${report['mean_abs_error']:,.0f} "
+              f"({report['mean_abs_relative_error']*100:.2f}%)")
+        print(f"Max absolute relative error: {report['max_abs_relative_error']*100:.2f}%")
+        print(f"Rank correlation:            {report['rank_correlation']:.3f}")
+        print(f"Throughput: {report['heuristic_designs_per_second']:,.0f} designs/s heuristic, "
+              f"{report['milp_designs_per_second']:,.2f} designs/s optimal dispatch")
+        
+        return report
+
+if __name__ == "__main__":
+    dispatcher = MeritOrderDispatcher(data_dir='../data')
+    
+    start_time = time.time()
+    costs = dispatcher.score(random_designs(5000, seed=0))
+    print(f"Scored {len(costs)} designs in {time.time() - start_time:.2f} s")
+    
+    dispatcher.calibrate(random_designs(10, seed=1))
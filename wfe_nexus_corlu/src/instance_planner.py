@@ -0,0 +1,258 @@
+"""
+Instance Size and Solve-Time Planner for the WFE Nexus Model
+Predicts variable and constraint counts exactly from the set definitions,
+memory from measured per-element costs and solve time from the run
+registry, then picks the representative-day count, solver parameters and
+time limit of an instance and refuses builds that would not fit in RAM
+"""
+
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.stochastic_metrics import ScenarioSetModel
+from src.run_registry import RunRegistry
+from src.tuned_settings import TunedSettings
+
+def load_sets(data_dir, exclude_techs=None):
+    """Sets and time series of a data set without building the model"""
+    sets = WFENexusModel.__new__(WFENexusModel)
+    sets.data_dir = data_dir
+    sets.exclude_techs = tuple(sorted(exclude_techs or ()))
+    sets.load_data()
+    sets.define_sets()
+    return sets
+
+def day_of(period):
+    """Representative day of a time period label, e.g. 'winter' for 'winter_h12'"""
+    return str(period).rsplit('_h', 1)[0]
+
+def select_days(days, count):
+    """count representative days spread evenly over the available ones (e.g. winter and summer of four seasons)"""
+    positions = np.floor(np.arange(count) * len(days) / count).astype(int)
+    return [days[i] for i in positions]
+
+def count_elements(sets, hours, scenarios, objective='minimize_cost'):
+    """Variable and constraint counts of WFENexusModel for the given sets (mirrors build())"""
+    techs = sets.all_techs
+    generation, storage = sets.tech_generation, sets.tech_storage
+    conversion, recovery = sets.tech_conversion, sets.tech_recovery
+    dispatchable = [tech for tech in DISPATCHABLE if tech in generation]
+    has = lambda tech: tech in techs
+    H, S = hours, scenarios
+    
+    # Variables per scenario
+    continuous = (len(generation) + 3 * len(storage) + 2 * len(conversion) + len(recovery) + 4 + 1 + 1) * H
+    continuous += 2 * H * has('chp')  # CHP gas and heat slack
+    continuous += H * has('electrolyzer')  # H2 slack
+    binary = len(dispatchable) * (H + 2 * (H - 1))
+    
+    # Linear constraints per scenario
+    linear = H * (has('pv') + has('wind'))
+    linear += len(dispatchable) * 4 * (H - 1)  # ramps and start-up/shut-down logic
+    linear += 5 * H * len(storage)
+    linear += 2 * H * has('electrolyzer') + 2 * H * has('haber_bosch') + H * has('anaerobic_digester')
+    linear += 2 * H * has('chp')  # gas conversion and natural gas
+    linear += H * (1 + has('chp') + has('electrolyzer') + has('water_reclamation') + 1 + 1)  # balances and emissions
+    quadratic = 2 * H * len(dispatchable)  # gen <= cap * on, gen >= MIN_LOAD * cap * on
+    
+    investment_constrs = len(techs) + sum(CAPACITY_LIMITS.get(tech, {}).get('min', 0) > 0 for tech in techs)
+    return {
+        'num_vars': 2 * len(techs) + S * (continuous + binary),
+        'num_bin_vars': len(techs) + S * binary,
+        'num_constrs': investment_constrs + S * linear + (objective == 'minimize_cost_with_emission_cap'),
+        'num_qconstrs': S * quadratic
+    }
+
+def available_memory():
+    """Available physical memory in bytes (None where the platform does not report it)"""
+    # MemAvailable counts reclaimable page cache, which free pages (SC_AVPHYS_PAGES) do not
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (ValueError, OSError, AttributeError):
+        return None
+
+def resident_memory():
+    """Resident set size of this process in bytes (Linux)"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+class ReducedDayModel(ScenarioSetModel):
+    """WFENexusModel over a subset of the representative days, each weighted 365/len(days)"""
+    def __init__(self, days, data_dir='data', co2_policy='no_tax', objective='minimize_cost', co2_tax=None,
+                 discount_rate=None, solver_params=None, env=None, exclude_techs=None):
+        sets = load_sets(data_dir, exclude_techs)
+        periods = [t for t in sets.time_periods if day_of(t) in days]
+        scenario_data = {scenario: (sets.renewable_data[scenario].loc[periods],
+                                    sets.demand_data[scenario].loc[periods],
+                                    sets.price_data[scenario].loc[periods])
+                         for scenario in sets.scenarios}
+        self.representative_days = len(days)
+        super().__init__(scenario_data, probabilities=sets.probabilities, data_dir=data_dir,
+                         co2_policy=co2_policy, objective=objective, co2_tax=co2_tax,
+                         discount_rate=discount_rate, solver_params=solver_params, env=env,
+                         exclude_techs=exclude_techs)
+
+class InstancePlanner:
+    def __init__(self, data_dir='data', co2_policy='no_tax', objective='minimize_cost', exclude_techs=None,
+                 registry=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.exclude_techs = exclude_techs
+        self.registry = RunRegistry() if registry is None else registry
+        self.sets = load_sets(data_dir, exclude_techs)
+        self.days = list(dict.fromkeys(day_of(t) for t in self.sets.time_periods))
+        self.history = None
+    
+    def predict_memory(self, size):
+        """Peak memory (bytes) of building and solving an instance of the given size"""
+        elements = size['num_vars'] + size['num_constrs'] + size['num_qconstrs']
+        build = elements * INSTANCE_PLANNER['bytes_per_element']
+        return INSTANCE_PLANNER['base_memory'] + build * INSTANCE_PLANNER['solve_memory_factor']
+    
+    def predict_solve_time(self, size):
+        """Solve time (s) from solved runs in the registry: a power law in the variable count
+        once runs of several sizes exist, seconds per variable otherwise (None without history)"""
+        if self.history is None:
+            self.history = self.registry.runs(where='status = 2 AND solve_time > 0 AND objective = ?',
+                                              params=[self.objective], capacities=False)
+        history = self.history
+        if len(history) == 0:
+            return None
+        if history['num_vars'].nunique() >= 2:
+            slope, intercept = np.polyfit(np.log(history['num_vars']), np.log(history['solve_time']), 1)
+            return float(np.exp(intercept) * size['num_vars'] ** slope)
+        return float((history['solve_time'] / history['num_vars']).median() * size['num_vars'])
+    
+    def predict(self, days=None, scenarios=None):
+        """Size, memory and solve-time prediction for a number of representative days and scenarios"""
+        days = len(self.days) if days is None else days
+        scenarios = len(self.sets.scenarios) if scenarios is None else scenarios
+        hours_per_day = len(self.sets.time_periods) // len(self.days)
+        prediction = {'days': days, 'hours': days * hours_per_day, 'scenarios': scenarios,
+                      'techs': len(self.sets.all_techs)}
+        prediction.update(count_elements(self.sets, prediction['hours'], scenarios, self.objective))
+        prediction['memory'] = self.predict_memory(prediction)
+        prediction['solve_time'] = self.predict_solve_time(prediction)
+        return prediction
+    
+    def choose_params(self, prediction):
+        """Tuned settings of the instance class, else the strategy for the predicted solve time"""
+        features = {key: prediction[key] for key in ['hours', 'scenarios', 'techs']}
+        features['objective'] = self.objective
+        tuned = TunedSettings().lookup(features)
+        if tuned:
+            return dict(tuned), 'tuned settings'
+        
+        solve_time = prediction['solve_time']
+        if solve_time is None:
+            return {}, 'Gurobi defaults (no run history)'
+        for max_time, params in INSTANCE_PLANNER['strategies']:
+            if max_time is None or solve_time <= max_time:
+                return dict(params), f"strategy for predicted solve time <= {max_time or 'any'} s"
+    
+    def plan(self, time_budget=None, days=None, solver_params=None, time_limit=None):
+        """Representative days, solver parameters and TimeLimit for the instance
+        
+        The largest day count that fits in memory and whose predicted solve time is
+        within time_budget is chosen; days, solver_params and time_limit override.
+        """
+        time_budget = INSTANCE_PLANNER['time_budget'] if time_budget is None else time_budget
+        memory_limit = available_memory()
+        if memory_limit is not None:
+            memory_limit *= INSTANCE_PLANNER['max_memory_fraction']
+        
+        if days is None:
+            candidates = [self.predict(count) for count in range(len(self.days), 0, -1)]
+            fits = [p for p in candidates if memory_limit is None or p['memory'] <= memory_limit]
+            fast = [p for p in fits if p['solve_time'] is None or p['solve_time'] <= time_budget]
+            prediction = (fast or fits or candidates[-1:])[0]
+            reason = 'fits memory and time budget' if fast else ('fits memory' if fits else 'smallest instance')
+        else:
+            prediction = self.predict(days)
+            reason = 'override'
+        
+        params, params_reason = self.choose_params(prediction)
+        params.update(solver_params or {})
+        if time_limit is None:
+            predicted = prediction['solve_time']
+            time_limit = (time_budget if predicted is None
+                          else min(time_budget, max(predicted * INSTANCE_PLANNER['safety_factor'],
+                                                    INSTANCE_PLANNER['min_time_limit'])))
+        params['TimeLimit'] = time_limit
+        
+        return {
+            'days': select_days(self.days, prediction['days']),
+            'prediction': prediction,
+            'memory_limit': memory_limit,
+            'solver_params': params,
+            'reason': f"{reason}; {params_reason}"
+        }
+    
+    def build(self, plan, env=None, force=False, **model_kwargs):
+        """Build the planned instance; raises MemoryError if it is predicted not to fit (unless force)"""
+        prediction = plan['prediction']
+        if not force and plan['memory_limit'] is not None and prediction['memory'] > plan['memory_limit']:
+            raise MemoryError(f"Instance needs about {prediction['memory'] / 1e9:.1f} GB, "
+                              f"{plan['memory_limit'] / 1e9:.1f} GB available")
+        
+        options = dict(data_dir=self.data_dir, co2_policy=self.co2_policy, objective=self.objective,
+                       exclude_techs=self.exclude_techs, solver_params=plan['solver_params'], env=env)
+        options.update(model_kwargs)
+        if len(plan['days']) == len(self.days):
+            return WFENexusModel(**options)
+        options.pop('cache_dir', None)
+        return ReducedDayModel(plan['days'], **options)
+    
+    def print_plan(self, plan):
+        prediction = plan['prediction']
+        solve_time = prediction['solve_time']
+        print("-"*60)
+        print("INSTANCE PLAN")
+        print("-"*60)
+        print(f"Representative days: {', '.join(plan['days'])} ({prediction['hours']} hours, "
+              f"{prediction['scenarios']} scenarios, {prediction['techs']} techs)")
+        print(f"Variables: {prediction['num_vars']:,} ({prediction['num_bin_vars']:,} binary)")
+        print(f"Constraints: {prediction['num_constrs']:,} linear, {prediction['num_qconstrs']:,} quadratic")
+        print(f"Memory: {prediction['memory'] / 1e6:,.0f} MB predicted"
+              + (f", {plan['memory_limit'] / 1e6:,.0f} MB usable" if plan['memory_limit'] is not None else ""))
+        print(f"Solve time: {'unknown (no run history)' if solve_time is None else f'{solve_time:,.1f} s predicted'}")
+        print(f"Solver parameters: {plan['solver_params']}")
+        print(f"Reason: {plan['reason']}")
+
+def calibrate_memory(data_dir='data', day_counts=(1, 2, 4)):
+    """Measured build memory per element (bytes) of instances with several day counts (Linux)"""
+    planner = InstancePlanner(data_dir)
+    rows = []
+    for count in day_counts:
+        prediction = planner.predict(count)
+        before = resident_memory()
+        model = planner.build({'days': select_days(planner.days, count), 'prediction': prediction,
+                               'memory_limit': None, 'solver_params': {'OutputFlag': 0}})
+        model.model.update()
+        rows.append((prediction['num_vars'] + prediction['num_constrs'] + prediction['num_qconstrs'],
+                     resident_memory() - before))
+        model.dispose()
+    elements, measured = np.array(rows, dtype=float).T
+    return float(np.sum(elements * measured) / np.sum(elements ** 2))
+
+if __name__ == "__main__":
+    planner = InstancePlanner(data_dir='../data', co2_policy='medium_tax')
+    plan = planner.plan(time_budget=3600)
+    planner.print_plan(plan)
+    
+    start_time = time.time()
+    model = planner.build(plan)
+    model.optimize()
+    print(f"Total time: {time.time() - start_time:.1f} s")
@@ -0,0 +1,417 @@
+"""
+Local Optimization Job Service for the WFE Nexus Model
+HTTP service on localhost that accepts job specifications, queues them in
+SQLite, dispatches them to a worker process pool with per-job thread
+limits, deduplicates identical jobs by fingerprint and serves results and
+plots from its own result store
+
+Launch from the package directory with: python -m src.job_service
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse
+import urllib.request
+import matplotlib
+matplotlib.use('Agg')  # workers render plots without a display
+import mimetypes
+import threading
+import traceback
+import hashlib
+import sqlite3
+import glob
+import json
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+import config.model_config as model_config
+from src.wfe_nexus_model import WFENexusModel
+from src.experiment_runner import extract_summary
+from src.visualizer import WFEVisualizer
+from src.env_pool import get_env, init_worker
+from src.tuned_settings import PACKAGE_DIR
+
+# Job specification fields and the WFENexusModel options allowed as overrides
+SPEC_FIELDS = {'data_dir', 'co2_policy', 'objective', 'overrides', 'threads'}
+OVERRIDES = {'co2_tax', 'discount_rate', 'exclude_techs', 'solver_params'}
+# Modules whose code determines a job's stored result (model, job runner, summary extraction)
+RESULT_SOURCES = ['wfe_nexus_model.py', 'job_service.py', 'experiment_runner.py']
+
+def normalize_spec(spec):
+    """Validated job specification with defaults filled in"""
+    unknown = set(spec) - SPEC_FIELDS
+    if unknown:
+        raise ValueError(f"Unknown job fields: {sorted(unknown)}")
+    overrides = dict(spec.get('overrides') or {})
+    unknown = set(overrides) - OVERRIDES
+    if unknown:
+        raise ValueError(f"Unknown overrides: {sorted(unknown)} (allowed: {sorted(OVERRIDES)})")
+    
+    normalized = {
+        'data_dir': os.path.abspath(spec.get('data_dir', 'data')),
+        'co2_policy': spec.get('co2_policy', 'medium_tax'),
+        'objective': spec.get('objective', 'minimize_cost'),
+        'overrides': overrides
+    }
+    if normalized['co2_policy'] not in CO2_TAX_SCENARIOS:
+        raise ValueError(f"Unknown CO2 policy: {normalized['co2_policy']}")
+    if not os.path.isdir(normalized['data_dir']):
+        raise ValueError(f"Data set not found: {normalized['data_dir']}")
+    if 'exclude_techs' in overrides:
+        overrides['exclude_techs'] = sorted(overrides['exclude_techs'])
+    return normalized
+
+def job_fingerprint(spec):
+    """Hash of model code, configuration, job options and input data (threads do not change results)"""
+    digest = hashlib.sha256()
+    for source in RESULT_SOURCES:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), source), 'rb') as f:
+            digest.update(f.read())
+    
+    config = {name: getattr(model_config, name) for name in dir(model_config) if name.isupper()}
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    digest.update(json.dumps({key: spec[key] for key in ['co2_policy', 'objective', 'overrides']},
+                             sort_keys=True).encode())
+    
+    for path in sorted(glob.glob(os.path.join(spec['data_dir'], '*.csv'))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:20]
+
+class JobQueue:
+    """SQLite job table shared by the HTTP handlers and the dispatcher"""
+    def __init__(self, db_path):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with self.connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT UNIQUE NOT NULL,
+                spec TEXT NOT NULL,
+                threads INTEGER NOT NULL,
+                status TEXT NOT NULL,
+                submitted REAL, started REAL, finished REAL,
+                submissions INTEGER DEFAULT 1,
+                error TEXT)""")
+            db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id)")
+    
+    def connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+    
+    def submit(self, spec, threads):
+        """Queue a job unless an identical one exists; returns (job, deduplicated)"""
+        fingerprint = job_fingerprint(spec)
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT * FROM jobs WHERE fingerprint = ?", (fingerprint,)).fetchone()
+            if row is None:
+                db.execute("INSERT INTO jobs (fingerprint, spec, threads, status, submitted) VALUES (?, ?, ?, ?, ?)",
+                           (fingerprint, json.dumps(spec), threads, 'queued', time.time()))
+                deduplicated = False
+            elif row['status'] == 'failed':
+                # Failed jobs are retried when submitted again
+                db.execute("UPDATE jobs SET status = 'queued', threads = ?, error = NULL, submitted = ?, "
+                           "submissions = submissions + 1 WHERE id = ?", (threads, time.time(), row['id']))
+                deduplicated = False
+            else:
+                db.execute("UPDATE jobs SET submissions = submissions + 1 WHERE id = ?", (row['id'],))
+                deduplicated = True
+            db.execute("COMMIT")
+        return self.get_by_fingerprint(fingerprint), deduplicated
+    
+    def claim_next(self):
+        """Mark the oldest queued job as running and return it (None if the queue is empty)"""
+        with self.connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT * FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is not None:
+                db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row['id']))
+            db.execute("COMMIT")
+        return self.get(row['id']) if row is not None else None
+    
+    def finish(self, job_id, status, error=None):
+        with self.connect() as db:
+            db.execute("UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ?",
+                       (status, time.time(), error, job_id))
+    
+    def requeue(self, job_id):
+        """Put a claimed job back at its place in the queue"""
+        with self.connect() as db:
+            db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE id = ?", (job_id,))
+    
+    def requeue_running(self):
+        """Jobs left running by a stopped service go back to the queue"""
+        with self.connect() as db:
+            return db.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'").rowcount
+    
+    def record(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['spec'] = json.loads(job['spec'])
+        return job
+    
+    def get(self, job_id):
+        with self.connect() as db:
+            return self.record(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+    
+    def get_by_fingerprint(self, fingerprint):
+        with self.connect() as db:
+            return self.record(db.execute("SELECT * FROM jobs WHERE fingerprint = ?", (fingerprint,)).fetchone())
+    
+    def list(self, status=None):
+        with self.connect() as db:
+            if status is None:
+                rows = db.execute("SELECT * FROM jobs ORDER BY id").fetchall()
+            else:
+                rows = db.execute("SELECT * FROM jobs WHERE status = ? ORDER BY id", (status,)).fetchall()
+        return [self.record(row) for row in rows]
+
+def run_service_job(job_id, spec, threads, job_dir, plots):
+    """Build, solve and store one job (runs in a worker process)"""
+    os.makedirs(job_dir, exist_ok=True)
+    start_time = time.time()
+    model = WFENexusModel(data_dir=spec['data_dir'], co2_policy=spec['co2_policy'], objective=spec['objective'],
+                          env=get_env(Threads=threads), **spec['overrides'])
+    result = {'job_id': job_id, 'build_time': time.time() - start_time}
+    
+    solve_start = time.time()
+    optimal = model.resolve()
+    result['solve_time'] = time.time() - solve_start
+    result['status'] = model.model.status
+    
+    if optimal:
+        result.update(extract_summary(model))
+        model.save_results(os.path.join(job_dir, 'detailed_results.txt'))
+        if plots:
+            try:
+                WFEVisualizer(model).create_all_plots(save_dir=os.path.join(job_dir, 'plots'))
+            except Exception as e:
+                result['plot_error'] = str(e)
+    model.dispose()
+    
+    result['wall_time'] = time.time() - start_time
+    with open(os.path.join(job_dir, 'result.json'), 'w') as f:
+        json.dump(result, f, indent=2)
+    return result
+
+class JobService:
+    def __init__(self, host=None, port=None, store_dir=None, max_workers=None, plots=None):
+        self.host = JOB_SERVICE['host'] if host is None else host
+        self.port = JOB_SERVICE['port'] if port is None else port
+        store_dir = JOB_SERVICE['store_dir'] if store_dir is None else store_dir
+        self.store_dir = store_dir if os.path.isabs(store_dir) else os.path.join(PACKAGE_DIR, store_dir)
+        self.max_workers = JOB_SERVICE['max_workers'] if max_workers is None else max_workers
+        self.plots = JOB_SERVICE['plots'] if plots is None else plots
+        self.queue = JobQueue(os.path.join(self.store_dir, 'jobs.sqlite'))
+        self.running = {}
+        self.stopping = threading.Event()
+        self.wakeup = threading.Event()
+        self.pool_restarts = 0
+        self.dispatch_error = None
+    
+    def job_dir(self, job_id):
+        return os.path.join(self.store_dir, f'job_{job_id:06d}')
+    
+    def submit(self, spec):
+        """Validate and queue a job specification"""
+        normalized = normalize_spec(spec)
+        threads = int(spec.get('threads', JOB_SERVICE['default_threads']))
+        threads = max(1, min(threads, JOB_SERVICE['max_threads_per_job']))
+        job, deduplicated = self.queue.submit(normalized, threads)
+        self.wakeup.set()
+        return job, deduplicated
+    
+    def result(self, job_id):
+        path = os.path.join(self.job_dir(job_id), 'result.json')
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+    
+    def files(self, job_id):
+        job_dir = self.job_dir(job_id)
+        return sorted(os.path.relpath(path, job_dir) for path in glob.glob(os.path.join(job_dir, '**', '*'), recursive=True)
+                      if os.path.isfile(path))
+    
+    def on_done(self, job_id, future):
+        try:
+            result = future.result()
+            self.queue.finish(job_id, 'done' if result['status'] == 2 else 'failed',
+                              None if result['status'] == 2 else f"Solver status {result['status']}")
+        except Exception as e:
+            self.queue.finish(job_id, 'failed', ''.join(traceback.format_exception_only(type(e), e)).strip())
+        self.running.pop(job_id, None)
+        self.wakeup.set()
+    
+    def new_executor(self):
+        # Per-job thread limits are set on each job's environment
+        return ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_worker)
+    
+    def dispatch(self):
+        """Feed queued jobs to free worker slots until the service stops"""
+        try:
+            while not self.stopping.is_set():
+                while len(self.running) < self.max_workers:
+                    job = self.queue.claim_next()
+                    if job is None:
+                        break
+                    try:
+                        future = self.executor.submit(run_service_job, job['id'], job['spec'], job['threads'],
+                                                      self.job_dir(job['id']), self.plots)
+                    except BrokenProcessPool:
+                        # A worker died; its running jobs fail through on_done, this one waits for a new pool
+                        self.queue.requeue(job['id'])
+                        self.executor.shutdown(wait=False)
+                        self.executor = self.new_executor()
+                        self.pool_restarts += 1
+                        print(f"Worker pool broken; restarted ({self.pool_restarts} restarts)")
+                        continue
+                    self.running[job['id']] = future
+                    future.add_done_callback(lambda future, job_id=job['id']: self.on_done(job_id, future))
+                self.wakeup.wait(JOB_SERVICE['poll_interval'])
+                self.wakeup.clear()
+        except Exception as e:
+            # Reported by /health instead of dying silently
+            self.dispatch_error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+            traceback.print_exc()
+    
+    def health(self):
+        """Service state: 'ok', or 'error' once the dispatcher has stopped unexpectedly"""
+        dispatching = self.dispatcher.is_alive() or self.stopping.is_set()
+        health = {'status': 'ok' if dispatching else 'error', 'running': len(self.running),
+                  'queued': len(self.queue.list('queued')), 'pool_restarts': self.pool_restarts}
+        if not dispatching:
+            health['error'] = self.dispatch_error or 'Dispatcher stopped'
+        return health
+    
+    def start(self):
+        """Start the HTTP server, the dispatcher and the worker pool in background threads"""
+        requeued = self.queue.requeue_running()
+        if requeued:
+            print(f"Requeued {requeued} jobs interrupted by the last shutdown")
+        
+        self.executor = self.new_executor()
+        self.dispatcher = threading.Thread(target=self.dispatch, daemon=True)
+        self.dispatcher.start()
+        
+        handler = type('JobServiceHandler', (JobServiceHandler,), {'service': self})
+        self.server = ThreadingHTTPServer((self.host, self.port), handler)
+        self.port = self.server.server_address[1]  # actual port when started with port 0
+        self.server_thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.server_thread.start()
+        print(f"WFE job service on http://{self.host}:{self.port} (store {self.store_dir})")
+        return self
+    
+    def stop(self):
+        """Stop accepting requests and wait for running jobs"""
+        self.server.shutdown()
+        self.server.server_close()
+        self.stopping.set()
+        self.wakeup.set()
+        self.dispatcher.join()
+        self.executor.shutdown(wait=True)
+
+class JobServiceHandler(BaseHTTPRequestHandler):
+    """JSON API: POST /jobs, GET /jobs[?status=], GET /jobs/<id>, GET /jobs/<id>/result,
+    GET /jobs/<id>/files[/<path>], GET /health"""
+    service = None
+    
+    def send_json(self, payload, code=200):
+        body = json.dumps(payload, indent=2, default=str).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def send_file(self, path):
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', mimetypes.guess_type(path)[0] or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            return self.send_json({'error': 'Not found'}, 404)
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            spec = json.loads(self.rfile.read(length) or b'{}')
+            job, deduplicated = self.service.submit(spec)
+        except (ValueError, TypeError) as e:
+            return self.send_json({'error': str(e)}, 400)
+        job['deduplicated'] = deduplicated
+        self.send_json(job, 200 if deduplicated else 201)
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        service = self.service
+        
+        if parts == ['health']:
+            health = service.health()
+            return self.send_json(health, 200 if health['status'] == 'ok' else 503)
+        if parts == ['jobs']:
+            status = dict(item.split('=', 1) for item in url.query.split('&') if '=' in item).get('status')
+            return self.send_json(service.queue.list(status))
+        if len(parts) < 2 or parts[0] != 'jobs' or not parts[1].isdigit():
+            return self.send_json({'error': 'Not found'}, 404)
+        
+        job_id = int(parts[1])
+        job = service.queue.get(job_id)
+        if job is None:
+            return self.send_json({'error': f'Unknown job {job_id}'}, 404)
+        
+        if len(parts) == 2:
+            job['result'] = service.result(job_id)
+            return self.send_json(job)
+        if parts[2:] == ['result']:
+            result = service.result(job_id)
+            return self.send_json(result if result is not None else {'error': 'No result yet'},
+                                  200 if result is not None else 404)
+        if parts[2] == 'files':
+            if len(parts) == 3:
+                return self.send_json(service.files(job_id))
+            # Only files inside the job's own directory are served
+            job_dir = service.job_dir(job_id)
+            path = os.path.realpath(os.path.join(job_dir, *parts[3:]))
+            if not path.startswith(os.path.realpath(job_dir) + os.sep) or not os.path.isfile(path):
+                return self.send_json({'error': 'File not found'}, 404)
+            return self.send_file(path)
+        return self.send_json({'error': 'Not found'}, 404)
+    
+    def log_message(self, format, *args):
+        pass  # keep the console for job progress
+
+def submit_job(spec, url=None):
+    """Client helper: submit a job to a running service and return its record"""
+    url = url or f"http://{JOB_SERVICE['host']}:{JOB_SERVICE['port']}"
+    request = urllib.request.Request(f"{url}/jobs", data=json.dumps(spec).encode(),
+                                     headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+def get_job(job_id, url=None):
+    """Client helper: current record (and result) of a job"""
+    url = url or f"http://{JOB_SERVICE['host']}:{JOB_SERVICE['port']}"
+    with urllib.request.urlopen(f"{url}/jobs/{job_id}") as response:
+        return json.load(response)
+
+if __name__ == "__main__":
+    service = JobService().start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("Stopping job service...")
+        service.stop()
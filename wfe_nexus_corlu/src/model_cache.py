@@ -0,0 +1,126 @@
+"""
+Compiled Model Cache for the WFE Nexus Model
+Stores built models as compressed MPS plus variable index maps, keyed by a
+fingerprint of the model structure and input data
+"""
+
+import gurobipy as gp
+import hashlib
+import json
+import glob
+import shutil
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config.model_config as model_config
+
+MODEL_FILE = 'model.mps.bz2'
+INDEX_FILE = 'index.json'
+
+def _encode_key(key):
+    return list(key) if isinstance(key, tuple) else key
+
+def _decode_key(key):
+    return tuple(key) if isinstance(key, list) else key
+
+def model_fingerprint(nexus_model):
+    """Hash of model code, configuration, build options and input data"""
+    digest = hashlib.sha256()
+    
+    # Model code defines the structure
+    model_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wfe_nexus_model.py')
+    with open(model_source, 'rb') as f:
+        digest.update(f.read())
+    
+    # Configuration parameters
+    config = {name: getattr(model_config, name) for name in dir(model_config) if name.isupper()}
+    digest.update(json.dumps(config, sort_keys=True, default=str).encode())
+    
+    # Build options
+    options = {
+        'objective': nexus_model.objective_type,
+        'co2_tax': nexus_model.co2_tax,
+        'discount_rate': nexus_model.discount_rate,
+        'exclude_techs': list(nexus_model.exclude_techs)
+    }
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    
+    # Input data
+    for path in sorted(glob.glob(os.path.join(nexus_model.data_dir, '*.csv'))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    
+    return digest.hexdigest()[:20]
+
+class ModelCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+    
+    def fingerprint(self, nexus_model):
+        return model_fingerprint(nexus_model)
+    
+    def entry_dir(self, fingerprint):
+        return os.path.join(self.cache_dir, fingerprint)
+    
+    def load(self, nexus_model, env=None):
+        """Attach a cached model and its variable maps to nexus_model; False on cache miss"""
+        start_time = time.time()
+        fingerprint = self.fingerprint(nexus_model)
+        entry = self.entry_dir(fingerprint)
+        model_path = os.path.join(entry, MODEL_FILE)
+        index_path = os.path.join(entry, INDEX_FILE)
+        
+        if not (os.path.exists(model_path) and os.path.exists(index_path)):
+            return False
+        
+        with open(index_path) as f:
+            index = json.load(f)
+        
+        model = gp.read(model_path, env) if env is not None else gp.read(model_path)
+        variables = model.getVars()
+        
+        for attr, entries in index['variables'].items():
+            setattr(nexus_model, attr, {_decode_key(key): variables[i] for key, i in entries})
+        for attr, value in index['attributes'].items():
+            setattr(nexus_model, attr, value)
+        
+        nexus_model.model = model
+        print(f"Loaded cached model {fingerprint} in {(time.time() - start_time)*1000:.0f} ms")
+        return True
+    
+    def save(self, nexus_model):
+        """Write the built model and its variable maps to the cache"""
+        fingerprint = self.fingerprint(nexus_model)
+        entry = self.entry_dir(fingerprint)
+        nexus_model.model.update()
+        
+        index = {
+            'variables': {
+                attr: [[_encode_key(key), var.index] for key, var in value.items()]
+                for attr, value in vars(nexus_model).items()
+                if attr.startswith('v_') and isinstance(value, dict)
+            },
+            'attributes': {'days_per_season': nexus_model.days_per_season}
+        }
+        
+        # Write into a temporary directory first so readers never see partial entries
+        tmp_entry = f"{entry}.tmp{os.getpid()}"
+        os.makedirs(tmp_entry, exist_ok=True)
+        nexus_model.model.write(os.path.join(tmp_entry, MODEL_FILE))
+        with open(os.path.join(tmp_entry, INDEX_FILE), 'w') as f:
+            json.dump(index, f)
+        
+        if os.path.exists(entry):
+            shutil.rmtree(tmp_entry)
+        else:
+            os.replace(tmp_entry, entry)
+        
+        print(f"Model cached as {fingerprint} in {self.cache_dir}")
+        return fingerprint
+    
+    def clear(self):
+        """Remove all cache entries"""
+        if os.path.exists(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
@@ -0,0 +1,281 @@
+"""
+Monte Carlo Evaluation of a WFE Nexus Design
+Streams sampled years through batched dispatch solves of a fixed design
+across a process pool and accumulates cost and emission distributions
+with bounded memory
+"""
+
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+import numpy as np
+import heapq
+import math
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.data_generator import DataGenerator
+from src.stochastic_metrics import ScenarioModel
+from src.env_pool import get_env
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+SUMMARY_COLUMNS = ['sample', 'cost', 'emissions', 'grid_electricity', 'unmet_demand', 'solve_time']
+
+class P2Quantile:
+    """Streaming quantile estimate with five markers (Jain & Chlamtac P-square algorithm)"""
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+    
+    def add(self, x):
+        # Collect the first five observations exactly
+        if len(self.heights) < 5:
+            self.heights.append(x)
+            self.heights.sort()
+            return
+        
+        q, n = self.heights, self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = next(i for i in range(4) if q[i] <= x < q[i + 1])
+        
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+        
+        # Adjust the three middle markers
+        for i in range(1, 4):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+    
+    def value(self):
+        if not self.heights:
+            return float('nan')
+        if len(self.heights) < 5:
+            return float(np.quantile(self.heights, self.p))
+        return self.heights[2]
+
+class TailMean:
+    """Exact CVaR of the upper tail, keeping only the worst (1 - alpha) share of a known sample count"""
+    def __init__(self, alpha, n_samples):
+        self.alpha = alpha
+        self.size = max(1, math.ceil(round((1 - alpha) * n_samples, 9)))  # 1 - 0.95 is not exactly 0.05
+        self.tail = []
+    
+    def add(self, x):
+        if len(self.tail) < self.size:
+            heapq.heappush(self.tail, x)
+        elif x > self.tail[0]:
+            heapq.heapreplace(self.tail, x)
+    
+    def value(self):
+        return float(np.mean(self.tail)) if self.tail else float('nan')
+
+class StreamingStats:
+    """Running mean, standard deviation, quantiles and CVaR of one metric"""
+    def __init__(self, quantiles, cvar_alpha, n_samples):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = float('inf')
+        self.maximum = float('-inf')
+        self.quantiles = {p: P2Quantile(p) for p in quantiles}
+        self.cvar = TailMean(cvar_alpha, n_samples)
+    
+    def add(self, x):
+        # Welford update
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.minimum = min(self.minimum, x)
+        self.maximum = max(self.maximum, x)
+        for estimator in self.quantiles.values():
+            estimator.add(x)
+        self.cvar.add(x)
+    
+    def summary(self):
+        result = {
+            'mean': self.mean,
+            'std': math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0,
+            'min': self.minimum,
+            'max': self.maximum
+        }
+        for p, estimator in self.quantiles.items():
+            result[f'P{p*100:g}'] = estimator.value()
+        result[f'CVaR{self.cvar.alpha*100:g}'] = self.cvar.value()
+        return result
+
+class SummaryWriter:
+    """Append per-sample summaries batch by batch (Parquet with pyarrow, CSV otherwise)"""
+    def __init__(self, path):
+        if pa is None and path.endswith('.parquet'):
+            path = path[:-len('.parquet')] + '.csv'
+            print("pyarrow not installed, writing per-sample summaries as CSV")
+        self.path = path
+        self.writer = None
+        self.rows = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    
+    def write(self, batch):
+        frame = pd.DataFrame(batch, columns=SUMMARY_COLUMNS)
+        if self.path.endswith('.parquet'):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self.writer is None:
+                self.writer = pq.ParquetWriter(self.path, table.schema)
+            self.writer.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(frame)
+    
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+# Per-process state: one resident structure with the design fixed
+_worker_args = None
+_worker_model = None
+
+def _init_worker(data_dir, capacities, co2_policy, objective, threads):
+    """Store the run settings of the worker"""
+    global _worker_args
+    _worker_args = {'data_dir': data_dir, 'capacities': capacities, 'co2_policy': co2_policy,
+                    'objective': objective, 'threads': threads}
+
+def _evaluate_batch(seed, start, n_samples):
+    """Dispatch the fixed design on samples start..start+n_samples-1"""
+    global _worker_model
+    samples = DataGenerator().sample_scenarios(n_samples, seed, start)
+    
+    if _worker_model is None:
+        args = _worker_args
+        _worker_model = ScenarioModel(*next(iter(samples.values())), data_dir=args['data_dir'],
+                                      co2_policy=args['co2_policy'], objective=args['objective'],
+                                      env=get_env(Threads=args['threads']))
+        _worker_model.fix_first_stage(args['capacities'])
+    model = _worker_model
+    days = model.days_per_season
+    
+    rows = []
+    for i, sample in enumerate(samples.values()):
+        start_time = time.time()
+        model.set_scenario(*sample)
+        if not model.resolve():
+            raise RuntimeError(f"Dispatch of sample {start + i} failed with status {model.model.status}")
+        
+        grid = sum(var.X for key, var in model.v_grid_buy.items() if key[0] == 'electricity')
+        unmet = sum(var.X for slack in [model.v_heat_slack, model.v_h2_slack, model.v_n_slack]
+                    for var in slack.values())
+        rows.append((start + i, model.model.ObjVal, model.calculate_annual_emissions(),
+                     grid * days, unmet * days, time.time() - start_time))
+    
+    return rows
+
+class MonteCarloEvaluator:
+    def __init__(self, capacities, data_dir='data', co2_policy='medium_tax', objective='minimize_cost',
+                 samples=None, batch_size=None, seed=None, quantiles=None, cvar_alpha=None,
+                 max_workers=None, total_threads=None):
+        self.capacities = dict(capacities)
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.samples = MONTE_CARLO['samples'] if samples is None else samples
+        self.batch_size = MONTE_CARLO['batch_size'] if batch_size is None else batch_size
+        self.seed = MONTE_CARLO['seed'] if seed is None else seed
+        self.quantiles = MONTE_CARLO['quantiles'] if quantiles is None else quantiles
+        self.cvar_alpha = MONTE_CARLO['cvar_alpha'] if cvar_alpha is None else cvar_alpha
+        self.max_workers = MONTE_CARLO['max_workers'] if max_workers is None else max_workers
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_worker = max(1, self.total_threads // self.max_workers)
+    
+    def batches(self):
+        for start in range(0, self.samples, self.batch_size):
+            yield start, min(self.batch_size, self.samples - start)
+    
+    def run(self, output_path='results/monte_carlo.parquet'):
+        """Evaluate the design on all samples and return the distribution summaries"""
+        start_time = time.time()
+        stats = {metric: StreamingStats(self.quantiles, self.cvar_alpha, self.samples)
+                 for metric in ['cost', 'emissions']}
+        writer = SummaryWriter(output_path)
+        args = (self.data_dir, self.capacities, self.co2_policy, self.objective, self.threads_per_worker)
+        batches = self.batches()
+        pending = set()
+        done_samples = 0
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=args) as executor:
+            # Keep a bounded number of batches in flight so results never pile up
+            max_pending = self.max_workers * MONTE_CARLO['pending_batches_per_worker']
+            try:
+                while True:
+                    for start, n in batches:
+                        pending.add(executor.submit(_evaluate_batch, self.seed, start, n))
+                        if len(pending) >= max_pending:
+                            break
+                    if not pending:
+                        break
+                    
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        rows = future.result()
+                        for row in rows:
+                            stats['cost'].add(row[1])
+                            stats['emissions'].add(row[2])
+                        writer.write(rows)
+                        done_samples += len(rows)
+                    
+                    print(f"  {done_samples:>7}/{self.samples} samples "
+                          f"({done_samples / (time.time() - start_time):.1f} samples/s)")
+            finally:
+                writer.close()
+        
+        wall_time = time.time() - start_time
+        return self.report(stats, writer.path, wall_time)
+    
+    def report(self, stats, output_path, wall_time):
+        """Print the cost and emission distributions"""
+        results = {metric: value.summary() for metric, value in stats.items()}
+        results['samples'] = stats['cost'].count
+        results['output_path'] = output_path
+        results['wall_time'] = wall_time
+        
+        print("\n" + "-"*60)
+        print("MONTE CARLO EVALUATION")
+        print("-"*60)
+        print(f"{'Statistic':<12} {'Cost ($/yr)':>20} {'Emissions (t/yr)':>20}")
+        for key in results['cost']:
+            print(f"{key:<12} {results['cost'][key]:>20,.0f} {results['emissions'][key]:>20,.1f}")
+        print("-"*60)
+        print(f"{results['samples']} samples in {wall_time:.2f} s; per-sample summaries in {output_path}")
+        
+        return results
+
+if __name__ == "__main__":
+    design = {'pv': 50, 'wind': 40, 'battery': 100, 'electrolyzer': 10, 'chp': 5, 'h2_storage': 500}
+    MonteCarloEvaluator(design, data_dir='../data').run('../results/monte_carlo.parquet')
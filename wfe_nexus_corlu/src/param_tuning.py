@@ -0,0 +1,163 @@
+"""
+Offline Parameter Tuning Harness for the WFE Nexus Model
+Runs the Gurobi tuning tool on a benchmark set of WFENexusModel instances,
+confirms the candidate settings on every instance of a class and stores
+the fastest ones per instance class for WFENexusModel.optimize()
+"""
+
+from gurobipy import GRB
+import tempfile
+import shutil
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.tuned_settings import TunedSettings, instance_class
+from src.env_pool import get_env
+
+# Parameters that belong to the run setup rather than the tuned solver strategy
+SETUP_PARAMS = {'TimeLimit', 'DualReductions', 'OutputFlag', 'LogToConsole', 'LogFile', 'Threads',
+                'TuneTimeLimit', 'TuneTrials', 'TuneOutput', 'TuneResults'}
+
+def parse_value(text):
+    """Parameter value of a .prm file as int, float or string"""
+    for cast in (int, float):
+        try:
+            return cast(text)
+        except ValueError:
+            pass
+    return text
+
+def read_params(model, path):
+    """Non-default parameters of a model (via a .prm file)"""
+    model.write(path)
+    params = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip() and not line.startswith('#'):
+                name, value = line.split()[:2]
+                params[name] = parse_value(value)
+    return params
+
+class ParameterTuner:
+    def __init__(self, data_dir='data', benchmark=None, settings_path=None, tune_time_limit=None,
+                 tune_trials=None, evaluation_time_limit=None, threads=None):
+        self.data_dir = data_dir
+        self.benchmark = PARAM_TUNING['benchmark'] if benchmark is None else benchmark
+        self.settings = TunedSettings(settings_path)
+        self.tune_time_limit = PARAM_TUNING['tune_time_limit'] if tune_time_limit is None else tune_time_limit
+        self.tune_trials = PARAM_TUNING['tune_trials'] if tune_trials is None else tune_trials
+        self.evaluation_time_limit = (PARAM_TUNING['evaluation_time_limit']
+                                      if evaluation_time_limit is None else evaluation_time_limit)
+        self.threads = EXPERIMENT_RUNNER['total_threads'] if threads is None else threads
+    
+    def build(self, options):
+        """Benchmark instance set up as WFENexusModel.optimize would solve it"""
+        nexus_model = WFENexusModel(data_dir=self.data_dir, env=get_env(Threads=self.threads), **options)
+        nexus_model.add_fallback_bounds()
+        nexus_model.model.Params.DualReductions = 0
+        return nexus_model
+    
+    def tune_instance(self, nexus_model, baseline, work_dir):
+        """Best parameter changes found by the Gurobi tuning tool"""
+        model = nexus_model.model
+        model.Params.TuneTimeLimit = self.tune_time_limit
+        model.Params.TuneTrials = self.tune_trials
+        model.tune()
+        
+        tuned = {}
+        loaded = {}
+        if model.TuneResultCount > 0:
+            # Result 0 is the best parameter set; loading it replaces all parameters
+            model.getTuneResult(0)
+            loaded = read_params(model, os.path.join(work_dir, 'tuned.prm'))
+            tuned = {param: value for param, value in loaded.items()
+                     if param not in SETUP_PARAMS and baseline.get(param) != value}
+        
+        self.restore(model, baseline, set(loaded) | set(baseline) | {'TuneTimeLimit', 'TuneTrials'})
+        return tuned
+    
+    def restore(self, model, baseline, params):
+        """Reset changed parameters to the values the instance was built with"""
+        # OutputFlag first, so restoring stays as quiet as the instance was
+        for param in sorted(params, key=lambda param: param != 'OutputFlag'):
+            model.setParam(param, baseline.get(param, 'default'))
+    
+    def time_solve(self, nexus_model, params, baseline):
+        """Runtime of a cold solve with the given parameters (unsolved runs count twice the limit)"""
+        model = nexus_model.model
+        model.Params.TimeLimit = self.evaluation_time_limit
+        for param, value in params.items():
+            model.setParam(param, value)
+        model.reset(0)
+        model.optimize()
+        runtime = model.Runtime if model.status == GRB.OPTIMAL else 2 * self.evaluation_time_limit
+        
+        self.restore(model, baseline, list(params) + ['TimeLimit'])
+        return runtime
+    
+    def run(self):
+        """Tune every benchmark instance and store the best settings per instance class"""
+        start_time = time.time()
+        work_dir = tempfile.mkdtemp(prefix='wfe_tune_')
+        
+        print("\n" + "-"*60)
+        print("OFFLINE PARAMETER TUNING")
+        print("-"*60)
+        
+        # Benchmark instances grouped by class
+        classes = {}
+        for options in self.benchmark:
+            nexus_model = self.build(options)
+            baseline = read_params(nexus_model.model, os.path.join(work_dir, 'baseline.prm'))
+            key = instance_class(nexus_model.instance_features())
+            classes.setdefault(key, []).append((options, nexus_model, baseline))
+        
+        results = {}
+        try:
+            for key, instances in classes.items():
+                print(f"\nClass {key}: {len(instances)} instances")
+                
+                # Candidates: the defaults plus the tuning result of every instance
+                candidates = {'default': {}}
+                for options, nexus_model, baseline in instances:
+                    tuned = self.tune_instance(nexus_model, baseline, work_dir)
+                    label = '_'.join(str(value) for value in options.values()) or 'base'
+                    print(f"  tuned on {label:<32} {tuned}")
+                    if tuned and tuned not in candidates.values():
+                        candidates[label] = tuned
+                
+                # Confirm every candidate on all instances of the class
+                runtimes = {}
+                for label, params in candidates.items():
+                    times = []
+                    for options, nexus_model, baseline in instances:
+                        times.append(self.time_solve(nexus_model, params, baseline))
+                    runtimes[label] = sum(times) / len(times)
+                    print(f"  {label:<42} mean runtime {runtimes[label]:>9.2f} s")
+                
+                best = min(runtimes, key=runtimes.get)
+                features = instances[0][1].instance_features()
+                self.settings.store(features, candidates[best], mean_runtime=runtimes[best],
+                                    default_runtime=runtimes['default'], instances=len(instances))
+                results[key] = {'params': candidates[best], 'mean_runtime': runtimes[best],
+                                'default_runtime': runtimes['default']}
+        finally:
+            for instances in classes.values():
+                for _, nexus_model, _ in instances:
+                    nexus_model.dispose()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        print("\n" + "-"*60)
+        print(f"{'Instance class':<36} {'Default (s)':>11} {'Tuned (s)':>10}")
+        for key, result in results.items():
+            print(f"{key:<36} {result['default_runtime']:>11.2f} {result['mean_runtime']:>10.2f}  {result['params']}")
+        print("-"*60)
+        print(f"Settings stored in {self.settings.path} ({time.time() - start_time:.2f} s)")
+        
+        return results
+
+if __name__ == "__main__":
+    ParameterTuner(data_dir='../data').run()
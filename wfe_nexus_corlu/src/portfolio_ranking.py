@@ -0,0 +1,203 @@
+"""
+Near-Optimal Portfolio Harvesting and Out-of-Sample Ranking
+Collects the k best distinct investment portfolios of the stochastic model
+(no-good cuts on v_build or the MIP solution pool), re-evaluates them in
+parallel on a large independent scenario sample and ranks them by
+out-of-sample cost and risk
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import gurobipy as gp
+import pandas as pd
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.saa import init_saa_worker, evaluate_candidates, confidence_interval
+
+def portfolio_key(capacities, min_capacity):
+    """Set of built technologies that identifies a portfolio"""
+    return tuple(sorted(tech for tech, cap in capacities.items() if cap >= min_capacity - 1e-6))
+
+def cvar(values, alpha):
+    """Mean of the worst (1 - alpha) share of the values"""
+    values = np.sort(np.asarray(values, dtype=float))
+    tail = max(1, int(np.ceil(round((1 - alpha) * len(values), 9))))  # 1 - 0.95 is not exactly 0.05
+    return values[-tail:].mean()
+
+class PortfolioRanking:
+    def __init__(self, data_dir='data', co2_policy='medium_tax', objective='minimize_cost',
+                 portfolios=None, method=None, evaluation_samples=None, seed=None, cvar_alpha=None,
+                 max_workers=None, total_threads=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.portfolios = PORTFOLIO_RANKING['portfolios'] if portfolios is None else portfolios
+        self.method = PORTFOLIO_RANKING['method'] if method is None else method
+        self.evaluation_samples = (PORTFOLIO_RANKING['evaluation_samples']
+                                   if evaluation_samples is None else evaluation_samples)
+        self.seed = PORTFOLIO_RANKING['seed'] if seed is None else seed
+        self.cvar_alpha = PORTFOLIO_RANKING['cvar_alpha'] if cvar_alpha is None else cvar_alpha
+        self.max_workers = PORTFOLIO_RANKING['max_workers'] if max_workers is None else max_workers
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_worker = max(1, self.total_threads // self.max_workers)
+        self.min_capacity = PORTFOLIO_RANKING['min_capacity']
+        
+        if self.method not in ('no_good', 'pool'):
+            raise ValueError(f"Unknown harvesting method '{self.method}' (use 'no_good' or 'pool')")
+    
+    def build_model(self):
+        """Stochastic model whose build decisions imply a minimum capacity"""
+        nexus_model = WFENexusModel(data_dir=self.data_dir, co2_policy=self.co2_policy, objective=self.objective)
+        nexus_model.add_fallback_bounds()  # same operational bounds as the evaluation models
+        nexus_model.model.Params.TimeLimit = PORTFOLIO_RANKING['harvest_time_limit']
+        
+        # A free v_build = 1 at zero capacity would make costless duplicates of every portfolio
+        for tech in nexus_model.all_techs:
+            if CAPACITY_LIMITS.get(tech, {}).get('min', 0) <= 0:
+                nexus_model.model.addConstr(nexus_model.v_cap[tech] >= self.min_capacity * nexus_model.v_build[tech],
+                                            name=f"harvest_min_cap_{tech}")
+        return nexus_model
+    
+    def portfolio(self, objective, capacities):
+        """Record of one harvested portfolio"""
+        capacities = {tech: cap if cap >= self.min_capacity - 1e-6 else 0.0 for tech, cap in capacities.items()}
+        return {'objective': objective, 'capacities': capacities,
+                'built': portfolio_key(capacities, self.min_capacity)}
+    
+    def harvest_no_good(self, nexus_model):
+        """Solve repeatedly, cutting off each found build pattern"""
+        model = nexus_model.model
+        portfolios = []
+        for k in range(self.portfolios):
+            nexus_model.resolve()
+            if model.SolCount == 0:
+                print(f"  No further portfolio (status {model.status})")
+                break
+            
+            capacities = {tech: nexus_model.v_cap[tech].X for tech in nexus_model.all_techs}
+            portfolios.append(self.portfolio(model.ObjVal, capacities))
+            print(f"  {k + 1:>3} {model.ObjVal:>18,.0f} {model.MIPGap*100:>7.2f}%  "
+                  f"{', '.join(portfolios[-1]['built'])}")
+            
+            # No-good cut: at least one build decision must flip
+            built = [nexus_model.v_build[tech] for tech in nexus_model.all_techs
+                     if nexus_model.v_build[tech].X > 0.5]
+            unbuilt = [nexus_model.v_build[tech] for tech in nexus_model.all_techs
+                       if nexus_model.v_build[tech].X <= 0.5]
+            model.addConstr(gp.quicksum(1 - var for var in built) + gp.quicksum(unbuilt) >= 1,
+                            name=f"no_good_{k}")
+        return portfolios
+    
+    def harvest_pool(self, nexus_model):
+        """Search the solution pool and keep the best solution of each build pattern"""
+        model = nexus_model.model
+        model.Params.PoolSearchMode = 2
+        model.Params.PoolSolutions = PORTFOLIO_RANKING['pool_solutions']
+        nexus_model.resolve()
+        
+        portfolios = {}
+        for n in range(model.SolCount):
+            model.Params.SolutionNumber = n
+            capacities = {tech: nexus_model.v_cap[tech].Xn for tech in nexus_model.all_techs}
+            record = self.portfolio(model.PoolObjVal, capacities)
+            # Pool solutions are sorted by objective, so the first of a pattern is its best
+            if record['built'] not in portfolios:
+                portfolios[record['built']] = record
+                print(f"  {len(portfolios):>3} {record['objective']:>18,.0f} {'':>8}  {', '.join(record['built'])}")
+            if len(portfolios) == self.portfolios:
+                break
+        
+        print(f"  {len(portfolios)} distinct portfolios among {model.SolCount} pool solutions")
+        return list(portfolios.values())
+    
+    def harvest(self):
+        """k best distinct investment portfolios of the stochastic model"""
+        start_time = time.time()
+        nexus_model = self.build_model()
+        
+        print(f"\nHarvesting {self.portfolios} portfolios ({self.method})")
+        print(f"  {'#':>3} {'Objective':>18} {'Gap':>8}  Built technologies")
+        if self.method == 'pool':
+            portfolios = self.harvest_pool(nexus_model)
+        else:
+            portfolios = self.harvest_no_good(nexus_model)
+        nexus_model.dispose()
+        
+        self.harvest_time = time.time() - start_time
+        return portfolios
+    
+    def evaluate(self, portfolios):
+        """Cost of every portfolio on every evaluation sample (common random numbers)"""
+        start_time = time.time()
+        candidates = [record['capacities'] for record in portfolios]
+        args = (self.data_dir, self.co2_policy, self.objective, self.threads_per_worker)
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_saa_worker,
+                                 initargs=args) as executor:
+            values = evaluate_candidates(executor, candidates, self.seed, self.evaluation_samples,
+                                         self.max_workers)
+        
+        self.evaluation_time = time.time() - start_time
+        return values
+    
+    def rank(self, portfolios, values):
+        """Out-of-sample cost and risk of every portfolio, best mean cost first"""
+        rows = []
+        for i, (record, costs) in enumerate(zip(portfolios, values)):
+            mean, half_width = confidence_interval(costs, SAA['confidence'])
+            rows.append({
+                'harvest_rank': i + 1,
+                'in_sample_cost': record['objective'],
+                'mean_cost': mean,
+                'ci_half_width': half_width,
+                'std_cost': costs.std(ddof=1) if len(costs) > 1 else 0.0,
+                'p95_cost': np.quantile(costs, 0.95),
+                f'cvar{self.cvar_alpha*100:g}_cost': cvar(costs, self.cvar_alpha),
+                'built': ', '.join(record['built']),
+                **{f'cap_{tech}': cap for tech, cap in record['capacities'].items()}
+            })
+        
+        ranking = pd.DataFrame(rows).sort_values('mean_cost').reset_index(drop=True)
+        ranking.insert(0, 'rank', np.arange(1, len(ranking) + 1))
+        ranking.insert(1, 'risk_rank', ranking[f'cvar{self.cvar_alpha*100:g}_cost'].rank(method='min').astype(int))
+        return ranking
+    
+    def run(self, output_path='results/portfolio_ranking.csv'):
+        """Harvest, evaluate and rank the portfolios in one batch"""
+        start_time = time.time()
+        portfolios = self.harvest()
+        if not portfolios:
+            print("No portfolio found; nothing to rank")
+            return None
+        
+        values = self.evaluate(portfolios)
+        ranking = self.rank(portfolios, values)
+        
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        ranking.to_csv(output_path, index=False)
+        
+        cvar_column = f'cvar{self.cvar_alpha*100:g}_cost'
+        print("\n" + "-"*60)
+        print("OUT-OF-SAMPLE PORTFOLIO RANKING")
+        print("-"*60)
+        print(f"{len(portfolios)} portfolios on {values.shape[1]} independent samples")
+        print(f"{'Rank':<5} {'Harvest':>7} {'In-sample':>16} {'Mean cost':>16} {'+/-':>12} "
+              f"{'CVaR':>16} {'Risk':>5}")
+        for _, row in ranking.iterrows():
+            print(f"{row['rank']:<5} {row['harvest_rank']:>7} {row['in_sample_cost']:>16,.0f} "
+                  f"{row['mean_cost']:>16,.0f} {row['ci_half_width']:>12,.0f} "
+                  f"{row[cvar_column]:>16,.0f} {row['risk_rank']:>5}")
+            print(f"      {row['built']}")
+        print("-"*60)
+        print(f"Harvest: {self.harvest_time:.2f} s, evaluation: {self.evaluation_time:.2f} s, "
+              f"total: {time.time() - start_time:.2f} s")
+        print(f"Ranking saved to {output_path}")
+        
+        return ranking
+
+if __name__ == "__main__":
+    PortfolioRanking(data_dir='../data').run('../results/portfolio_ranking.csv')
@@ -0,0 +1,201 @@
+"""
+Relax-and-Fix Heuristic for the WFE Nexus Unit Commitment
+Builds an incumbent season by season (binaries integral only in the current
+window, later windows relaxed, earlier ones fixed), polishes it with
+fix-and-optimize and injects it into the full model as MIP start
+
+While the heuristic runs, the bilinear limits gen <= cap * on and gen >=
+min_load * cap * on are replaced by their McCormick envelope: exact for
+integral or fixed commitment, the linear relaxation for relaxed windows, so
+every step is a MILP instead of a nonconvex MIQCP
+"""
+
+import gurobipy as gp
+from gurobipy import GRB
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+
+def season_of(t):
+    """Season window of a representative hour label such as 'winter_h12'"""
+    return str(t).split('_')[0]
+
+class RelaxAndFix:
+    def __init__(self, nexus_model, window_time_limit=None, window_mip_gap=None, polish_rounds=None):
+        self.nexus_model = nexus_model
+        self.model = nexus_model.model
+        self.window_time_limit = (RELAX_AND_FIX['window_time_limit']
+                                  if window_time_limit is None else window_time_limit)
+        self.window_mip_gap = RELAX_AND_FIX['window_mip_gap'] if window_mip_gap is None else window_mip_gap
+        self.polish_rounds = RELAX_AND_FIX['polish_rounds'] if polish_rounds is None else polish_rounds
+        
+        # Commitment binaries grouped by season window
+        self.windows = []
+        self.binaries = {}
+        for variables in [nexus_model.v_is_on, nexus_model.v_startup, nexus_model.v_shutdown]:
+            for (tech, t, scenario), var in variables.items():
+                window = season_of(t)
+                if window not in self.binaries:
+                    self.windows.append(window)
+                    self.binaries[window] = []
+                self.binaries[window].append(var)
+        
+        # Bilinear generation limits of each commitment variable (swapped out while the heuristic runs)
+        self.model.update()
+        qconstrs = {qconstr.QCName: qconstr for qconstr in self.model.getQConstrs()}
+        self.limits = {}
+        for (tech, t, scenario) in nexus_model.v_is_on:
+            if isinstance(nexus_model.v_cap[tech], gp.Var):
+                self.limits[(tech, t, scenario)] = [qconstrs[f"gen_max_{tech}_{t}_{scenario}"],
+                                                    qconstrs[f"gen_min_{tech}_{t}_{scenario}"]]
+        self.envelopes = {}
+        
+        self.history = []
+    
+    def linearize(self, key):
+        """Replace the bilinear limits of one commitment variable by their McCormick envelope
+        
+        With w = cap * on, 0 <= cap <= U and 0 <= on <= 1: w <= U * on, w <= cap and
+        w >= cap - U * (1 - on), exact whenever on is 0 or 1.
+        """
+        if key in self.envelopes or key not in self.limits:
+            return
+        tech = key[0]
+        gen, on, cap = self.nexus_model.v_gen[key], self.nexus_model.v_is_on[key], self.nexus_model.v_cap[tech]
+        upper = cap.UB
+        name = '_'.join(str(part) for part in key)
+        for qconstr in self.limits[key]:
+            self.model.remove(qconstr)
+        self.envelopes[key] = [
+            self.model.addConstr(gen <= upper * on, name=f"gen_max_on_{name}"),
+            self.model.addConstr(gen <= cap, name=f"gen_max_cap_{name}"),
+            self.model.addConstr(gen >= MIN_LOAD * (cap - upper * (1 - on)), name=f"gen_min_{name}")
+        ]
+    
+    def restore(self, key):
+        """Put the bilinear limits of a commitment variable back"""
+        if key not in self.envelopes:
+            return
+        tech = key[0]
+        gen, on, cap = self.nexus_model.v_gen[key], self.nexus_model.v_is_on[key], self.nexus_model.v_cap[tech]
+        for constr in self.envelopes.pop(key):
+            self.model.remove(constr)
+        name = f"{tech}_{key[1]}_{key[2]}"
+        self.limits[key] = [self.model.addQConstr(gen <= cap * on, name=f"gen_max_{name}"),
+                            self.model.addQConstr(gen >= MIN_LOAD * cap * on, name=f"gen_min_{name}")]
+    
+    def set_window(self, window, mode, values=None):
+        """Make the binaries of a window integral, relaxed or fixed (at values, or the current solution)"""
+        for var in self.binaries[window]:
+            if mode == 'integral':
+                var.VType = GRB.BINARY
+                var.LB, var.UB = 0, 1
+            elif mode == 'relaxed':
+                var.VType = GRB.CONTINUOUS
+                var.LB, var.UB = 0, 1
+            else:
+                value = round(var.X if values is None else values[var.index])
+                var.VType = GRB.BINARY
+                var.LB, var.UB = value, value
+    
+    def solve_step(self, label):
+        """Solve the current restriction; True if it produced a solution"""
+        start_time = time.time()
+        self.nexus_model.resolve()
+        solved = self.model.SolCount > 0
+        self.history.append({
+            'step': label,
+            'status': self.model.status,
+            'objective': self.model.ObjVal if solved else None,
+            'time': time.time() - start_time
+        })
+        objective = f"{self.model.ObjVal:>18,.0f}" if solved else f"{'-':>18}"
+        print(f"{label:<24} {objective} {time.time() - start_time:>9.2f}")
+        return solved
+    
+    def incumbent(self):
+        """Values of all variables in the current solution"""
+        return self.model.getAttr('X', self.model.getVars())
+    
+    def run(self):
+        """Relax-and-fix over the season windows, then fix-and-optimize; returns the incumbent objective"""
+        start_time = time.time()
+        saved_params = {'TimeLimit': self.model.Params.TimeLimit, 'MIPGap': self.model.Params.MIPGap}
+        # resolve() may add the fallback bounds to a restriction; the model handed back keeps its own bounds
+        variables = self.model.getVars()
+        saved_bounds = self.model.getAttr('UB', variables)
+        fallback_applied = self.nexus_model.fallback_bounds_applied
+        for key in list(self.limits):
+            self.linearize(key)
+        self.model.Params.TimeLimit = self.window_time_limit
+        self.model.Params.MIPGap = self.window_mip_gap
+        
+        print("\n" + "-"*60)
+        print("RELAX-AND-FIX HEURISTIC")
+        print("-"*60)
+        print(f"{'Step':<24} {'Objective':>18} {'Time (s)':>9}")
+        
+        values = None
+        objective = None
+        try:
+            # Relax-and-fix: one integral window at a time
+            for k, window in enumerate(self.windows):
+                self.set_window(window, 'integral')
+                for later in self.windows[k + 1:]:
+                    self.set_window(later, 'relaxed')
+                if not self.solve_step(f"relax-and-fix {window}"):
+                    print("No solution for the window; relax-and-fix stopped")
+                    return None
+                self.set_window(window, 'fixed')
+            
+            values = self.incumbent()
+            objective = self.model.ObjVal
+            
+            # Fix-and-optimize: free one window at a time around the incumbent
+            for polish_round in range(self.polish_rounds):
+                for window in self.windows:
+                    self.set_window(window, 'integral')
+                    self.model.setAttr('Start', self.model.getVars(), values)
+                    if self.solve_step(f"polish {polish_round + 1} {window}") and self.model.ObjVal < objective - 1e-6:
+                        values = self.incumbent()
+                        objective = self.model.ObjVal
+                    self.set_window(window, 'fixed', values)
+        finally:
+            # Restore the original binaries, generation limits, bounds and parameters
+            for window in self.windows:
+                self.set_window(window, 'integral')
+            for key in list(self.envelopes):
+                self.restore(key)
+            self.model.setAttr('UB', variables, saved_bounds)
+            self.nexus_model.fallback_bounds_applied = fallback_applied
+            for param, value in saved_params.items():
+                self.model.setParam(param, value)
+            
+            # Inject the incumbent as MIP start
+            if values is not None:
+                self.model.setAttr('Start', self.model.getVars(), values)
+        
+        self.objective = objective
+        print("-"*60)
+        print(f"Incumbent ${objective:,.0f} injected as MIP start after {time.time() - start_time:.2f} s")
+        return objective
+
+def optimize_with_relax_and_fix(nexus_model, **kwargs):
+    """Seed a built WFENexusModel with the relax-and-fix incumbent and solve it"""
+    heuristic = RelaxAndFix(nexus_model, **kwargs)
+    heuristic_start = time.time()
+    heuristic.run()
+    heuristic_time = time.time() - heuristic_start
+    
+    start_time = time.time()
+    nexus_model.resolve()
+    print(f"Full model: objective ${nexus_model.model.ObjVal:,.0f}, gap {nexus_model.model.MIPGap*100:.2f}% "
+          f"in {time.time() - start_time:.2f} s (heuristic {heuristic_time:.2f} s)")
+    return heuristic
+
+if __name__ == "__main__":
+    model = WFENexusModel(data_dir='../data', co2_policy='medium_tax')
+    optimize_with_relax_and_fix(model)
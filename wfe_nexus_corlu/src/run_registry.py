@@ -0,0 +1,226 @@
+"""
+Run Registry for the WFE Nexus Model
+Records every solved run (configuration fingerprint, parameters, timings,
+model size, solver statistics, objective components and capacities) in an
+indexed SQLite database and answers queries as DataFrames
+"""
+
+from datetime import datetime
+import pandas as pd
+import sqlite3
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.model_cache import model_fingerprint
+from src.tuned_settings import PACKAGE_DIR
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    recorded_at TEXT NOT NULL,
+    label TEXT,
+    fingerprint TEXT NOT NULL,
+    data_dir TEXT,
+    co2_policy TEXT,
+    objective TEXT,
+    co2_tax REAL,
+    discount_rate REAL,
+    exclude_techs TEXT,
+    solver_params TEXT,
+    build_time REAL,
+    solve_time REAL,
+    wall_time REAL,
+    num_vars INTEGER,
+    num_int_vars INTEGER,
+    num_constrs INTEGER,
+    num_qconstrs INTEGER,
+    num_nz INTEGER,
+    status INTEGER,
+    sol_count INTEGER,
+    obj_val REAL,
+    obj_bound REAL,
+    mip_gap REAL,
+    node_count REAL,
+    iter_count REAL,
+    work REAL,
+    investment REAL,
+    fixed_om REAL,
+    operations REAL,
+    annual_emissions REAL
+);
+CREATE TABLE IF NOT EXISTS capacities (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id) ON DELETE CASCADE,
+    tech TEXT NOT NULL,
+    capacity REAL NOT NULL,
+    built INTEGER NOT NULL,
+    PRIMARY KEY (run_id, tech)
+);
+CREATE INDEX IF NOT EXISTS runs_fingerprint ON runs (fingerprint);
+CREATE INDEX IF NOT EXISTS runs_policy ON runs (co2_policy, objective);
+CREATE INDEX IF NOT EXISTS runs_solve_time ON runs (solve_time);
+CREATE INDEX IF NOT EXISTS runs_obj_val ON runs (obj_val);
+CREATE INDEX IF NOT EXISTS capacities_tech ON capacities (tech, capacity);
+"""
+
+RUN_COLUMNS = ['label', 'fingerprint', 'data_dir', 'co2_policy', 'objective', 'co2_tax', 'discount_rate',
+               'exclude_techs', 'solver_params', 'build_time', 'solve_time', 'wall_time',
+               'num_vars', 'num_int_vars', 'num_constrs', 'num_qconstrs', 'num_nz',
+               'status', 'sol_count', 'obj_val', 'obj_bound', 'mip_gap', 'node_count', 'iter_count', 'work',
+               'investment', 'fixed_om', 'operations', 'annual_emissions']
+
+def objective_components(nexus_model):
+    """Investment, fixed O&M and remaining operations cost ($/year) of the current solution"""
+    capacities = {tech: nexus_model.v_cap[tech].X for tech in nexus_model.all_techs}
+    investment = sum(nexus_model.calculate_crf(tech) * TECHNOLOGY_CAPEX[tech] * cap
+                     for tech, cap in capacities.items())
+    fixed_om = sum(FIXED_OPEX_PERCENTAGE * TECHNOLOGY_CAPEX[tech] * cap * nexus_model.days_per_season
+                   for tech, cap in capacities.items())
+    components = {'investment': investment, 'fixed_om': fixed_om, 'operations': None}
+    if nexus_model.objective_type != 'minimize_emissions':
+        # Energy, CO2 and penalties net of revenues
+        components['operations'] = nexus_model.model.ObjVal - investment - fixed_om
+    return components
+
+class RunRegistry:
+    def __init__(self, db_path=None):
+        db_path = RUN_REGISTRY['db_path'] if db_path is None else db_path
+        self.db_path = db_path if os.path.isabs(db_path) else os.path.join(PACKAGE_DIR, db_path)
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        with self.connect() as db:
+            db.executescript(SCHEMA)
+    
+    def columns(self):
+        """Column names of the runs table"""
+        with self.connect() as db:
+            return [row[1] for row in db.execute("PRAGMA table_info(runs)")]
+    
+    def connect(self):
+        # WAL lets parallel workers record while others query
+        db = sqlite3.connect(self.db_path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA foreign_keys=ON")
+        return db
+    
+    def record(self, nexus_model, label=None, build_time=None, solve_time=None, wall_time=None):
+        """Add a solved (or failed) WFENexusModel run; returns its run_id"""
+        model = nexus_model.model
+        solved = model.SolCount > 0
+        row = {
+            'label': label,
+            'fingerprint': model_fingerprint(nexus_model),
+            'data_dir': os.path.abspath(nexus_model.data_dir),
+            'co2_policy': nexus_model.co2_policy,
+            'objective': nexus_model.objective_type,
+            'co2_tax': nexus_model.co2_tax,
+            'discount_rate': nexus_model.discount_rate,
+            'exclude_techs': ','.join(nexus_model.exclude_techs),
+            'solver_params': json.dumps(nexus_model.solver_params, sort_keys=True),
+            'build_time': build_time,
+            'solve_time': model.Runtime if solve_time is None else solve_time,
+            'wall_time': wall_time,
+            'num_vars': model.NumVars,
+            'num_int_vars': model.NumIntVars,
+            'num_constrs': model.NumConstrs,
+            'num_qconstrs': model.NumQConstrs,
+            'num_nz': model.NumNZs,
+            'status': model.status,
+            'sol_count': model.SolCount,
+            'obj_val': model.ObjVal if solved else None,
+            'obj_bound': model.ObjBound if model.IsMIP and solved else None,
+            'mip_gap': model.MIPGap if model.IsMIP and solved else None,
+            'node_count': model.NodeCount if model.IsMIP else None,
+            'iter_count': model.IterCount,
+            'work': model.Work
+        }
+        if solved:
+            row.update(objective_components(nexus_model))
+            row['annual_emissions'] = nexus_model.calculate_annual_emissions()
+        
+        with self.connect() as db:
+            columns = ['recorded_at'] + RUN_COLUMNS
+            values = [datetime.now().isoformat(timespec='seconds')] + [row.get(column) for column in RUN_COLUMNS]
+            cursor = db.execute(f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                                values)
+            run_id = cursor.lastrowid
+            if solved:
+                db.executemany("INSERT INTO capacities (run_id, tech, capacity, built) VALUES (?, ?, ?, ?)",
+                               [(run_id, tech, nexus_model.v_cap[tech].X, int(nexus_model.v_build[tech].X > 0.5))
+                                for tech in nexus_model.all_techs])
+        return run_id
+    
+    def runs(self, where=None, params=(), min_capacity=None, max_capacity=None, order_by='run_id',
+             descending=False, limit=None, capacities=True):
+        """Runs as a DataFrame with one cap_<tech> column per technology
+        
+        where is an SQL condition on the runs table (with ? placeholders filled from
+        params); min_capacity/max_capacity filter on capacities, e.g.
+        runs(min_capacity={'electrolyzer': 10}, order_by='solve_time')
+        """
+        # Column names cannot be bound as parameters: only known columns reach the query
+        if order_by not in self.columns():
+            raise ValueError(f"Cannot order by {order_by!r}: not a column of the runs table")
+        
+        conditions = [f"({where})"] if where else []
+        values = list(params)
+        for bounds, op in [(min_capacity, '>'), (max_capacity, '<=')]:
+            for tech, value in (bounds or {}).items():
+                conditions.append(f"run_id IN (SELECT run_id FROM capacities WHERE tech = ? AND capacity {op} ?)")
+                values += [tech, value]
+        
+        query = "SELECT * FROM runs"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += f" ORDER BY {order_by}{' DESC' if descending else ''}"
+        if limit is not None:
+            query += f" LIMIT {int(limit)}"
+        
+        with self.connect() as db:
+            df = pd.read_sql_query(query, db, params=values)
+        if capacities and len(df) > 0:
+            wide = self.capacities(df['run_id'].tolist())
+            df = df.merge(wide.add_prefix('cap_'), left_on='run_id', right_index=True, how='left')
+        return df
+    
+    def capacities(self, run_ids=None):
+        """Capacity vectors as a run_id x technology DataFrame"""
+        query = "SELECT run_id, tech, capacity FROM capacities"
+        values = []
+        if run_ids is not None:
+            query += f" WHERE run_id IN ({', '.join('?' * len(run_ids))})"
+            values = list(run_ids)
+        with self.connect() as db:
+            long = pd.read_sql_query(query, db, params=values)
+        return long.pivot(index='run_id', columns='tech', values='capacity')
+    
+    def sql(self, query, params=()):
+        """Arbitrary read query against the registry as a DataFrame"""
+        with self.connect() as db:
+            return pd.read_sql_query(query, db, params=list(params))
+    
+    def delete(self, run_ids):
+        with self.connect() as db:
+            db.executemany("DELETE FROM runs WHERE run_id = ?", [(run_id,) for run_id in run_ids])
+    
+    def __len__(self):
+        with self.connect() as db:
+            return db.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+def print_runs(df, columns=('run_id', 'co2_policy', 'objective', 'status', 'obj_val', 'mip_gap', 'solve_time')):
+    """Compact table of registry runs"""
+    print("-"*60)
+    print(f"{len(df)} runs")
+    print("-"*60)
+    if len(df) > 0:
+        print(df[[column for column in columns if column in df.columns]].to_string(index=False))
+
+if __name__ == "__main__":
+    registry = RunRegistry()
+    electrolyzer_runs = registry.runs(min_capacity={'electrolyzer': 10}, order_by='solve_time')
+    print_runs(electrolyzer_runs, columns=('run_id', 'co2_policy', 'objective', 'cap_electrolyzer', 'solve_time'))
+    
+    print("\nMean objective by CO2 policy:")
+    print(registry.sql("SELECT co2_policy, objective, COUNT(*) AS runs, AVG(obj_val) AS mean_obj, "
+                       "AVG(solve_time) AS mean_solve_time FROM runs WHERE status = 2 "
+                       "GROUP BY co2_policy, objective"))
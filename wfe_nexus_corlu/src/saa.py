@@ -0,0 +1,225 @@
+"""
+Sample Average Approximation (SAA) for the WFE Nexus Model
+Solves M independent N-sample SAA problems in parallel, selects the best
+candidate design on an independent selection sample, estimates its cost on a
+fresh evaluation sample and reports confidence intervals on the lower and
+upper bounds
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.data_generator import DataGenerator
+from src.stochastic_metrics import ScenarioSetModel, ScenarioModel
+from src.env_pool import get_env
+
+try:
+    from scipy import stats
+except ImportError:
+    stats = None
+
+SELECTION_SEED_OFFSET = 10000
+EVALUATION_SEED_OFFSET = 20000
+
+# Two-sided Student t quantiles for degrees of freedom 1-30, 40, 60 and 120 (used without scipy)
+T_TABLE_DOF = list(range(1, 31)) + [40, 60, 120]
+T_TABLE = {
+    0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812, 1.796, 1.782, 1.771, 1.761,
+           1.753, 1.746, 1.740, 1.734, 1.729, 1.725, 1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701,
+           1.699, 1.697, 1.684, 1.671, 1.658],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228, 2.201, 2.179, 2.160, 2.145,
+           2.131, 2.120, 2.110, 2.101, 2.093, 2.086, 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048,
+           2.045, 2.042, 2.021, 2.000, 1.980],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169, 3.106, 3.055, 3.012, 2.977,
+           2.947, 2.921, 2.898, 2.878, 2.861, 2.845, 2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763,
+           2.756, 2.750, 2.704, 2.660, 2.617]
+}
+
+def t_quantile(confidence, dof):
+    """Two-sided Student t quantile (from T_TABLE without scipy)"""
+    if stats is not None:
+        return stats.t.ppf(0.5 + confidence / 2, dof)
+    level = round(confidence, 4)
+    if level not in T_TABLE:
+        raise ValueError(f"No t table for confidence {confidence} (tabulated: {sorted(T_TABLE)}); install scipy")
+    if dof > T_TABLE_DOF[-1]:
+        return NormalDist().inv_cdf(0.5 + confidence / 2)
+    # Largest tabulated dof not above dof: a slightly wider, conservative interval
+    index = max(i for i, tabulated in enumerate(T_TABLE_DOF) if tabulated <= dof)
+    return T_TABLE[level][index]
+
+def confidence_interval(values, confidence):
+    """Mean and half-width of the confidence interval of the mean"""
+    values = np.asarray(values, dtype=float)
+    mean = values.mean()
+    if len(values) < 2:
+        return mean, float('inf')
+    half_width = t_quantile(confidence, len(values) - 1) * values.std(ddof=1) / np.sqrt(len(values))
+    return mean, half_width
+
+# Per-process state
+_worker_args = None
+_worker_model = None
+
+def init_saa_worker(data_dir, co2_policy, objective, threads):
+    """Store the run settings of the worker (pool initializer for evaluate_candidates)"""
+    global _worker_args
+    _worker_args = {'data_dir': data_dir, 'co2_policy': co2_policy, 'objective': objective,
+                    'env': get_env(Threads=threads)}
+
+def _solve_replication(replication, n_samples, seed):
+    """Solve one N-sample SAA problem"""
+    start_time = time.time()
+    samples = DataGenerator().sample_scenarios(n_samples, seed)
+    model = ScenarioSetModel(samples, **_worker_args)
+    if not model.resolve():
+        raise RuntimeError(f"SAA replication {replication} failed with status {model.model.status}")
+    
+    result = {
+        'replication': replication,
+        'seed': seed,
+        'objective': model.model.ObjVal,
+        # Best bound, not the incumbent: with a MIP gap the incumbent overstates the SAA optimum
+        'bound': model.model.ObjBound if model.model.IsMIP else model.model.ObjVal,
+        'capacities': {tech: model.v_cap[tech].X for tech in model.all_techs},
+        'solve_time': time.time() - start_time
+    }
+    model.dispose()
+    return result
+
+def evaluate_chunk(candidates, seed, start, n_samples):
+    """Objective of every candidate design on samples start..start+n_samples-1"""
+    global _worker_model
+    samples = DataGenerator().sample_scenarios(n_samples, seed, start)
+    
+    # One resident single-scenario structure per worker
+    if _worker_model is None:
+        _worker_model = ScenarioModel(*next(iter(samples.values())), **_worker_args)
+    model = _worker_model
+    
+    values = np.zeros((len(candidates), n_samples))
+    for j, sample in enumerate(samples.values()):
+        model.set_scenario(*sample)
+        for i, capacities in enumerate(candidates):
+            model.fix_first_stage(capacities)
+            if not model.resolve():
+                raise RuntimeError(f"Evaluation of candidate {i} on sample {start + j} failed "
+                                   f"with status {model.model.status}")
+            values[i, j] = model.model.ObjVal
+    
+    return start, values
+
+def evaluation_chunks(n_samples, max_workers):
+    """Split a sample into one contiguous range per task"""
+    n_chunks = min(n_samples, max_workers * 4)
+    bounds = np.linspace(0, n_samples, n_chunks + 1).astype(int)
+    return [(start, end - start) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def evaluate_candidates(executor, candidates, seed, n_samples, max_workers):
+    """(candidate, sample) objective matrix of candidate designs on one sample
+    
+    executor must be a process pool initialized with init_saa_worker.
+    """
+    futures = [executor.submit(evaluate_chunk, candidates, seed, start, n)
+               for start, n in evaluation_chunks(n_samples, max_workers)]
+    chunks = sorted(future.result() for future in futures)
+    return np.hstack([chunk for _, chunk in chunks])
+
+class SAASolver:
+    def __init__(self, data_dir='data', co2_policy='medium_tax', objective='minimize_cost',
+                 replications=None, samples=None, selection_samples=None, evaluation_samples=None,
+                 confidence=None, seed=None, max_workers=None, total_threads=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.replications = SAA['replications'] if replications is None else replications
+        self.samples = SAA['samples'] if samples is None else samples
+        self.selection_samples = SAA['selection_samples'] if selection_samples is None else selection_samples
+        self.evaluation_samples = SAA['evaluation_samples'] if evaluation_samples is None else evaluation_samples
+        self.confidence = SAA['confidence'] if confidence is None else confidence
+        self.seed = SAA['seed'] if seed is None else seed
+        self.max_workers = SAA['max_workers'] if max_workers is None else max_workers
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_worker = max(1, self.total_threads // self.max_workers)
+    
+    def run(self):
+        """Solve the SAA replications, evaluate the candidates and report bounds"""
+        start_time = time.time()
+        args = (self.data_dir, self.co2_policy, self.objective, self.threads_per_worker)
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=init_saa_worker,
+                                 initargs=args) as executor:
+            # Independent N-sample problems
+            futures = [executor.submit(_solve_replication, m, self.samples, self.seed + m)
+                       for m in range(self.replications)]
+            replications = [future.result() for future in futures]
+            solve_time = time.time() - start_time
+            
+            # Every candidate on the same selection sample (common random numbers)
+            candidates = [rep['capacities'] for rep in replications]
+            selection = evaluate_candidates(executor, candidates, self.seed + SELECTION_SEED_OFFSET,
+                                            self.selection_samples, self.max_workers)
+            best = int(np.argmin(selection.mean(axis=1)))
+            
+            # The minimum over the selection sample is optimistic: the upper bound
+            # comes from a fresh sample that played no part in choosing the design
+            values = evaluate_candidates(executor, [candidates[best]], self.seed + EVALUATION_SEED_OFFSET,
+                                         self.evaluation_samples, self.max_workers)[0]
+        
+        wall_time = time.time() - start_time
+        return self.report(replications, selection, best, values, solve_time, wall_time)
+    
+    def report(self, replications, selection, best, values, solve_time, wall_time):
+        """Compute and print the bound estimates"""
+        lower, lower_hw = confidence_interval([rep['bound'] for rep in replications], self.confidence)
+        estimates = selection.mean(axis=1)
+        best_upper, best_upper_hw = confidence_interval(values, self.confidence)
+        
+        results = {
+            'lower_bound': lower,
+            'lower_bound_ci': (lower - lower_hw, lower + lower_hw),
+            'upper_bound': best_upper,
+            'upper_bound_ci': (best_upper - best_upper_hw, best_upper + best_upper_hw),
+            'gap': best_upper - lower,
+            'gap_ci_upper': (best_upper + best_upper_hw) - (lower - lower_hw),
+            'best_replication': best,
+            'best_capacities': replications[best]['capacities'],
+            'replications': replications,
+            'candidate_estimates': list(estimates),
+            'solve_time': solve_time,
+            'wall_time': wall_time
+        }
+        
+        level = f"{self.confidence*100:.0f}%"
+        print("\n" + "-"*60)
+        print("SAMPLE AVERAGE APPROXIMATION")
+        print("-"*60)
+        print(f"Replications: {self.replications} x {self.samples} samples, selection on "
+              f"{selection.shape[1]} samples, evaluation of the best design on {len(values)} samples")
+        print(f"{'Rep':<5} {'Seed':>6} {'SAA objective':>18} {'SAA bound':>18} {'Selection':>18} {'Time (s)':>9}")
+        for rep, mean in zip(replications, estimates):
+            marker = ' *' if rep['replication'] == best else ''
+            print(f"{rep['replication']:<5} {rep['seed']:>6} {rep['objective']:>18,.0f} {rep['bound']:>18,.0f} "
+                  f"{mean:>18,.0f} {rep['solve_time']:>9.2f}{marker}")
+        print("-"*60)
+        print(f"Lower bound:  ${lower:>18,.0f}  ({level} CI ${results['lower_bound_ci'][0]:,.0f} "
+              f"to ${results['lower_bound_ci'][1]:,.0f})")
+        print(f"Upper bound:  ${best_upper:>18,.0f}  ({level} CI ${results['upper_bound_ci'][0]:,.0f} "
+              f"to ${results['upper_bound_ci'][1]:,.0f})")
+        print(f"Optimality gap estimate: ${results['gap']:,.0f} "
+              f"(at most ${results['gap_ci_upper']:,.0f} at the CI limits)")
+        print(f"\nBest design (replication {best}):")
+        for tech, cap in results['best_capacities'].items():
+            if cap > 0.01:
+                print(f"  {tech:<20} {cap:>10.2f}")
+        print(f"\nSAA solves: {solve_time:.2f} s, total wall time: {wall_time:.2f} s")
+        
+        return results
+
+if __name__ == "__main__":
+    SAASolver(data_dir='../data').run()
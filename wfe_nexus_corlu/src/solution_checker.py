@@ -0,0 +1,339 @@
+"""
+Independent Solution Checker for the WFE Nexus Model
+Recomputes every balance, storage recursion, capacity limit, emission and
+objective component of a solved WFENexusModel with NumPy from the solution
+arrays and the input data, and reports residuals per hour and scenario,
+slack use and variables held by the unbounded-fallback bounds
+"""
+
+import gurobipy as gp
+import pandas as pd
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+
+FALLBACK_FAMILIES = ['gen', 'prod', 'cons', 'grid_buy', 'grid_sell']  # bounded by add_fallback_bounds
+
+class SolutionChecker:
+    """Vectorized recomputation of a WFENexusModel solution; build once, check after every solve"""
+    def __init__(self, nexus_model, tolerance=None):
+        self.nexus_model = nexus_model
+        self.tolerance = SOLUTION_CHECK['tolerance'] if tolerance is None else tolerance
+        self.scenarios = list(nexus_model.scenarios)
+        self.periods = list(nexus_model.time_periods)
+        self.shape = (len(self.scenarios), len(self.periods))
+        # Models with their own objective (e.g. the day-ahead scheduler) skip the cost check
+        self.check_objective = type(nexus_model).set_objective.__qualname__ == 'WFENexusModel.set_objective'
+        
+        # All variables in one list so the solution is read with a single getAttr call
+        self.vars = []
+        self.layout = {}
+        self.constants = {}
+        m = nexus_model
+        for tech in m.all_techs:
+            self.add(('cap', tech), [m.v_cap[tech]], ())
+            self.add(('build', tech), [m.v_build[tech]], ())
+        for tech in m.tech_generation:
+            self.add_hourly(('gen', tech), m.v_gen, (tech,))
+            if tech in DISPATCHABLE:
+                self.add_hourly(('on', tech), m.v_is_on, (tech,))
+                self.add_hourly(('startup', tech), m.v_startup, (tech,), skip_first=True)
+                self.add_hourly(('shutdown', tech), m.v_shutdown, (tech,), skip_first=True)
+        for storage in m.tech_storage:
+            self.add_hourly(('charge', storage), m.v_charge, (storage,))
+            self.add_hourly(('discharge', storage), m.v_discharge, (storage,))
+            self.add_hourly(('soc', storage), m.v_soc, (storage,))
+        for tech in m.tech_conversion:
+            self.add_hourly(('prod', tech), m.v_production, (tech,))
+            self.add_hourly(('cons', tech), m.v_consumption, (tech,))
+        for tech in m.tech_recovery:
+            self.add_hourly(('prod', tech), m.v_production, (tech,))
+        for carrier in ['electricity', 'gas']:
+            self.add_hourly(('grid_buy', carrier), m.v_grid_buy, (carrier,))
+            self.add_hourly(('grid_sell', carrier), m.v_grid_sell, (carrier,))
+        self.add_hourly(('emissions',), m.v_emissions, ())
+        for name, source in [('chp_gas', m.v_chp_gas), ('heat_slack', m.v_heat_slack),
+                             ('h2_slack', m.v_h2_slack), ('n_slack', m.v_n_slack)]:
+            if source:
+                self.add_hourly((name,), source, ())
+        
+        self.residuals = {}
+        self.objective = {}
+    
+    def add(self, name, variables, shape):
+        if not isinstance(variables[0], gp.Var):
+            self.constants[name] = np.array(variables, dtype=float).reshape(shape)
+            return
+        self.layout[name] = (len(self.vars), shape)
+        self.vars.extend(variables)
+    
+    def add_hourly(self, name, source, prefix, skip_first=False):
+        periods = self.periods[1:] if skip_first else self.periods
+        keys = [prefix + (t, scenario) for scenario in self.scenarios for t in periods]
+        if keys:
+            self.add(name, [source[key] for key in keys], (len(self.scenarios), len(periods)))
+    
+    def value(self, *name):
+        """Solution array of a variable family (zeros for technologies not in the model)"""
+        if name in self.constants:
+            return self.constants[name]
+        if name not in self.layout:
+            return 0.0 if name[0] in ('cap', 'build') else np.zeros(self.shape)
+        start, shape = self.layout[name]
+        return self.x[start:start + int(np.prod(shape))].reshape(shape)
+    
+    def data(self, frames, column):
+        """Input time series as a scenario x hour array"""
+        return np.stack([frames[scenario].loc[self.periods, column].to_numpy(dtype=float)
+                         for scenario in self.scenarios])
+    
+    def equal(self, name, residual):
+        self.residuals[name] = ('==', np.abs(residual))
+    
+    def at_most(self, name, excess):
+        """Constraint lhs <= rhs given as lhs - rhs"""
+        self.residuals[name] = ('<=', np.maximum(excess, 0.0))
+    
+    def check(self):
+        """Recompute all checks for the current solution; returns the summary DataFrame"""
+        start_time = time.time()
+        m = self.nexus_model
+        model = m.model
+        self.x = np.array(model.getAttr('X', self.vars))
+        self.residuals = {}
+        has = lambda tech: tech in m.all_techs
+        v = self.value
+        
+        demand = {column: self.data(m.demand_data, column) for column in
+                  ['electricity_demand', 'heat_demand', 'hydrogen_demand', 'water_demand', 'fertilizer_n_demand']}
+        
+        # Balances
+        wwtp_load = m.wwtp_data['energy_consumption'] * m.wwtp_data['influent_flow'] / 24 / 1000
+        supply = sum(v('gen', tech) for tech in m.tech_generation) + v('discharge', 'battery') + v('grid_buy', 'electricity')
+        use = (demand['electricity_demand'] + v('charge', 'battery') + v('cons', 'electrolyzer')
+               + v('grid_sell', 'electricity') + wwtp_load)
+        self.equal('electricity_balance', supply - use)
+        
+        if has('chp'):
+            heat = v('gen', 'chp') * TECHNOLOGY_EFFICIENCIES['chp_thermal'] / TECHNOLOGY_EFFICIENCIES['chp_electric']
+            self.at_most('heat_balance', demand['heat_demand'] - heat - v('heat_slack'))
+        
+        if has('electrolyzer'):
+            fuel_cell_h2 = v('gen', 'fuel_cell') / (ENERGY_CONVERSIONS['h2_lhv'] * TECHNOLOGY_EFFICIENCIES['fuel_cell']) * 1000
+            h2_use = demand['hydrogen_demand'] + v('charge', 'h2_storage') + v('cons', 'haber_bosch') + fuel_cell_h2
+            h2_supply = v('prod', 'electrolyzer') + v('discharge', 'h2_storage') + v('h2_slack')
+            self.at_most('h2_balance', h2_use - h2_supply)
+        
+        if has('water_reclamation'):
+            self.at_most('water_balance', v('prod', 'water_reclamation') - demand['water_demand'])
+        self.at_most('n_balance', demand['fertilizer_n_demand'] - v('prod', 'n_recovery')
+                     - 0.82 * v('prod', 'haber_bosch') - v('n_slack'))
+        
+        # Storage state-of-charge recursion and limits
+        for storage in m.tech_storage:
+            params = STORAGE_PARAMS[storage]
+            cap = v('cap', storage)
+            charge, discharge, soc = v('charge', storage), v('discharge', storage), v('soc', storage)
+            if storage == 'battery':
+                charge_eff = TECHNOLOGY_EFFICIENCIES.get('battery_charge', STORAGE_EFFICIENCY)
+                discharge_eff = TECHNOLOGY_EFFICIENCIES.get('battery_discharge', STORAGE_EFFICIENCY)
+                min_soc, max_soc = params.get('min_soc', 0.1), params.get('max_soc', 0.9)
+            else:
+                charge_eff, discharge_eff = STORAGE_EFFICIENCY, STORAGE_EFFICIENCY
+                min_soc, max_soc = params.get('min_level', 0.05), params.get('max_level', 0.95)
+            
+            previous = np.empty_like(soc)
+            previous[:, 0] = 0.5 * cap
+            previous[:, 1:] = soc[:, :-1] * (1 - params['self_discharge'])
+            self.equal(f'soc_recursion_{storage}', soc - previous - charge * charge_eff + discharge / discharge_eff)
+            self.at_most(f'charge_limit_{storage}', charge - params['max_charge_rate'] * cap)
+            self.at_most(f'discharge_limit_{storage}', discharge - params['max_discharge_rate'] * cap)
+            self.at_most(f'soc_min_{storage}', min_soc * cap - soc)
+            self.at_most(f'soc_max_{storage}', soc - max_soc * cap)
+        
+        # Generation and conversion limits
+        for tech in ['pv', 'wind']:
+            if has(tech):
+                availability = self.data(m.renewable_data, f'{tech}_availability')
+                self.equal(f'{tech}_generation', v('gen', tech) - v('cap', tech) * availability)
+        for tech in [tech for tech in DISPATCHABLE if has(tech)]:
+            gen, on, cap = v('gen', tech), v('on', tech), v('cap', tech)
+            self.at_most(f'gen_max_{tech}', gen - cap * on)
+            self.at_most(f'gen_min_{tech}', MIN_LOAD * cap * on - gen)
+            ramp = np.diff(gen, axis=1)
+            self.at_most(f'ramp_up_{tech}', ramp - RAMP_RATES[tech]['up'] * cap)
+            self.at_most(f'ramp_down_{tech}', -ramp - RAMP_RATES[tech]['down'] * cap)
+            self.at_most(f'startup_{tech}', np.diff(on, axis=1) - v('startup', tech))
+            self.at_most(f'shutdown_{tech}', -np.diff(on, axis=1) - v('shutdown', tech))
+        if has('electrolyzer'):
+            self.equal('electrolyzer_h2', v('prod', 'electrolyzer')
+                       - v('cons', 'electrolyzer') / ENERGY_CONVERSIONS['electricity_to_h2'])
+            self.at_most('electrolyzer_cap', v('cons', 'electrolyzer') - v('cap', 'electrolyzer'))
+        if has('haber_bosch'):
+            self.equal('hb_stoichiometry', v('prod', 'haber_bosch') * ENERGY_CONVERSIONS['h2_to_nh3']
+                       - v('cons', 'haber_bosch'))
+            self.at_most('hb_cap', v('prod', 'haber_bosch') - v('cap', 'haber_bosch') / 24)
+        if has('anaerobic_digester'):
+            self.equal('biogas_production', v('prod', 'anaerobic_digester') - m.wwtp_data['potential_biogas'] / 24)
+        if has('chp'):
+            ch4_energy = ENERGY_CONVERSIONS['ch4_lhv'] / 1000
+            self.equal('chp_gas_conversion', v('gen', 'chp')
+                       - v('chp_gas') * ch4_energy * TECHNOLOGY_EFFICIENCIES['chp_electric'])
+            biogas = v('prod', 'anaerobic_digester') * WWTP_PARAMS['ch4_content']
+            self.at_most('chp_natural_gas', v('chp_gas') - biogas - v('grid_buy', 'gas'))
+        
+        # First stage: capacity only when built, minimum size when built
+        caps = np.array([v('cap', tech) for tech in m.all_techs])
+        builds = np.array([v('build', tech) for tech in m.all_techs])
+        max_caps = np.array([CAPACITY_LIMITS.get(tech, {}).get('max', 1000) for tech in m.all_techs])
+        min_caps = np.array([CAPACITY_LIMITS.get(tech, {}).get('min', 0) for tech in m.all_techs])
+        self.at_most('cap_build_link', caps - builds * max_caps)
+        self.at_most('min_capacity', np.where(min_caps > 0, min_caps * builds - caps, 0.0))
+        
+        # Emissions
+        grid_emissions = (v('grid_buy', 'electricity') * EMISSION_FACTORS['grid_electricity']
+                          + v('grid_buy', 'gas') * EMISSION_FACTORS['natural_gas'] / 1000)
+        self.equal('emissions', v('emissions') - grid_emissions)
+        
+        # Variable bounds, and variables held at a bound by add_fallback_bounds
+        lower = np.array(model.getAttr('LB', self.vars))
+        upper = np.array(model.getAttr('UB', self.vars))
+        self.residuals['variable_bounds'] = ('bounds', np.maximum(np.maximum(lower - self.x, self.x - upper), 0.0))
+        self.fallback_binding = {}
+        if getattr(m, 'fallback_bounds_applied', False):
+            for name, (start, shape) in self.layout.items():
+                if name[0] in FALLBACK_FAMILIES:
+                    end = start + int(np.prod(shape))
+                    binding = (upper[start:end] < GRB_INFINITY) & (self.x[start:end] >= upper[start:end] - self.tolerance)
+                    if binding.any():
+                        self.fallback_binding['_'.join(name)] = int(binding.sum())
+        
+        self.objective = self.objective_components()
+        self.elapsed = time.time() - start_time
+        return self.summary()
+    
+    def objective_components(self):
+        """Objective terms ($/year or t/year) recomputed as in set_objective"""
+        m = self.nexus_model
+        v = self.value
+        prob = np.array([m.probabilities[scenario] for scenario in self.scenarios])[:, None]
+        days = m.days_per_season
+        expected = lambda hourly: float(np.sum(prob * hourly)) * days
+        
+        price = {column: self.data(m.price_data, column) for column in
+                 ['electricity_buy_price', 'natural_gas_price', 'electricity_sell_price']}
+        caps = {tech: float(v('cap', tech)) for tech in m.all_techs}
+        
+        components = {
+            'investment': sum(m.calculate_crf(tech) * TECHNOLOGY_CAPEX[tech] * cap for tech, cap in caps.items()),
+            'fixed_om': sum(FIXED_OPEX_PERCENTAGE * TECHNOLOGY_CAPEX[tech] * cap for tech, cap in caps.items()) * days,
+            'variable_om': expected(sum(VARIABLE_OPEX[tech] * v('gen', tech) / 1000
+                                        for tech in m.tech_generation if tech in VARIABLE_OPEX)),
+            'energy_purchases': expected(price['electricity_buy_price'] * v('grid_buy', 'electricity') / 1000
+                                         + price['natural_gas_price'] * v('grid_buy', 'gas') / 1000),
+            'co2_cost': expected(m.co2_tax * v('emissions')),
+            'revenues': expected(price['electricity_sell_price'] * v('grid_sell', 'electricity') / 1000
+                                 + PRODUCT_PRICES['reclaimed_water'] * v('prod', 'water_reclamation')
+                                 + PRODUCT_PRICES['fertilizer_n'] * v('prod', 'n_recovery') / 1000
+                                 + PRODUCT_PRICES['ammonia'] * v('prod', 'haber_bosch') / 1000),
+            'penalties': expected(PENALTY_RATE * (v('heat_slack') + v('h2_slack') + v('n_slack'))),
+            'emissions': expected(v('emissions'))
+        }
+        if m.objective_type == 'minimize_emissions':
+            total = components['emissions'] + components['penalties']
+        else:
+            total = (components['investment'] + components['fixed_om'] + components['variable_om']
+                     + components['energy_purchases'] + components['co2_cost'] - components['revenues']
+                     + components['penalties'])
+        components['total'] = total
+        components['reported'] = m.model.ObjVal
+        components['relative_error'] = abs(total - m.model.ObjVal) / max(abs(m.model.ObjVal), 1.0)
+        return components
+    
+    def residual_frame(self, name):
+        """Residuals of one check as a scenario x hour DataFrame"""
+        kind, residual = self.residuals[name]
+        if residual.ndim != 2:
+            raise ValueError(f"{name} is not an hourly check")
+        periods = self.periods[-residual.shape[1]:]  # differences start at the second hour
+        return pd.DataFrame(residual, index=self.scenarios, columns=periods)
+    
+    def slack_use(self):
+        """Slack absorbed per scenario (units per representative period)"""
+        rows = {}
+        for name in ['heat_slack', 'h2_slack', 'n_slack']:
+            if (name,) in self.layout:
+                rows[name] = self.value(name).sum(axis=1)
+        return pd.DataFrame(rows, index=self.scenarios)
+    
+    def summary(self):
+        """One row per check: largest residual, where it occurs and how many entries exceed the tolerance"""
+        rows = []
+        for name, (kind, residual) in self.residuals.items():
+            worst = np.unravel_index(np.argmax(residual), residual.shape) if residual.size else ()
+            row = {'check': name, 'kind': kind, 'max_residual': float(residual.max()) if residual.size else 0.0,
+                   'violations': int((residual > self.tolerance).sum()), 'scenario': None, 'hour': None}
+            if residual.ndim == 2 and residual.size:
+                row['scenario'] = self.scenarios[worst[0]]
+                row['hour'] = self.periods[-residual.shape[1]:][worst[1]]
+            rows.append(row)
+        return pd.DataFrame(rows)
+    
+    def passed(self):
+        """True if no residual exceeds the tolerance and the objective matches"""
+        violations = sum(int((residual > self.tolerance).sum()) for kind, residual in self.residuals.values())
+        objective_ok = (not self.check_objective
+                        or self.objective['relative_error'] <= SOLUTION_CHECK['objective_tolerance'])
+        return violations == 0 and objective_ok
+    
+    def print_report(self, summary=None):
+        summary = self.summary() if summary is None else summary
+        print("-"*60)
+        print(f"SOLUTION CHECK ({'passed' if self.passed() else 'FAILED'}, {self.elapsed*1000:.1f} ms, "
+              f"{len(self.vars):,} variables)")
+        print("-"*60)
+        failed = summary[summary['violations'] > 0]
+        if len(failed) == 0:
+            print(f"All {len(summary)} checks within {self.tolerance:g} "
+                  f"(largest residual {summary['max_residual'].max():.2e})")
+        for _, row in failed.iterrows():
+            where = f" (worst at {row['scenario']}, {row['hour']})" if row['scenario'] is not None else ""
+            print(f"{row['check']:<28} {row['violations']:>6} violations, max {row['max_residual']:.3e}{where}")
+        
+        if self.check_objective:
+            objective = self.objective
+            print(f"\nObjective recomputed: {objective['total']:,.2f} vs reported {objective['reported']:,.2f} "
+                  f"(relative error {objective['relative_error']:.1e})")
+            for key in ['investment', 'fixed_om', 'variable_om', 'energy_purchases', 'co2_cost', 'revenues',
+                        'penalties']:
+                print(f"  {key:<18} {objective[key]:>18,.2f}")
+        
+        slack = self.slack_use()
+        if len(slack.columns) and (slack.to_numpy() > self.tolerance).any():
+            print("\nSlack absorbing unmet demand:")
+            print(slack.to_string())
+        if self.fallback_binding:
+            print("\nVariables held at fallback bounds (add_fallback_bounds):")
+            for name, count in self.fallback_binding.items():
+                print(f"  {name:<28} {count:>6}")
+
+GRB_INFINITY = gp.GRB.INFINITY
+
+def check_solution(nexus_model, verbose=True):
+    """Check a solved WFENexusModel; returns the checker with residuals and objective components"""
+    checker = SolutionChecker(nexus_model)
+    summary = checker.check()
+    if verbose or not checker.passed():
+        checker.print_report(summary)
+    return checker
+
+if __name__ == "__main__":
+    from src.wfe_nexus_model import WFENexusModel
+    
+    model = WFENexusModel(data_dir='../data', co2_policy='medium_tax')
+    model.optimize()
+    checker = check_solution(model)
+    checker.residual_frame('electricity_balance').to_csv('../results/electricity_balance_residuals.csv')
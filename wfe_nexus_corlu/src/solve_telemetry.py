@@ -0,0 +1,141 @@
+"""
+Solve Telemetry for the WFE Nexus Model
+Records incumbent, best bound, gap, node count and work units of MIP solves
+through a Gurobi callback, stores each timeline as a compressed NumPy
+archive and overlays timelines of different configurations
+"""
+
+from gurobipy import GRB
+import numpy as np
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+
+TELEMETRY_COLUMNS = ['time', 'work', 'incumbent', 'bound', 'gap', 'nodes', 'event']
+SAMPLE, INCUMBENT, FINAL = 0, 1, 2  # event codes
+# Work units are reported from Gurobi 11 on; older versions record NaN
+CALLBACK_WORK = getattr(GRB.Callback, 'WORK', None)
+
+def relative_gap(incumbent, bound):
+    """MIP gap as Gurobi reports it (inf without incumbent)"""
+    if not np.isfinite(incumbent):
+        return np.inf
+    if incumbent == 0:
+        return 0.0 if bound == 0 else np.inf
+    return abs(incumbent - bound) / abs(incumbent)
+
+class SolveTelemetry:
+    """Gurobi callback sampling the solve at a fixed cadence and at every new incumbent"""
+    def __init__(self, cadence=None, label=None):
+        self.cadence = TELEMETRY['cadence'] if cadence is None else cadence
+        self.label = label
+        self.rows = np.empty((256, len(TELEMETRY_COLUMNS)))
+        self.count = 0
+        self.next_sample = 0.0
+        self.last_time = 0.0
+    
+    def record(self, time, work, incumbent, bound, nodes, event):
+        # Grow by doubling so appends stay amortized O(1)
+        if self.count == len(self.rows):
+            self.rows = np.vstack([self.rows, np.empty_like(self.rows)])
+        incumbent = incumbent if abs(incumbent) < GRB.INFINITY else np.nan
+        self.rows[self.count] = (time, work, incumbent, bound,
+                                 relative_gap(incumbent, bound), nodes, event)
+        self.count += 1
+    
+    def work(self, model):
+        return model.cbGet(CALLBACK_WORK) if CALLBACK_WORK is not None else np.nan
+    
+    def __call__(self, model, where):
+        if where == GRB.Callback.MIP:
+            time = model.cbGet(GRB.Callback.RUNTIME)
+            # RUNTIME restarts at zero when the model is optimized again (e.g. after add_fallback_bounds)
+            if time < self.last_time:
+                self.next_sample = 0.0
+            self.last_time = time
+            if time < self.next_sample:
+                return
+            self.next_sample = time + self.cadence
+            self.record(time, self.work(model), model.cbGet(GRB.Callback.MIP_OBJBST),
+                        model.cbGet(GRB.Callback.MIP_OBJBND), model.cbGet(GRB.Callback.MIP_NODCNT), SAMPLE)
+        elif where == GRB.Callback.MIPSOL:
+            # MIPSOL_OBJBST does not include the new solution yet (all WFE objectives minimize)
+            incumbent = min(model.cbGet(GRB.Callback.MIPSOL_OBJ), model.cbGet(GRB.Callback.MIPSOL_OBJBST))
+            self.record(model.cbGet(GRB.Callback.RUNTIME), self.work(model),
+                        incumbent, model.cbGet(GRB.Callback.MIPSOL_OBJBND),
+                        model.cbGet(GRB.Callback.MIPSOL_NODCNT), INCUMBENT)
+    
+    def finish(self, model):
+        """Add the final state of a finished solve"""
+        incumbent = model.ObjVal if model.SolCount > 0 else np.inf
+        bound = model.ObjBound if model.IsMIP else incumbent
+        nodes = model.NodeCount if model.IsMIP else 0
+        self.record(model.Runtime, getattr(model, 'Work', np.nan), incumbent, bound, nodes, FINAL)
+        self.status = model.status
+    
+    def timeline(self):
+        """Recorded rows as an array with TELEMETRY_COLUMNS"""
+        return self.rows[:self.count].copy()
+    
+    def save(self, path):
+        """Store the timeline as a compressed .npz archive"""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, timeline=self.timeline(), columns=np.array(TELEMETRY_COLUMNS),
+                            label=np.array(self.label or ''), status=np.array(getattr(self, 'status', -1)))
+        return path
+
+def load_timeline(path):
+    """Timeline archive as {column: array} plus label and status"""
+    with np.load(path) as archive:
+        timeline = {column: archive['timeline'][:, i] for i, column in enumerate(archive['columns'])}
+        timeline['label'] = str(archive['label']) or os.path.splitext(os.path.basename(path))[0]
+        timeline['status'] = int(archive['status'])
+    return timeline
+
+def optimize_with_telemetry(nexus_model, path, cadence=None, label=None):
+    """Solve a WFENexusModel while recording its timeline to path"""
+    telemetry = SolveTelemetry(cadence, label)
+    nexus_model.optimize(callback=telemetry)
+    telemetry.finish(nexus_model.model)
+    telemetry.save(path)
+    return telemetry
+
+def plot_timelines(paths, x='time', save_path=None):
+    """Overlay gap and incumbent/bound timelines of several runs"""
+    import matplotlib.pyplot as plt  # only needed for plots, not in solve workers
+    
+    timelines = [load_timeline(path) for path in paths]
+    
+    fig, (ax_gap, ax_obj) = plt.subplots(2, 1, figsize=(10, 8), sharex=True)
+    for timeline in timelines:
+        gap = np.where(np.isfinite(timeline['gap']), timeline['gap'] * 100, np.nan)
+        line, = ax_gap.step(timeline[x], gap, where='post', label=timeline['label'])
+        ax_obj.step(timeline[x], timeline['incumbent'], where='post', color=line.get_color(),
+                    label=f"{timeline['label']} incumbent")
+        ax_obj.step(timeline[x], timeline['bound'], where='post', color=line.get_color(), linestyle='--',
+                    label=f"{timeline['label']} bound")
+    
+    ax_gap.set_yscale('log')
+    ax_gap.set_ylabel('MIP gap (%)')
+    ax_gap.set_title('Solve Progress')
+    ax_gap.legend()
+    ax_obj.set_ylabel('Objective ($/year)')
+    ax_obj.set_xlabel('Runtime (s)' if x == 'time' else 'Work units')
+    ax_obj.legend(fontsize=8)
+    
+    plt.tight_layout()
+    if save_path is not None:
+        fig.savefig(save_path, dpi=300, bbox_inches='tight')
+        plt.close(fig)
+    return fig
+
+if __name__ == "__main__":
+    paths = []
+    for focus in [0, 1, 3]:
+        model = WFENexusModel(data_dir='../data', co2_policy='medium_tax', solver_params={'MIPFocus': focus})
+        path = f'../results/telemetry/mipfocus_{focus}.npz'
+        optimize_with_telemetry(model, path, label=f'MIPFocus {focus}')
+        paths.append(path)
+    plot_timelines(paths, save_path='../results/telemetry/mipfocus.png')
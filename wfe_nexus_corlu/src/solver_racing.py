@@ -0,0 +1,271 @@
+"""
+Portfolio Racing of Solver Configurations for the WFE Nexus Model
+Solves one built model with K differently configured Gurobi runs in
+separate processes, shares incumbents between them through a file, stops
+the race as soon as one racer proves the gap and logs the winner per
+instance class
+"""
+
+import multiprocessing as mp
+from datetime import datetime
+from queue import Empty
+from gurobipy import GRB
+import gurobipy as gp
+import pandas as pd
+import numpy as np
+import tempfile
+import shutil
+import json
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.env_pool import get_env
+
+INSTANCE_CLASS = ['hours', 'scenarios', 'techs', 'objective']
+
+def share_incumbent(shared, incumbent_path, objective, values):
+    """Publish a solution if it beats the shared incumbent; True if it did"""
+    with shared['lock']:
+        if objective >= shared['best'].value - 1e-6:
+            return False
+        # Write aside and rename so readers never see a partial file
+        temp_path = f"{incumbent_path}.{os.getpid()}.npy"
+        np.save(temp_path, np.asarray(values))
+        os.replace(temp_path, incumbent_path)
+        shared['best'].value = objective
+        shared['version'].value += 1
+        return True
+
+class IncumbentSharing:
+    """Gurobi callback that publishes, imports and checks incumbents shared by all racers"""
+    def __init__(self, model, shared, incumbent_path, mip_gap, poll_interval):
+        self.variables = model.getVars()
+        self.shared = shared
+        self.incumbent_path = incumbent_path
+        self.mip_gap = mip_gap
+        self.poll_interval = poll_interval
+        self.seen_version = 0
+        self.last_poll = 0.0
+        self.published = 0
+        self.received = 0
+        self.closed = False
+    
+    def publish(self, model):
+        """Share a new own incumbent if it beats the shared one"""
+        objective = model.cbGet(GRB.Callback.MIPSOL_OBJ)
+        if objective >= self.shared['best'].value - 1e-6:
+            return
+        if share_incumbent(self.shared, self.incumbent_path, objective, model.cbGetSolution(self.variables)):
+            self.seen_version = self.shared['version'].value
+            self.published += 1
+    
+    def receive(self, model):
+        """Inject a better incumbent found by another racer"""
+        now = time.time()
+        if now - self.last_poll < self.poll_interval or self.shared['version'].value == self.seen_version:
+            return
+        self.last_poll = now
+        if self.shared['best'].value >= model.cbGet(GRB.Callback.MIPNODE_OBJBST) - 1e-6:
+            return
+        with self.shared['lock']:
+            values = np.load(self.incumbent_path)
+            self.seen_version = self.shared['version'].value
+        model.cbSetSolution(self.variables, values.tolist())
+        model.cbUseSolution()
+        self.received += 1
+    
+    def __call__(self, model, where):
+        if where == GRB.Callback.MIPSOL:
+            self.publish(model)
+        elif where == GRB.Callback.MIPNODE:
+            self.receive(model)
+        elif where == GRB.Callback.MIP:
+            if self.shared['stop'].is_set():
+                model.terminate()
+                return
+            # The shared incumbent and this racer's bound may already close the gap
+            best = self.shared['best'].value
+            bound = model.cbGet(GRB.Callback.MIP_OBJBND)
+            if best < GRB.INFINITY and (best - bound) <= self.mip_gap * abs(best) + 1e-9:
+                self.closed = True
+                self.shared['stop'].set()
+                model.terminate()
+
+def _race(name, params, model_path, incumbent_path, threads, mip_gap, time_limit, poll_interval,
+          race_start, shared, results):
+    """Solve the model with one configuration and report how the racer finished"""
+    try:
+        model = gp.read(model_path, get_env(Threads=threads))
+        model.Params.DualReductions = 0  # as in WFENexusModel.optimize
+        for param, value in params.items():
+            model.setParam(param, value)
+        model.Params.MIPGap = mip_gap
+        model.Params.TimeLimit = max(1, time_limit - (time.time() - race_start))
+        
+        sharing = IncumbentSharing(model, shared, incumbent_path, mip_gap, poll_interval)
+        model.optimize(sharing)
+        
+        # A racer that ends with an unshared optimum still publishes it
+        if model.SolCount > 0:
+            share_incumbent(shared, incumbent_path, model.ObjVal, model.getAttr('X', model.getVars()))
+        
+        proved = model.status == GRB.OPTIMAL or sharing.closed
+        if proved:
+            shared['stop'].set()
+        result = {
+            'name': name,
+            'status': model.status,
+            'proved': proved,
+            'objective': shared['best'].value if shared['best'].value < GRB.INFINITY else None,
+            'bound': model.ObjBound if model.IsMIP else None,
+            'nodes': model.NodeCount if model.IsMIP else 0,
+            'published': sharing.published,
+            'received': sharing.received,
+            'time': time.time() - race_start
+        }
+        model.dispose()
+    except Exception as error:
+        result = {'name': name, 'status': None, 'proved': False, 'error': repr(error),
+                  'time': time.time() - race_start}
+    results.put(result)
+
+class SolverRacing:
+    def __init__(self, nexus_model, configurations=None, mip_gap=None, time_limit=None, total_threads=None,
+                 log_path=None):
+        self.nexus_model = nexus_model
+        self.configurations = dict(SOLVER_RACING['configurations'] if configurations is None else configurations)
+        self.mip_gap = SOLVER_RACING['mip_gap'] if mip_gap is None else mip_gap
+        self.time_limit = SOLVER_RACING['time_limit'] if time_limit is None else time_limit
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_racer = max(1, self.total_threads // len(self.configurations))
+        self.log_path = SOLVER_RACING['log_path'] if log_path is None else log_path
+    
+    def run(self):
+        """Race all configurations; returns the winner and the best solution found"""
+        work_dir = tempfile.mkdtemp(prefix='wfe_race_')
+        model_path = os.path.join(work_dir, 'model.mps')
+        incumbent_path = os.path.join(work_dir, 'incumbent.npy')
+        # Racers cannot retry with bounds like WFENexusModel.optimize, so bound the model up front
+        self.nexus_model.add_fallback_bounds()
+        self.nexus_model.model.update()
+        self.nexus_model.model.write(model_path)
+        
+        # Fresh interpreters: the parent process already holds a Gurobi environment
+        ctx = mp.get_context('spawn')
+        shared = {'best': ctx.Value('d', GRB.INFINITY, lock=False), 'version': ctx.Value('i', 0, lock=False),
+                  'lock': ctx.Lock(), 'stop': ctx.Event()}
+        results = ctx.Queue()
+        
+        print("\n" + "-"*60)
+        print(f"SOLVER RACING ({len(self.configurations)} racers, {self.threads_per_racer} threads each)")
+        print("-"*60)
+        
+        race_start = time.time()
+        racers = [ctx.Process(target=_race, args=(name, params, model_path, incumbent_path,
+                                                  self.threads_per_racer, self.mip_gap, self.time_limit,
+                                                  SOLVER_RACING['poll_interval'], race_start, shared, results))
+                  for name, params in self.configurations.items()]
+        try:
+            for racer in racers:
+                racer.start()
+            
+            finished = []
+            while len(finished) < len(racers):
+                try:
+                    result = results.get(timeout=1)
+                except Empty:
+                    if not any(racer.is_alive() for racer in racers) and results.empty():
+                        break  # a racer died without reporting
+                    continue
+                finished.append(result)
+                marker = 'proved' if result['proved'] else result.get('error', f"status {result['status']}")
+                print(f"  {result['name']:<16} finished after {result['time']:>9.2f} s ({marker})")
+            
+            for racer in racers:
+                racer.join()
+            
+            values = np.load(incumbent_path) if os.path.exists(incumbent_path) else None
+        finally:
+            for racer in racers:
+                if racer.is_alive():
+                    racer.terminate()
+            shutil.rmtree(work_dir, ignore_errors=True)
+        
+        return self.report(finished, values, time.time() - race_start)
+    
+    def report(self, finished, values, wall_time):
+        """Pick the first racer that proved the gap, print and log the race"""
+        proved = sorted((result for result in finished if result['proved']), key=lambda result: result['time'])
+        winner = proved[0] if proved else None
+        
+        race = {
+            'winner': winner['name'] if winner else None,
+            'winner_params': self.configurations[winner['name']] if winner else None,
+            'winner_time': winner['time'] if winner else None,
+            'objective': winner['objective'] if winner else None,
+            'racers': finished,
+            'wall_time': wall_time
+        }
+        if values is not None:
+            race['capacities'] = {tech: float(values[var.index]) for tech, var in self.nexus_model.v_cap.items()}
+        
+        print("-"*60)
+        print(f"{'Racer':<16} {'Status':>7} {'Objective':>18} {'Bound':>18} {'Shared':>7} {'Got':>5}")
+        for result in sorted(finished, key=lambda result: result['time']):
+            objective = f"{result['objective']:>18,.0f}" if result.get('objective') is not None else f"{'-':>18}"
+            bound = f"{result['bound']:>18,.0f}" if result.get('bound') is not None else f"{'-':>18}"
+            print(f"{result['name']:<16} {str(result['status']):>7} {objective} {bound} "
+                  f"{result.get('published', 0):>7} {result.get('received', 0):>5}")
+        print("-"*60)
+        if winner:
+            print(f"Winner: {winner['name']} {race['winner_params']} in {winner['time']:.2f} s, "
+                  f"objective ${winner['objective']:,.0f}")
+        else:
+            print(f"No racer proved a {self.mip_gap*100:g}% gap within {self.time_limit} s")
+        
+        self.log(race)
+        return race
+    
+    def log(self, race):
+        """Append the race outcome to the racing log"""
+        row = {'timestamp': datetime.now().isoformat(timespec='seconds'),
+               'co2_policy': self.nexus_model.co2_policy}
+        row.update(self.nexus_model.instance_features())
+        row.update({
+            'winner': race['winner'],
+            'winner_params': json.dumps(race['winner_params']),
+            'winner_time': race['winner_time'],
+            'objective_value': race['objective'],
+            'racers': len(self.configurations),
+            'wall_time': race['wall_time']
+        })
+        
+        os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+        write_header = not os.path.exists(self.log_path)
+        pd.DataFrame([row]).to_csv(self.log_path, mode='a', header=write_header, index=False)
+        print(f"Race logged to {self.log_path}")
+
+def winner_summary(log_path=None):
+    """Wins and median winning time of each configuration per instance class"""
+    log = pd.read_csv(SOLVER_RACING['log_path'] if log_path is None else log_path).dropna(subset=['winner'])
+    summary = (log.groupby(INSTANCE_CLASS + ['winner'])['winner_time']
+               .agg(wins='count', median_time='median').reset_index()
+               .sort_values(INSTANCE_CLASS + ['wins', 'median_time'], ascending=[True] * 4 + [False, True]))
+    
+    print("\n" + "-"*60)
+    print("RACING WINNERS PER INSTANCE CLASS")
+    print("-"*60)
+    for instance_class, group in summary.groupby(INSTANCE_CLASS, sort=False):
+        print(f"{dict(zip(INSTANCE_CLASS, instance_class))}: suggested default '{group.iloc[0]['winner']}'")
+        for _, row in group.iterrows():
+            print(f"  {row['winner']:<16} {row['wins']:>4} wins, median {row['median_time']:>9.2f} s")
+    
+    return summary
+
+if __name__ == "__main__":
+    model = WFENexusModel(data_dir='../data', co2_policy='medium_tax')
+    SolverRacing(model, log_path='../results/racing_log.csv').run()
+    winner_summary('../results/racing_log.csv')
@@ -0,0 +1,229 @@
+"""
+Value of the Stochastic Solution (VSS) and EVPI for the WFE Nexus Model
+Solves the expected-value, expected-result-of-EV, wait-and-see and recourse
+problems concurrently on a reused single-scenario model structure
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel
+from src.env_pool import get_env
+
+SCENARIO_SLOT = 'scenario'
+EXPECTED_VALUE = 'expected_value'
+
+def load_scenario_data(data_dir):
+    """Read (renewable, demand, price) frames for every scenario"""
+    data = {}
+    for scenario in SCENARIOS:
+        data[scenario] = tuple(
+            pd.read_csv(os.path.join(data_dir, f'{kind}_{scenario}.csv'), index_col=0)
+            for kind in ['renewable', 'demand', 'price']
+        )
+    return data
+
+def expected_value_data(data):
+    """Probability-weighted average of the scenario time series"""
+    frames = []
+    for i in range(3):
+        frames.append(sum(prob * data[scenario][i] for scenario, prob in zip(SCENARIOS, SCENARIO_PROBABILITIES)))
+    return tuple(frames)
+
+class ScenarioSetModel(WFENexusModel):
+    """Model over a given set of scenario time series whose first stage can be fixed"""
+    def __init__(self, scenario_data, probabilities=None, data_dir='data', co2_policy='no_tax',
+                 objective='minimize_cost', co2_tax=None, discount_rate=None, solver_params=None, env=None,
+                 exclude_techs=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.co2_tax = CO2_TAX_SCENARIOS[co2_policy] if co2_tax is None else co2_tax
+        self.discount_rate = DISCOUNT_RATE if discount_rate is None else discount_rate
+        self.objective_type = objective
+        self.exclude_techs = tuple(sorted(exclude_techs or ()))
+        
+        # Equally likely scenarios unless probabilities are given
+        names = list(scenario_data.keys())
+        self.scenario_weights = (dict(probabilities) if probabilities is not None
+                                 else {name: 1.0 / len(names) for name in names})
+        
+        self.load_data()
+        self.renewable_data = {name: data[0] for name, data in scenario_data.items()}
+        self.demand_data = {name: data[1] for name, data in scenario_data.items()}
+        self.price_data = {name: data[2] for name, data in scenario_data.items()}
+        
+        self.define_sets()
+        self.build(env)
+        
+        # Same operational bounds for every solve, so objectives are comparable
+        self.add_fallback_bounds()
+        
+        self.solver_params = dict(solver_params or {})
+        for param, value in self.solver_params.items():
+            self.model.setParam(param, value)
+    
+    def load_data(self):
+        """Load WWTP data (scenario time series are passed in)"""
+        self.wwtp_data = pd.read_csv(os.path.join(self.data_dir, 'wwtp_data.csv')).iloc[0]
+    
+    def scenario_probabilities(self):
+        """Weights of the loaded scenarios"""
+        return dict(self.scenario_weights)
+    
+    def fix_first_stage(self, capacities):
+        """Fix investment decisions to a given design"""
+        for tech in self.all_techs:
+            cap = capacities.get(tech, 0)
+            self.v_cap[tech].LB = cap
+            self.v_cap[tech].UB = cap
+            built = 1 if cap > 1e-6 else 0
+            self.v_build[tech].LB = built
+            self.v_build[tech].UB = built
+    
+    def free_first_stage(self):
+        """Restore the investment decision bounds"""
+        for tech in self.all_techs:
+            self.v_cap[tech].LB = 0
+            self.v_cap[tech].UB = CAPACITY_LIMITS.get(tech, {}).get('max', 1000)
+            self.v_build[tech].LB = 0
+            self.v_build[tech].UB = 1
+
+class ScenarioModel(ScenarioSetModel):
+    """Single-scenario model whose data and first stage are swapped in place"""
+    def __init__(self, renewable, demand, price, data_dir='data', co2_policy='no_tax',
+                 objective='minimize_cost', co2_tax=None, discount_rate=None, solver_params=None, env=None):
+        super().__init__({SCENARIO_SLOT: (renewable, demand, price)}, data_dir=data_dir,
+                         co2_policy=co2_policy, objective=objective, co2_tax=co2_tax,
+                         discount_rate=discount_rate, solver_params=solver_params, env=env)
+    
+    def set_scenario(self, renewable, demand, price):
+        """Swap in another scenario's time series"""
+        self.update_scenario_data(SCENARIO_SLOT, renewable, demand, price)
+
+# Per-process state: one built structure and the scenario data
+_worker_model = None
+_worker_data = None
+
+def _init_worker(data_dir, co2_policy, objective, threads):
+    """Build the worker's single-scenario structure once"""
+    global _worker_model, _worker_data
+    _worker_data = load_scenario_data(data_dir)
+    _worker_data[EXPECTED_VALUE] = expected_value_data(_worker_data)
+    _worker_model = ScenarioModel(*_worker_data[SCENARIOS[0]], data_dir=data_dir, co2_policy=co2_policy,
+                                  objective=objective, env=get_env(Threads=threads))
+
+def _solve_scenario(kind, scenario, capacities=None):
+    """Solve one EV, EEV or wait-and-see problem on the worker's structure"""
+    model = _worker_model
+    model.set_scenario(*_worker_data[scenario])
+    if capacities is None:
+        model.free_first_stage()
+    else:
+        model.fix_first_stage(capacities)
+    
+    start_time = time.time()
+    if not model.resolve():
+        raise RuntimeError(f"{kind} problem for {scenario} failed with status {model.model.status}")
+    
+    return {
+        'kind': kind,
+        'scenario': scenario,
+        'objective': model.model.ObjVal,
+        'capacities': {tech: model.v_cap[tech].X for tech in model.all_techs},
+        'solve_time': time.time() - start_time
+    }
+
+def _solve_recourse_problem(data_dir, co2_policy, objective, threads):
+    """Solve the full stochastic (recourse) problem"""
+    start_time = time.time()
+    model = WFENexusModel(data_dir=data_dir, co2_policy=co2_policy, objective=objective,
+                          env=get_env(Threads=threads))
+    model.add_fallback_bounds()
+    if not model.resolve():
+        raise RuntimeError(f"Recourse problem failed with status {model.model.status}")
+    
+    result = {
+        'kind': 'rp',
+        'scenario': 'all',
+        'objective': model.model.ObjVal,
+        'capacities': {tech: model.v_cap[tech].X for tech in model.all_techs},
+        'solve_time': time.time() - start_time
+    }
+    model.dispose()
+    return result
+
+class StochasticMetrics:
+    def __init__(self, data_dir='data', co2_policy='medium_tax', objective='minimize_cost',
+                 max_workers=None, total_threads=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.max_workers = len(SCENARIOS) + 1 if max_workers is None else max_workers
+        self.total_threads = EXPERIMENT_RUNNER['total_threads'] if total_threads is None else total_threads
+        self.threads_per_worker = max(1, self.total_threads // self.max_workers)
+    
+    def run(self):
+        """Solve EV, EEV, wait-and-see and recourse problems and report EVPI and VSS"""
+        start_time = time.time()
+        args = (self.data_dir, self.co2_policy, self.objective, self.threads_per_worker)
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=args) as executor:
+            rp_future = executor.submit(_solve_recourse_problem, *args)
+            ws_futures = [executor.submit(_solve_scenario, 'ws', scenario) for scenario in SCENARIOS]
+            
+            # The EEV solves need the EV design
+            ev = executor.submit(_solve_scenario, 'ev', EXPECTED_VALUE).result()
+            eev_futures = [executor.submit(_solve_scenario, 'eev', scenario, ev['capacities'])
+                           for scenario in SCENARIOS]
+            
+            rp = rp_future.result()
+            ws = [future.result() for future in ws_futures]
+            eev = [future.result() for future in eev_futures]
+        
+        wall_time = time.time() - start_time
+        return self.report(rp, ev, ws, eev, wall_time)
+    
+    def report(self, rp, ev, ws, eev, wall_time):
+        """Compute and print the stochastic metrics"""
+        probs = dict(zip(SCENARIOS, SCENARIO_PROBABILITIES))
+        ws_value = sum(probs[res['scenario']] * res['objective'] for res in ws)
+        eev_value = sum(probs[res['scenario']] * res['objective'] for res in eev)
+        solves = [rp, ev] + ws + eev
+        
+        metrics = {
+            'RP': rp['objective'],
+            'EV': ev['objective'],
+            'EEV': eev_value,
+            'WS': ws_value,
+            'EVPI': rp['objective'] - ws_value,
+            'VSS': eev_value - rp['objective'],
+            'wall_time': wall_time,
+            'total_solve_time': sum(res['solve_time'] for res in solves),
+            'solves': solves
+        }
+        
+        print("\n" + "-"*60)
+        print("VALUE OF STOCHASTIC SOLUTION AND EVPI")
+        print("-"*60)
+        print(f"Recourse problem (RP):            ${metrics['RP']:>18,.0f}")
+        print(f"Expected-value problem (EV):      ${metrics['EV']:>18,.0f}")
+        print(f"Expected result of EV (EEV):      ${metrics['EEV']:>18,.0f}")
+        print(f"Wait-and-see (WS):                ${metrics['WS']:>18,.0f}")
+        print(f"EVPI = RP - WS:                   ${metrics['EVPI']:>18,.0f}")
+        print(f"VSS = EEV - RP:                   ${metrics['VSS']:>18,.0f}")
+        print("-"*60)
+        print(f"{'Problem':<10} {'Scenario':<20} {'Objective':>18} {'Time (s)':>9}")
+        for res in solves:
+            print(f"{res['kind']:<10} {res['scenario']:<20} {res['objective']:>18,.0f} {res['solve_time']:>9.2f}")
+        print(f"\n{len(solves)} solves in {wall_time:.2f} s wall time "
+              f"({metrics['total_solve_time']:.2f} s total solve time)")
+        
+        return metrics
+
+if __name__ == "__main__":
+    StochasticMetrics(data_dir='../data').run()
@@ -0,0 +1,306 @@
+"""
+Technology Dominance Screening for the WFE Nexus Model
+Certifies technologies whose optimal capacity is zero before the stochastic
+model is built, so they can be left out of the superstructure
+
+Structural and cost/benefit dominance prove a zero capacity outright. LP
+relaxation bounds prove it only when the relaxation closes the gap to a known
+design: investment cost is proportional to capacity with no fixed cost per
+build, so otherwise they just cap how much of a technology a better design can
+build. Those caps are reported as capacity bounds for the build instead of
+exclusions. The relaxation check solves the stochastic model once with the
+expected-value design and once as an LP
+"""
+
+from gurobipy import GRB
+import numpy as np
+import time
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+from src.wfe_nexus_model import WFENexusModel, capital_recovery_factor
+from src.stochastic_metrics import ScenarioSetModel, load_scenario_data, expected_value_data
+from src.relax_and_fix import RelaxAndFix
+
+GAP_TOLERANCE = 1e-6  # relative incumbent - LP bound gap treated as closed (zero capacity certified)
+OPERATIONAL_VARIABLES = ['v_gen', 'v_charge', 'v_discharge', 'v_soc', 'v_production', 'v_consumption',
+                         'v_is_on', 'v_startup', 'v_shutdown']
+
+def model_size(nexus_model):
+    """Variable and constraint counts of a built model"""
+    model = nexus_model.model
+    model.update()
+    return {
+        'variables': model.NumVars,
+        'binaries': model.NumBinVars,
+        'constraints': model.NumConstrs,
+        'quadratic_constraints': model.NumQConstrs,
+        'nonzeros': model.NumNZs
+    }
+
+class TechnologyScreening:
+    def __init__(self, data_dir='data', co2_policy='medium_tax', objective='minimize_cost',
+                 co2_tax=None, discount_rate=None, exclude_techs=None):
+        self.data_dir = data_dir
+        self.co2_policy = co2_policy
+        self.objective = objective
+        self.co2_tax = CO2_TAX_SCENARIOS[co2_policy] if co2_tax is None else co2_tax
+        self.discount_rate = DISCOUNT_RATE if discount_rate is None else discount_rate
+        self.exclude_techs = tuple(sorted(exclude_techs or ()))  # already left out of the superstructure
+        self.data = load_scenario_data(data_dir)
+    
+    def owned_variables(self, model, tech):
+        """Investment and operational variables that belong to one technology
+        
+        The heat and hydrogen slacks count as CHP and electrolyzer variables:
+        leaving those technologies out also drops the balances the slacks close.
+        """
+        variables = [model.v_cap[tech], model.v_build[tech]]
+        for attr in OPERATIONAL_VARIABLES:
+            variables += [var for key, var in getattr(model, attr).items() if key[0] == tech]
+        if tech == 'chp':
+            variables += list(model.v_chp_gas.values()) + list(model.v_heat_slack.values())
+        if tech == 'electrolyzer':
+            variables += list(model.v_h2_slack.values())
+        return variables
+    
+    def constraint_rows(self, model):
+        """Variable indices and zero-point feasibility of every (quadratic) constraint, and rows per variable"""
+        model.update()
+        rows = []
+        for constr in model.getConstrs():
+            row = model.getRow(constr)
+            variables = {row.getVar(i).index for i in range(row.size())}
+            zero_ok = {'<': 0 <= constr.RHS, '>': 0 >= constr.RHS, '=': abs(constr.RHS) < 1e-9}[constr.Sense]
+            rows.append((variables, zero_ok))
+        for qconstr in model.getQConstrs():
+            row = model.getQCRow(qconstr)
+            linear = row.getLinExpr()
+            variables = {linear.getVar(i).index for i in range(linear.size())}
+            variables |= {row.getVar1(i).index for i in range(row.size())}
+            variables |= {row.getVar2(i).index for i in range(row.size())}
+            zero_ok = {'<': 0 <= qconstr.QCRHS, '>': 0 >= qconstr.QCRHS,
+                       '=': abs(qconstr.QCRHS) < 1e-9}[qconstr.QCSense]
+            rows.append((variables, zero_ok))
+        
+        index_rows = {}
+        for i, (variables, _) in enumerate(rows):
+            for index in variables:
+                index_rows.setdefault(index, []).append(i)
+        return rows, index_rows
+    
+    def structural_check(self):
+        """Technologies whose variables form a block that zero capacity solves at zero cost
+        
+        A technology qualifies if every constraint on its variables involves only
+        its own variables, none of them has a negative objective coefficient and
+        all of them at zero satisfy those constraints. Its optimal block is then
+        all zeros, and removing it leaves the optimum unchanged.
+        """
+        screening = ScenarioSetModel({'expected_value': expected_value_data(self.data)}, data_dir=self.data_dir,
+                                     co2_policy=self.co2_policy, objective=self.objective,
+                                     co2_tax=self.co2_tax, discount_rate=self.discount_rate,
+                                     exclude_techs=self.exclude_techs)
+        rows, index_rows = self.constraint_rows(screening.model)
+        
+        certified = {}
+        for tech in screening.all_techs:
+            owned = self.owned_variables(screening, tech)
+            owned_index = {var.index for var in owned}
+            if any(var.Obj < 0 for var in owned):
+                continue
+            touched = {i for index in owned_index for i in index_rows.get(index, [])}
+            if all(rows[i][0] <= owned_index and rows[i][1] for i in touched):
+                certified[tech] = "capacity enables nothing that enters balances or objective"
+        
+        screening.dispose()
+        return certified
+    
+    def economic_check(self):
+        """Electricity generators whose best-case benefit cannot cover their annualized cost
+        
+        The value of a generated MWh is bounded by the best alternative supply,
+        max(grid purchase incl. CO2 tax, grid sale) in that hour, which holds as
+        long as grid trades stay below MAX_GRID. Fuel-cell output is charged its
+        hydrogen, produced by the electrolyzer from the cheapest electricity, only
+        without H2 storage: every scenario starts storage at half its capacity, and
+        that free inventory makes the fuel cell's hydrogen free at the margin.
+        """
+        if self.objective != 'minimize_cost':
+            return {}
+        
+        days = 365 / WFENexusModel.representative_days  # as in WFENexusModel.set_objective
+        probs = dict(zip(SCENARIOS, SCENARIO_PROBABILITIES))
+        
+        # Precondition: peak load plus flexible consumers stays within the grid bound
+        peak_load = max(self.data[s][1]['electricity_demand'].max() for s in SCENARIOS)
+        flexible = (STORAGE_PARAMS['battery']['max_charge_rate'] * CAPACITY_LIMITS['battery']['max']
+                    + CAPACITY_LIMITS['electrolyzer']['max'])
+        peak_renewables = sum(CAPACITY_LIMITS[tech]['max'] * max(self.data[s][0][f'{tech}_availability'].max()
+                                                                  for s in SCENARIOS)
+                              for tech in ['pv', 'wind'])
+        if peak_load + flexible + peak_renewables > MAX_GRID:
+            print("Grid bound may bind; economic dominance check skipped")
+            return {}
+        
+        value = {}
+        for scenario in SCENARIOS:
+            price = self.data[scenario][2]
+            buy = price['electricity_buy_price'] / 1000 + self.co2_tax * EMISSION_FACTORS['grid_electricity']
+            value[scenario] = np.maximum(buy.values, price['electricity_sell_price'].values / 1000)
+        cheapest = min(self.data[s][2]['electricity_sell_price'].min() for s in SCENARIOS) / 1000
+        h2_per_mwh = 1000 / (ENERGY_CONVERSIONS['h2_lhv'] * TECHNOLOGY_EFFICIENCIES['fuel_cell'])
+        fuel_cost = h2_per_mwh * ENERGY_CONVERSIONS['electricity_to_h2'] * cheapest
+        if 'h2_storage' not in self.exclude_techs:
+            fuel_cost = 0
+        
+        certified = {}
+        for tech in [tech for tech in ['pv', 'wind', 'fuel_cell'] if tech not in self.exclude_techs]:
+            cost = (capital_recovery_factor(tech, self.discount_rate) + FIXED_OPEX_PERCENTAGE * days) * TECHNOLOGY_CAPEX[tech]
+            vom = VARIABLE_OPEX.get(tech, 0) / 1000
+            benefit = 0
+            for scenario in SCENARIOS:
+                if tech == 'fuel_cell':
+                    margin = np.maximum(value[scenario] - vom - fuel_cost, 0)
+                else:
+                    availability = self.data[scenario][0][f'{tech}_availability'].values
+                    margin = availability * (value[scenario] - vom)
+                benefit += probs[scenario] * days * margin.sum()
+            
+            if benefit <= cost:
+                certified[tech] = f"benefit <= ${benefit:,.0f} vs cost ${cost:,.0f} per unit of capacity"
+        
+        return certified
+    
+    def stochastic_model(self):
+        """Model over all scenarios (with the fallback bounds every solve uses)"""
+        return ScenarioSetModel(self.data, dict(zip(SCENARIOS, SCENARIO_PROBABILITIES)), data_dir=self.data_dir,
+                                co2_policy=self.co2_policy, objective=self.objective, co2_tax=self.co2_tax,
+                                discount_rate=self.discount_rate, solver_params={'OutputFlag': 0},
+                                exclude_techs=self.exclude_techs)
+    
+    def incumbent_cost(self, model):
+        """Objective of the expected-value design evaluated on all scenarios (None if a solve fails)"""
+        expected = ScenarioSetModel({'expected_value': expected_value_data(self.data)}, data_dir=self.data_dir,
+                                    co2_policy=self.co2_policy, objective=self.objective, co2_tax=self.co2_tax,
+                                    discount_rate=self.discount_rate, solver_params={'OutputFlag': 0},
+                                    exclude_techs=self.exclude_techs)
+        solved = expected.resolve() or expected.model.SolCount > 0
+        capacities = {tech: expected.v_cap[tech].X for tech in expected.all_techs} if solved else None
+        expected.dispose()
+        if capacities is None:
+            return None
+        
+        model.fix_first_stage(capacities)
+        solved = model.resolve() or model.model.SolCount > 0
+        cost = model.model.ObjVal if solved else None
+        model.free_first_stage()
+        return cost
+    
+    def relaxation_check(self, skip=(), incumbent=None):
+        """Technologies pruned, and capacity bounds, from the LP relaxation and a known design's cost
+        
+        The commitment and build binaries are relaxed and the bilinear generation
+        limits replaced by their McCormick envelope (as in relax-and-fix), which
+        makes the stochastic model an LP whose optimum z bounds every design from
+        below. A variable at zero in that optimum with reduced cost d > 0 raises
+        the bound by at least d per unit, so no design cheaper than the incumbent
+        builds more capacity than (incumbent - z) / d. If the gap is closed, a
+        technology is pruned when all its variables that enter the objective or
+        other technologies' constraints are such variables and its remaining
+        constraints hold at zero: any use of it then costs more than the incumbent.
+        Returns (certified, capacity_bounds).
+        """
+        model = self.stochastic_model()
+        incumbent = self.incumbent_cost(model) if incumbent is None else incumbent
+        if incumbent is None:
+            print("No incumbent design; relaxation check skipped")
+            model.dispose()
+            return {}, {}
+        rows, index_rows = self.constraint_rows(model.model)
+        
+        envelope = RelaxAndFix(model)
+        for key in list(envelope.limits):
+            envelope.linearize(key)
+        for variables in [model.v_is_on, model.v_startup, model.v_shutdown, model.v_build]:
+            for var in variables.values():
+                var.VType = GRB.CONTINUOUS
+        model.model.optimize()
+        if model.model.status != GRB.OPTIMAL:
+            print(f"LP relaxation not solved (status {model.model.status}); relaxation check skipped")
+            model.dispose()
+            return {}, {}
+        
+        gap = incumbent - model.model.ObjVal
+        gap = 0.0 if gap <= GAP_TOLERANCE * max(abs(incumbent), 1.0) else gap
+        priced_out = lambda var: var.UB <= 1e-9 or (var.X <= 1e-9 and var.RC > 1e-9)
+        certified, bounds = {}, {}
+        for tech in [tech for tech in model.all_techs if tech not in skip]:
+            owned = self.owned_variables(model, tech)
+            owned_index = {var.index for var in owned}
+            touched = {i for index in owned_index for i in index_rows.get(index, [])}
+            interface = [var for var in owned
+                         if var.Obj != 0 or any(not rows[i][0] <= owned_index for i in index_rows.get(var.index, []))]
+            internal_ok = all(rows[i][1] for i in touched if rows[i][0] <= owned_index)
+            if gap == 0 and internal_ok and all(priced_out(var) for var in interface):
+                certified[tech] = "LP relaxation bound reaches the incumbent; any use costs more"
+                continue
+            
+            capacity = model.v_cap[tech]
+            if priced_out(capacity) and gap / capacity.RC < capacity.UB:
+                bounds[tech] = gap / capacity.RC
+        
+        model.dispose()
+        return certified, bounds
+    
+    def run(self, compare_sizes=True, relaxation=True):
+        """Screen all technologies and report the model size reduction"""
+        start_time = time.time()
+        reasons = self.structural_check()
+        reasons.update(self.economic_check())
+        bounds = {}
+        if relaxation:
+            certified, bounds = self.relaxation_check(skip=reasons)
+            reasons.update(certified)
+        screening_time = time.time() - start_time
+        
+        result = {'excluded': sorted(reasons), 'reasons': reasons, 'capacity_bounds': bounds,
+                  'screening_time': screening_time}
+        
+        print("\n" + "-"*60)
+        print("TECHNOLOGY DOMINANCE SCREENING")
+        print("-"*60)
+        for tech, reason in sorted(reasons.items()):
+            print(f"  {tech:<22} {reason}")
+        print(f"{len(reasons)} technologies pruned in {screening_time:.2f} s")
+        if bounds:
+            print("\nCapacity bounds from the LP relaxation (not pruned):")
+            for tech, bound in sorted(bounds.items()):
+                print(f"  {tech:<22} <= {bound:,.3f}")
+        
+        if compare_sizes:
+            sizes = {}
+            for label, exclude in [('full', self.exclude_techs),
+                                   ('screened', sorted(set(self.exclude_techs) | set(result['excluded'])))]:
+                model = WFENexusModel(data_dir=self.data_dir, co2_policy=self.co2_policy, objective=self.objective,
+                                      co2_tax=self.co2_tax, discount_rate=self.discount_rate,
+                                      exclude_techs=exclude)
+                sizes[label] = model_size(model)
+                model.dispose()
+            result['sizes'] = sizes
+            
+            print(f"\n{'Model size':<24} {'Full':>10} {'Screened':>10} {'Reduction':>10}")
+            for key in sizes['full']:
+                full, screened = sizes['full'][key], sizes['screened'][key]
+                reduction = (full - screened) / full * 100 if full else 0
+                print(f"{key:<24} {full:>10} {screened:>10} {reduction:>9.1f}%")
+        
+        return result
+
+if __name__ == "__main__":
+    screening = TechnologyScreening(data_dir='../data').run()
+    model = WFENexusModel(data_dir='../data', co2_policy='medium_tax', exclude_techs=screening['excluded'])
+    for tech, bound in screening['capacity_bounds'].items():
+        model.v_cap[tech].UB = min(model.v_cap[tech].UB, bound)
+    model.optimize()
@@ -0,0 +1,64 @@
+"""
+Tuned Solver Settings per Instance Class
+Stores Gurobi parameters found by the offline tuning harness
+(src/param_tuning.py) keyed by instance features, and looks up the
+settings that match a new WFENexusModel instance
+"""
+
+from datetime import datetime
+import json
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config.model_config import *
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def instance_class(features):
+    """Key of an instance class, e.g. 'h96_s3_t16_minimize_cost'"""
+    return f"h{features['hours']}_s{features['scenarios']}_t{features['techs']}_{features['objective']}"
+
+class TunedSettings:
+    def __init__(self, path=None):
+        path = PARAM_TUNING['settings_path'] if path is None else path
+        self.path = path if os.path.isabs(path) else os.path.join(PACKAGE_DIR, path)
+    
+    def load(self):
+        """All stored classes (empty if nothing was tuned yet)"""
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path) as f:
+            return json.load(f)
+    
+    def lookup(self, features):
+        """Stored parameters of the instance's class, or None"""
+        entry = self.load().get(instance_class(features))
+        return entry['params'] if entry is not None else None
+    
+    def store(self, features, params, **stats):
+        """Save the parameters of one instance class"""
+        settings = self.load()
+        settings[instance_class(features)] = {
+            'features': features,
+            'params': params,
+            'tuned_at': datetime.now().isoformat(timespec='seconds'),
+            **stats
+        }
+        
+        # Write aside and rename so concurrent readers never see a partial file
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp{os.getpid()}"
+        with open(tmp_path, 'w') as f:
+            json.dump(settings, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+    
+    def apply(self, nexus_model, skip=()):
+        """Set the stored parameters of the model's class (except those in skip); returns them"""
+        params = self.lookup(nexus_model.instance_features())
+        if not params:
+            return {}
+        
+        applied = {param: value for param, value in params.items() if param not in skip}
+        for param, value in applied.items():
+            nexus_model.model.setParam(param, value)
+        return applied
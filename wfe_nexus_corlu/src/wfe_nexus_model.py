@@ -11,23 +11,72 @@ import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config.model_config import *
+from src.model_cache import ModelCache
+from src.tuned_settings import TunedSettings, instance_class
+from src.solution_checker import check_solution
+
+def technology_sets(exclude_techs=()):
+    """Technology sets of the superstructure without the excluded technologies"""
+    sets = {
+        'generation': ['pv', 'wind', 'chp', 'fuel_cell'],
+        'storage': ['battery', 'h2_storage', 'nh3_storage'],
+        'conversion': ['electrolyzer', 'haber_bosch', 'p2g_methanation',
+                       'anaerobic_digester', 'biomethane_upgrading'],
+        'recovery': ['n_recovery', 'p_recovery', 'water_reclamation'],
+        'capture': ['carbon_capture']
+    }
+    exclude_techs = exclude_techs or ()
+    return {name: [tech for tech in techs if tech not in exclude_techs] for name, techs in sets.items()}
+
+def capital_recovery_factor(tech, discount_rate):
+    """Capital Recovery Factor of a technology over its lifespan"""
+    r = discount_rate
+    n = TECHNOLOGY_LIFESPANS.get(tech, 20)
+    return (r * (1 + r)**n) / ((1 + r)**n - 1)
 
 class WFENexusModel:
-    def __init__(self, data_dir='../data', co2_policy='no_tax', objective='minimize_cost'):
+    # Technologies left out of the build (see src/tech_screening.py)
+    exclude_techs = ()
+    # Apply parameters tuned offline for the instance class in optimize() (see src/param_tuning.py)
+    use_tuned_settings = True
+    # Representative days in the time series; each stands for 365/representative_days days
+    representative_days = REPRESENTATIVE_DAYS
+    # Set by add_fallback_bounds; the solution checker reports variables held at these bounds
+    fallback_bounds_applied = False
+    
+    def __init__(self, data_dir='../data', co2_policy='no_tax', objective='minimize_cost',
+                 co2_tax=None, discount_rate=None, solver_params=None, env=None, cache_dir=None,
+                 exclude_techs=None):
         self.data_dir = data_dir
         self.co2_policy = co2_policy
-        self.co2_tax = CO2_TAX_SCENARIOS[co2_policy]
+        self.co2_tax = CO2_TAX_SCENARIOS[co2_policy] if co2_tax is None else co2_tax
+        self.discount_rate = DISCOUNT_RATE if discount_rate is None else discount_rate
         self.objective_type = objective
+        self.exclude_techs = tuple(sorted(exclude_techs or ()))
         
         # Load data
         self.load_data()
         
-        # Create model
-        self.model = gp.Model("WFE_Nexus_Corlu")
-        
         # Define sets
         self.define_sets()
         
+        # Reload a previously built model if one matches structure and data
+        cache = ModelCache(cache_dir) if cache_dir is not None else None
+        if cache is None or not cache.load(self, env):
+            self.build(env)
+            if cache is not None:
+                cache.save(self)
+        
+        # Solver parameters (e.g. Threads, OutputFlag)
+        self.solver_params = dict(solver_params or {})
+        for param, value in self.solver_params.items():
+            self.model.setParam(param, value)
+    
+    def build(self, env=None):
+        """Build the Gurobi model from the loaded data"""
+        # Create model (on a pooled environment if given, see src/env_pool.py)
+        self.model = gp.Model("WFE_Nexus_Corlu", env=env)
+        
         # Create variables
         self.create_variables()
         
@@ -70,35 +119,54 @@ class WFENexusModel:
     
     def define_sets(self):
         """Define model sets"""
-        # Technologies
-        self.tech_generation = ['pv', 'wind', 'chp', 'fuel_cell']
-        self.tech_storage = ['battery', 'h2_storage', 'nh3_storage']
-        self.tech_conversion = ['electrolyzer', 'haber_bosch', 'p2g_methanation', 
-                               'anaerobic_digester', 'biomethane_upgrading']
-        self.tech_recovery = ['n_recovery', 'p_recovery', 'water_reclamation']
-        self.tech_capture = ['carbon_capture']
+        # Technologies (without screened-out ones)
+        techs = technology_sets(self.exclude_techs)
+        self.tech_generation = techs['generation']
+        self.tech_storage = techs['storage']
+        self.tech_conversion = techs['conversion']
+        self.tech_recovery = techs['recovery']
+        self.tech_capture = techs['capture']
         
         self.all_techs = (self.tech_generation + self.tech_storage + 
                          self.tech_conversion + self.tech_recovery + self.tech_capture)
         
-        # Time periods (representative hours)
-        self.time_periods = list(self.renewable_data[SCENARIOS[0]].index)
+        # Scenarios (as loaded, SCENARIOS for the CSV data)
+        self.scenarios = list(self.renewable_data.keys())
         
-        # Scenarios
-        self.scenarios = SCENARIOS
+        # Scenario probabilities
+        self.probabilities = self.scenario_probabilities()
+        
+        # Time periods (representative hours)
+        self.time_periods = list(self.renewable_data[self.scenarios[0]].index)
         
         # Resources
         self.resources = ['electricity', 'heat', 'water', 'hydrogen', 'ammonia', 
                          'biogas', 'biomethane', 'co2', 'nitrogen_fertilizer']
     
+    def scenario_probabilities(self):
+        """Probability of each loaded scenario"""
+        return {scenario: SCENARIO_PROBABILITIES[SCENARIOS.index(scenario)] for scenario in self.scenarios}
+    
     def calculate_crf(self, tech):
         """Calculate Capital Recovery Factor"""
-        r = DISCOUNT_RATE
-        n = TECHNOLOGY_LIFESPANS.get(tech, 20)
-        return (r * (1 + r)**n) / ((1 + r)**n - 1)
+        return capital_recovery_factor(tech, self.discount_rate)
+    
+    def instance_features(self):
+        """Size features that define the instance class (for solver settings per class)"""
+        return {
+            'hours': len(self.time_periods),
+            'scenarios': len(self.scenarios),
+            'techs': len(self.all_techs),
+            'objective': self.objective_type
+        }
     
     def create_variables(self):
         """Create model variables"""
+        self.create_investment_variables()
+        self.create_operational_variables()
+    
+    def create_investment_variables(self):
+        """Create first-stage variables"""
         # First-stage variables (investment decisions)
         self.v_cap = {}
         self.v_build = {}
@@ -116,7 +184,9 @@ class WFENexusModel:
             self.v_build[tech] = self.model.addVar(
                 vtype=GRB.BINARY, name=f"build_{tech}"
             )
-        
+    
+    def create_operational_variables(self):
+        """Create second-stage variables for all scenarios"""
         # Second-stage variables (operational decisions)
         self.v_gen = {}  # Generation
         self.v_charge = {}  # Storage charging
@@ -145,7 +215,7 @@ class WFENexusModel:
                     )
                     
                     # Unit commitment for dispatchable units
-                    if tech in ['chp', 'fuel_cell']:
+                    if tech in DISPATCHABLE:
                         self.v_is_on[(tech, t, scenario)] = self.model.addVar(
                             vtype=GRB.BINARY, name=f"on_{tech}_{t}_{scenario}"
                         )
@@ -257,7 +327,7 @@ class WFENexusModel:
                 )
         
         # Dispatchable generation constraints
-        for tech in ['chp', 'fuel_cell']:
+        for tech in [tech for tech in DISPATCHABLE if tech in self.tech_generation]:
             for idx, t in enumerate(self.time_periods):
                 # Generation limits
                 self.model.addConstr(
@@ -266,9 +336,8 @@ class WFENexusModel:
                 )
                 
                 # Minimum stable generation
-                min_load = 0.3  # 30% minimum load
                 self.model.addConstr(
-                    self.v_gen[(tech, t, scenario)] >= min_load * self.v_cap[tech] * self.v_is_on[(tech, t, scenario)],
+                    self.v_gen[(tech, t, scenario)] >= MIN_LOAD * self.v_cap[tech] * self.v_is_on[(tech, t, scenario)],
                     name=f"gen_min_{tech}_{t}_{scenario}"
                 )
                 
@@ -331,11 +400,11 @@ class WFENexusModel:
                 
                 # State of charge dynamics
                 if storage == 'battery':
-                    charge_eff = TECHNOLOGY_EFFICIENCIES.get('battery_charge', 0.95)
-                    discharge_eff = TECHNOLOGY_EFFICIENCIES.get('battery_discharge', 0.95)
+                    charge_eff = TECHNOLOGY_EFFICIENCIES.get('battery_charge', STORAGE_EFFICIENCY)
+                    discharge_eff = TECHNOLOGY_EFFICIENCIES.get('battery_discharge', STORAGE_EFFICIENCY)
                 else:
-                    charge_eff = 0.95  # Default for other storage
-                    discharge_eff = 0.95
+                    charge_eff = STORAGE_EFFICIENCY  # Default for other storage
+                    discharge_eff = STORAGE_EFFICIENCY
                 
                 if idx == 0:
                     # Initial state (assume 50% charged)
@@ -433,14 +502,14 @@ class WFENexusModel:
             # Electricity balance
             supply_elec = (
                 sum(self.v_gen[(tech, t, scenario)] for tech in self.tech_generation if (tech, t, scenario) in self.v_gen) +
-                self.v_discharge[('battery', t, scenario)] +
+                (self.v_discharge[('battery', t, scenario)] if 'battery' in self.tech_storage else 0) +
                 self.v_grid_buy[('electricity', t, scenario)]
             )
             
             demand_elec = (
                 self.demand_data[scenario].loc[t, 'electricity_demand'] +
-                self.v_charge[('battery', t, scenario)] +
-                self.v_consumption[('electrolyzer', t, scenario)] +
+                (self.v_charge[('battery', t, scenario)] if 'battery' in self.tech_storage else 0) +
+                (self.v_consumption[('electrolyzer', t, scenario)] if 'electrolyzer' in self.tech_conversion else 0) +
                 self.v_grid_sell[('electricity', t, scenario)] +
                 self.wwtp_data['energy_consumption'] * self.wwtp_data['influent_flow'] / 24 / 1000  # MWh
             )
@@ -492,14 +561,14 @@ class WFENexusModel:
                 )
             
             # Water balance
-            water_reclaimed = (self.v_production[('water_reclamation', t, scenario)] 
-                             if 'water_reclamation' in self.tech_recovery else 0)
-            water_demand = self.demand_data[scenario].loc[t, 'water_demand']
-            
-            self.model.addConstr(
-                water_reclaimed <= water_demand,
-                name=f"water_balance_{t}_{scenario}"
-            )
+            if 'water_reclamation' in self.tech_recovery:
+                water_reclaimed = self.v_production[('water_reclamation', t, scenario)]
+                water_demand = self.demand_data[scenario].loc[t, 'water_demand']
+                
+                self.model.addConstr(
+                    water_reclaimed <= water_demand,
+                    name=f"water_balance_{t}_{scenario}"
+                )
             
             # Fertilizer balance
             n_recovered = (self.v_production[('n_recovery', t, scenario)] 
@@ -550,7 +619,7 @@ class WFENexusModel:
         penalty_cost = 0
         
         for scenario in self.scenarios:
-            prob = SCENARIO_PROBABILITIES[self.scenarios.index(scenario)]
+            prob = self.probabilities[scenario]
             
             # Variable O&M costs
             for tech in self.tech_generation:
@@ -595,22 +664,19 @@ class WFENexusModel:
                 operational_cost += prob * self.co2_tax * self.v_emissions[(t, scenario)]
                 total_emissions += prob * self.v_emissions[(t, scenario)]
                 
-                # Add penalty for unmet demands (slack variables)
-                # Moderate penalty to encourage meeting demands
-                penalty_rate = 1000  # $/unit
-                
-                # Add penalties for slack variables
+                # Add penalties for unmet demands (slack variables)
                 if (t, scenario) in self.v_heat_slack:
-                    penalty_cost += prob * penalty_rate * self.v_heat_slack[(t, scenario)]
+                    penalty_cost += prob * PENALTY_RATE * self.v_heat_slack[(t, scenario)]
                 
                 if (t, scenario) in self.v_h2_slack:
-                    penalty_cost += prob * penalty_rate * self.v_h2_slack[(t, scenario)]
+                    penalty_cost += prob * PENALTY_RATE * self.v_h2_slack[(t, scenario)]
                 
                 if (t, scenario) in self.v_n_slack:
-                    penalty_cost += prob * penalty_rate * self.v_n_slack[(t, scenario)]
+                    penalty_cost += prob * PENALTY_RATE * self.v_n_slack[(t, scenario)]
         
         # Scale up from representative days to annual
-        days_per_season = 365 / 4
+        days_per_season = 365 / self.representative_days
+        self.days_per_season = days_per_season
         operational_cost *= days_per_season
         revenues *= days_per_season
         total_emissions *= days_per_season
@@ -636,19 +702,28 @@ class WFENexusModel:
                 GRB.MINIMIZE
             )
     
-    def optimize(self):
-        """Optimize the model"""
-        # Write model for debugging
-        self.model.write("model_debug.lp")
-        print("Model written to model_debug.lp for debugging")
+    def optimize(self, debug_file=None, callback=None):
+        """Optimize the model (callback, e.g. SolveTelemetry, is passed to Gurobi)"""
+        # Write model for debugging (opt-in, e.g. debug_file='model_debug.lp')
+        if debug_file is not None:
+            self.model.write(debug_file)
+            print(f"Model written to {debug_file} for debugging")
+        
+        # Settings tuned for this instance class (explicit solver_params take precedence)
+        if self.use_tuned_settings:
+            applied = TunedSettings().apply(self, skip=self.solver_params)
+            if applied:
+                print(f"Applied tuned settings for {instance_class(self.instance_features())}: {applied}")
         
         # First check if model is unbounded
         self.model.setParam('DualReductions', 0)
-        self.model.optimize()
+        self.model.optimize(callback)
         
         if self.model.status == GRB.OPTIMAL:
             print("\nOptimization successful!")
             self.print_results()
+            if SOLUTION_CHECK['check_on_solve']:
+                self.check_solution()
         else:
             print(f"\nOptimization failed with status: {self.model.status}")
             
@@ -656,36 +731,17 @@ class WFENexusModel:
             if self.model.status == GRB.UNBOUNDED or self.model.status == GRB.INF_OR_UNBD:
                 print("\nModel is unbounded. Adding reasonable bounds...")
                 
-                # Add upper bounds on all unbounded variables
-                max_grid = 1000  # MW
-                max_production = 10000  # tons/hour or m3/hour
-                
-                # Grid interactions
-                for key in self.v_grid_buy:
-                    self.v_grid_buy[key].UB = max_grid
-                
-                for key in self.v_grid_sell:
-                    self.v_grid_sell[key].UB = max_grid
-                
-                # Production variables
-                for key in self.v_production:
-                    self.v_production[key].UB = max_production
-                
-                # Generation variables
-                for key in self.v_gen:
-                    self.v_gen[key].UB = max_grid
-                
-                # Consumption variables
-                for key in self.v_consumption:
-                    self.v_consumption[key].UB = max_grid
+                self.add_fallback_bounds()
                 
                 # Re-optimize
                 print("Re-optimizing with bounds...")
-                self.model.optimize()
+                self.model.optimize(callback)
                 
                 if self.model.status == GRB.OPTIMAL:
                     print("\nOptimization successful after adding bounds!")
                     self.print_results()
+                    if SOLUTION_CHECK['check_on_solve']:
+                        self.check_solution()
                     return
             
             # If still infeasible, compute IIS
@@ -717,6 +773,121 @@ class WFENexusModel:
                             print("  ... (more variables)")
                             break
     
+    def add_fallback_bounds(self):
+        """Add upper bounds on unbounded operational variables"""
+        # Grid interactions
+        for key in self.v_grid_buy:
+            self.v_grid_buy[key].UB = MAX_GRID
+        
+        for key in self.v_grid_sell:
+            self.v_grid_sell[key].UB = MAX_GRID
+        
+        # Production variables
+        for key in self.v_production:
+            self.v_production[key].UB = MAX_PRODUCTION
+        
+        # Generation variables
+        for key in self.v_gen:
+            self.v_gen[key].UB = MAX_GRID
+        
+        # Consumption variables
+        for key in self.v_consumption:
+            self.v_consumption[key].UB = MAX_GRID
+        
+        self.fallback_bounds_applied = True
+    
+    def resolve(self, callback=None):
+        """Re-optimize the built model in place, reusing the previous solution as warm start"""
+        if self.model.Params.DualReductions != 0:
+            self.model.setParam('DualReductions', 0)
+        self.model.optimize(callback)
+        
+        if self.model.status == GRB.UNBOUNDED or self.model.status == GRB.INF_OR_UNBD:
+            self.add_fallback_bounds()
+            self.model.optimize(callback)
+        
+        # Sweeps resolve many times: only failed checks are printed
+        if SOLUTION_CHECK['check_on_solve'] and self.model.SolCount > 0:
+            self.check_solution(verbose=False)
+        
+        return self.model.status == GRB.OPTIMAL
+    
+    def check_solution(self, verbose=True):
+        """Recompute balances, limits and objective of the solution independently (see src/solution_checker.py)"""
+        return check_solution(self, verbose=verbose)
+    
+    def set_co2_tax(self, co2_tax):
+        """Change the CO2 tax in place by updating the emission cost coefficients"""
+        self.co2_tax = co2_tax
+        
+        # The emissions objective does not price CO2
+        if self.objective_type == 'minimize_emissions':
+            return
+        
+        for (t, scenario), var in self.v_emissions.items():
+            prob = self.probabilities[scenario]
+            var.Obj = prob * co2_tax * self.days_per_season
+    
+    def update_scenario_data(self, scenario, renewable, demand, price):
+        """Replace one scenario's availability, demand and price series in place"""
+        if not (len(renewable) == len(demand) == len(price) == len(self.time_periods)):
+            raise ValueError(f"Scenario data must cover the model's {len(self.time_periods)} time periods")
+        
+        self.renewable_data[scenario] = renewable.set_axis(self.time_periods)
+        self.demand_data[scenario] = demand.set_axis(self.time_periods)
+        self.price_data[scenario] = price.set_axis(self.time_periods)
+        
+        self.model.update()
+        get = self.model.getConstrByName
+        prob = self.probabilities[scenario]
+        wwtp_load = self.wwtp_data['energy_consumption'] * self.wwtp_data['influent_flow'] / 24 / 1000  # MWh
+        
+        for t in self.time_periods:
+            avail = self.renewable_data[scenario].loc[t]
+            demand_t = self.demand_data[scenario].loc[t]
+            price_t = self.price_data[scenario].loc[t]
+            
+            # Renewable availability (coefficient of v_cap, or RHS for fixed capacities)
+            for tech in ['pv', 'wind']:
+                if tech not in self.tech_generation:
+                    continue
+                constr = get(f"{tech}_gen_{t}_{scenario}")
+                if isinstance(self.v_cap[tech], gp.Var):
+                    self.model.chgCoeff(constr, self.v_cap[tech], -avail[f'{tech}_availability'])
+                else:
+                    constr.RHS = self.v_cap[tech] * avail[f'{tech}_availability']
+            
+            # Demands
+            get(f"elec_balance_{t}_{scenario}").RHS = demand_t['electricity_demand'] + wwtp_load
+            get(f"n_balance_{t}_{scenario}").RHS = demand_t['fertilizer_n_demand']
+            if 'water_reclamation' in self.tech_recovery:
+                get(f"water_balance_{t}_{scenario}").RHS = demand_t['water_demand']
+            if 'chp' in self.tech_generation:
+                get(f"heat_balance_{t}_{scenario}").RHS = demand_t['heat_demand']
+            if 'electrolyzer' in self.tech_conversion:
+                get(f"h2_balance_{t}_{scenario}").RHS = demand_t['hydrogen_demand']
+            
+            # Prices (only priced in cost objectives)
+            if self.objective_type != 'minimize_emissions':
+                scale = prob * self.days_per_season / 1000
+                self.v_grid_buy[('electricity', t, scenario)].Obj = scale * price_t['electricity_buy_price']
+                self.v_grid_buy[('gas', t, scenario)].Obj = scale * price_t['natural_gas_price']
+                self.v_grid_sell[('electricity', t, scenario)].Obj = -scale * price_t['electricity_sell_price']
+    
+    def calculate_annual_emissions(self):
+        """Expected annual CO2 emissions (tons/year) of the current solution"""
+        total_emissions = 0
+        for scenario in self.scenarios:
+            prob = self.probabilities[scenario]
+            for t in self.time_periods:
+                total_emissions += prob * self.v_emissions[(t, scenario)].X
+        
+        return total_emissions * self.days_per_season
+    
+    def dispose(self):
+        """Free the Gurobi model (required before disposing its environment)"""
+        self.model.dispose()
+    
     def print_results(self):
         """Print optimization results"""
         print("\n" + "="*80)
@@ -760,7 +931,7 @@ class WFENexusModel:
         print("-"*50)
         
         # Calculate total renewable capacity
-        renewable_cap = self.v_cap['pv'].X + self.v_cap['wind'].X
+        renewable_cap = sum(self.v_cap[tech].X for tech in ['pv', 'wind'] if tech in self.v_cap)
         total_gen_cap = sum(self.v_cap[tech].X for tech in self.tech_generation)
         renewable_share = renewable_cap / total_gen_cap * 100 if total_gen_cap > 0 else 0
         
@@ -775,7 +946,7 @@ class WFENexusModel:
         total_emissions = 0
         
         for scenario in self.scenarios:
-            prob = SCENARIO_PROBABILITIES[self.scenarios.index(scenario)]
+            prob = self.probabilities[scenario]
             
             for t in self.time_periods:
                 if 'electrolyzer' in self.tech_conversion:
@@ -848,14 +1019,15 @@ class WFENexusModel:
             for i, t in enumerate(self.time_periods[:24]):
                 pv_gen = self.v_gen[('pv', t, scenario)].X if ('pv', t, scenario) in self.v_gen else 0
                 wind_gen = self.v_gen[('wind', t, scenario)].X if ('wind', t, scenario) in self.v_gen else 0
-                battery = self.v_discharge[('battery', t, scenario)].X - self.v_charge[('battery', t, scenario)].X
+                battery = (self.v_discharge[('battery', t, scenario)].X - self.v_charge[('battery', t, scenario)].X
+                           if ('battery', t, scenario) in self.v_charge else 0)
                 grid_buy = self.v_grid_buy[('electricity', t, scenario)].X
                 emissions = self.v_emissions[(t, scenario)].X
                 
                 print(f"{i:<6} {pv_gen:>9.2f} {wind_gen:>9.2f} {battery:>9.2f} {grid_buy:>9.2f} {emissions:>9.2f}")
             
             sys.stdout = original_stdout
-            
+        
         print(f"\nDetailed results saved to: {filename}")
 
 if __name__ == "__main__":
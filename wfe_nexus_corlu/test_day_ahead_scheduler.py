@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Test script for the day-ahead scheduler: an in-place forecast update must
+give the same schedule cost as a model built from scratch for that forecast
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.day_ahead_scheduler import DayAheadScheduler, forecast_from_data
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+CAPACITIES = {'pv': 50, 'wind': 40, 'battery': 100, 'electrolyzer': 10, 'chp': 5, 'h2_storage': 500}
+
+def test_update_matches_fresh_build():
+    """Update a resident model to the next day's forecast and compare with a fresh build"""
+    print("Testing in-place forecast update...")
+    
+    scheduler = DayAheadScheduler(CAPACITIES, forecast_from_data(DATA_DIR), data_dir=DATA_DIR)
+    first_day = scheduler.schedule()
+    print(f"✓ Day 1 scheduled: ${first_day['cost']:,.0f}")
+    
+    next_forecast = forecast_from_data(DATA_DIR, 'low_renewable', start=24)
+    updated = scheduler.run_day(*next_forecast, initial_soc=first_day['final_soc'])
+    fresh = DayAheadScheduler(CAPACITIES, next_forecast, data_dir=DATA_DIR,
+                              initial_soc=first_day['final_soc']).schedule()
+    
+    assert abs(updated['cost'] - fresh['cost']) <= 1e-6 * max(1.0, abs(fresh['cost'])), \
+        f"updated model cost {updated['cost']:,.2f} differs from fresh build {fresh['cost']:,.2f}"
+    print(f"✓ Updated model matches fresh build: ${updated['cost']:,.0f} "
+          f"({updated['iterations']:.0f} vs {fresh['iterations']:.0f} simplex iterations)")
+
+if __name__ == "__main__":
+    test_update_matches_fresh_build()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for the local job service: submit, deduplicate and fetch a result
+"""
+
+import urllib.error
+import tempfile
+import shutil
+import glob
+import time
+import os
+import sys
+import pandas as pd
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.job_service import JobService, submit_job, get_job
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def make_tiny_data(data_dir, hours=('winter_h12',)):
+    """Copy of the data set restricted to a few representative hours"""
+    for path in glob.glob(os.path.join(DATA_DIR, '*.csv')):
+        name = os.path.basename(path)
+        if name.split('_')[0] in ('renewable', 'demand', 'price'):
+            pd.read_csv(path, index_col=0).loc[list(hours)].to_csv(os.path.join(data_dir, name))
+        else:
+            shutil.copy(path, data_dir)
+
+def test_job_service():
+    """Submit a job twice over HTTP, wait for it and fetch its result and files"""
+    print("Testing job service...")
+    
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_dir = os.path.join(work_dir, 'data')
+        os.makedirs(data_dir)
+        make_tiny_data(data_dir)
+        
+        service = JobService(port=0, store_dir=os.path.join(work_dir, 'store'), max_workers=1, plots=False).start()
+        url = f"http://{service.host}:{service.port}"
+        try:
+            first = submit_job({'data_dir': data_dir, 'co2_policy': 'no_tax', 'threads': 1}, url)
+            second = submit_job({'data_dir': data_dir, 'co2_policy': 'no_tax', 'threads': 2}, url)
+            assert not first['deduplicated'] and second['deduplicated'], "identical job was not deduplicated"
+            assert first['id'] == second['id']
+            print(f"✓ Identical submission deduplicated to job {first['id']}")
+            
+            try:
+                submit_job({'data_dir': data_dir, 'unknown_field': 1}, url)
+                assert False, "invalid specification was accepted"
+            except urllib.error.HTTPError as e:
+                assert e.code == 400
+            print("✓ Invalid specification rejected")
+            
+            for _ in range(120):
+                job = get_job(first['id'], url)
+                if job['status'] in ('done', 'failed'):
+                    break
+                time.sleep(1)
+            assert job['status'] == 'done', f"job ended as {job['status']}: {job['error']}"
+            assert job['result']['status'] == 2
+            assert 'detailed_results.txt' in service.files(first['id'])
+            print(f"✓ Job solved: objective ${job['result']['objective_value']:,.0f}")
+            
+            health = service.health()
+            assert health['status'] == 'ok', health
+            print(f"✓ Service healthy ({health['pool_restarts']} pool restarts)")
+        finally:
+            service.stop()
+
+if __name__ == "__main__":
+    test_job_service()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming statistics of the Monte Carlo evaluator:
+P-square quantiles and tail CVaR against exact values of the full sample
+"""
+
+import numpy as np
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from src.monte_carlo import StreamingStats
+
+def test_streaming_stats():
+    """Stream a skewed cost sample and compare with the exact statistics"""
+    print("Testing streaming statistics...")
+    
+    n_samples = 20000
+    costs = np.random.RandomState(42).lognormal(mean=14, sigma=0.4, size=n_samples)
+    stats = StreamingStats(quantiles=[0.05, 0.5, 0.95], cvar_alpha=0.95, n_samples=n_samples)
+    for cost in costs:
+        stats.add(float(cost))
+    summary = stats.summary()
+    
+    assert abs(summary['mean'] - costs.mean()) <= 1e-9 * costs.mean()
+    assert abs(summary['std'] - costs.std(ddof=1)) <= 1e-6 * costs.std(ddof=1)
+    print(f"✓ Mean ${summary['mean']:,.0f} and std ${summary['std']:,.0f} exact")
+    
+    # P-square is an estimate: within 1% of the exact quantile on a sample this size
+    for p in [0.05, 0.5, 0.95]:
+        exact = np.quantile(costs, p)
+        error = abs(summary[f'P{p*100:g}'] - exact) / exact
+        assert error < 0.01, f"P{p*100:g} off by {error:.2%}"
+        print(f"✓ P{p*100:g} within {error:.3%} of exact ${exact:,.0f}")
+    
+    # CVaR keeps the exact tail
+    tail = np.sort(costs)[-int(np.ceil(0.05 * n_samples)):]
+    assert abs(summary['CVaR95'] - tail.mean()) <= 1e-9 * tail.mean()
+    print(f"✓ CVaR95 exact: ${summary['CVaR95']:,.0f}")
+
+if __name__ == "__main__":
+    test_streaming_stats()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Test script for the run registry: recording solved runs, capacity filters
+and the order_by column whitelist
+"""
+
+import tempfile
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config.model_config import *
+from src.stochastic_metrics import ScenarioSetModel, load_scenario_data
+from src.run_registry import RunRegistry
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def test_run_registry():
+    """Record two single-hour runs and query them back"""
+    print("Testing run registry...")
+    
+    data = {scenario: tuple(frame.loc[['winter_h12']] for frame in frames)
+            for scenario, frames in load_scenario_data(DATA_DIR).items()}
+    with tempfile.TemporaryDirectory() as work_dir:
+        registry = RunRegistry(os.path.join(work_dir, 'runs.sqlite'))
+        for co2_policy in ['no_tax', 'high_tax']:
+            model = ScenarioSetModel(data, dict(zip(SCENARIOS, SCENARIO_PROBABILITIES)), data_dir=DATA_DIR,
+                                     co2_policy=co2_policy, solver_params={'OutputFlag': 0})
+            model.resolve()
+            registry.record(model, label=co2_policy)
+            model.dispose()
+        assert len(registry) == 2
+        print(f"✓ Recorded {len(registry)} runs")
+        
+        runs = registry.runs(order_by='obj_val', descending=True)
+        assert list(runs['obj_val']) == sorted(runs['obj_val'], reverse=True)
+        assert any(column.startswith('cap_') for column in runs.columns)
+        print(f"✓ Ordered by obj_val with {sum(c.startswith('cap_') for c in runs.columns)} capacity columns")
+        
+        built = registry.runs(min_capacity={'pv': 0.0})
+        assert set(built['run_id']) == set(runs.loc[runs['cap_pv'] > 0, 'run_id'])
+        print(f"✓ Capacity filter kept {len(built)} runs")
+        
+        # order_by is formatted into the query, so anything but a column name must be rejected
+        for order_by in ['obj_val; DROP TABLE runs', 'run_id DESC, (SELECT 1)', 'no_such_column']:
+            try:
+                registry.runs(order_by=order_by)
+                assert False, f"order_by {order_by!r} was accepted"
+            except ValueError:
+                pass
+        assert len(registry) == 2
+        print("✓ Unknown order_by columns rejected")
+
+if __name__ == "__main__":
+    test_run_registry()
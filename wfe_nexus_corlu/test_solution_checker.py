@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for the independent solution checker on small solved instances
+"""
+
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from config.model_config import *
+from src.stochastic_metrics import ScenarioSetModel, load_scenario_data
+from src.solution_checker import SolutionChecker
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def solve_tiny(hours, co2_policy, exclude_techs=None):
+    """Solve the three scenarios restricted to a few representative hours"""
+    data = {scenario: tuple(frame.loc[hours] for frame in frames)
+            for scenario, frames in load_scenario_data(DATA_DIR).items()}
+    model = ScenarioSetModel(data, dict(zip(SCENARIOS, SCENARIO_PROBABILITIES)), data_dir=DATA_DIR,
+                             co2_policy=co2_policy, solver_params={'OutputFlag': 0}, exclude_techs=exclude_techs)
+    assert model.resolve(), f"tiny instance not solved (status {model.model.status})"
+    return model
+
+def test_checker_passes():
+    """The checker must accept optimal solutions, including storage recursions over several hours"""
+    print("Testing solution checker...")
+    
+    cases = [
+        (['winter_h12'], 'no_tax', None),
+        (['winter_h12'], 'high_tax', None),
+        # Four hours with storage; dispatchable units excluded to keep the instance small
+        (['winter_h12', 'spring_h12', 'summer_h12', 'autumn_h12'], 'medium_tax', DISPATCHABLE)
+    ]
+    for hours, co2_policy, exclude_techs in cases:
+        model = solve_tiny(hours, co2_policy, exclude_techs)
+        checker = SolutionChecker(model)
+        summary = checker.check()
+        if not checker.passed():
+            checker.print_report(summary)
+        assert checker.passed(), f"checker rejected the optimal solution ({len(hours)} h, {co2_policy})"
+        print(f"✓ {len(hours)} h, {co2_policy}: {len(summary)} checks passed, "
+              f"objective error {checker.objective['relative_error']:.1e}")
+        model.dispose()
+
+def test_checker_detects_violation():
+    """A solution of a model whose electricity demand drifted from the data must fail the balance check"""
+    model = solve_tiny(['winter_h12'], 'no_tax')
+    for scenario in model.scenarios:
+        model.model.getConstrByName(f"elec_balance_winter_h12_{scenario}").RHS += 10
+    assert model.resolve()
+    checker = SolutionChecker(model)
+    summary = checker.check()
+    balance = summary.set_index('check').loc['electricity_balance']
+    assert not checker.passed() and abs(balance['max_residual'] - 10) < 1e-6, balance.to_dict()
+    print(f"✓ Drifted demand detected: electricity balance residual {balance['max_residual']:.2f} MW")
+    model.dispose()
+
+if __name__ == "__main__":
+    test_checker_passes()
+    test_checker_detects_violation()